@@ -0,0 +1,213 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import sqlite3
+import subprocess
+import tempfile
+import multiprocessing
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+from benchmarks.synthetic_data import SCALES, RECIPROCAL_FILE, MACRO_FOLDER, generate_dataset
+
+# Where result files are written by default (one JSON file per run).
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+def _bench_ingest_tariffs(data_dir):
+    from src.fetch_tariffs import process_tariff_data
+    process_tariff_data(base_folder=data_dir)
+
+def _bench_load_reciprocal_tariffs(data_dir):
+    from src.fetch_new_tariffs import store_new_reciprocal_tariffs
+    store_new_reciprocal_tariffs(os.path.join(data_dir, RECIPROCAL_FILE))
+
+def _bench_fetch_macro(data_dir):
+    from src.fetch_macro_data import FileSource, fetch_macro_series
+    fetch_macro_series(source=FileSource(os.path.join(data_dir, MACRO_FOLDER)))
+
+def _bench_compute_impact(data_dir):
+    from src.delta_calculations import calculate_economic_impact
+    calculate_economic_impact()
+
+def _bench_partner_impact(data_dir):
+    from src.delta_calculations import IMPACT_LEVELS, calculate_partner_impact
+    for level in IMPACT_LEVELS:
+        calculate_partner_impact(level)
+
+def _bench_tariff_exposure(data_dir):
+    from src.tariff_exposure import store_tariff_exposure
+    store_tariff_exposure()
+
+def _bench_visualize(data_dir):
+    from src.visuals import run_visualizations
+    run_visualizations(output_folder="output", force=True)
+
+def _bench_sarimax(data_dir):
+    from src.SARIMAX_model import (
+        TARGET_DELTAS, compute_deltas, load_economic_impact, select_orders, forecast_targets
+    )
+    economic_df = compute_deltas(load_economic_impact())
+    exog_value = economic_df['avg_tariff_rate'].iloc[-1]
+    forecast_date = economic_df.index[-1] + (economic_df.index[-1] - economic_df.index[-2])
+    orders, _ = select_orders(economic_df, exog_value, TARGET_DELTAS)
+    forecast_targets(economic_df, exog_value, forecast_date, TARGET_DELTAS, orders=orders)
+
+# Benchmarked stages in dependency order; each runs in a fresh process.
+BENCHMARK_STAGES = {
+    'ingest_tariffs': _bench_ingest_tariffs,
+    'load_reciprocal_tariffs': _bench_load_reciprocal_tariffs,
+    'fetch_macro': _bench_fetch_macro,
+    'compute_impact': _bench_compute_impact,
+    'partner_impact': _bench_partner_impact,
+    'tariff_exposure': _bench_tariff_exposure,
+    'visualize': _bench_visualize,
+    'sarimax': _bench_sarimax,
+}
+
+def _peak_rss_mb(who):
+    """Peak resident set size of this process or of its reaped children, in MiB."""
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere.
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+def _run_stage(stage, data_dir, work_dir, db_path):
+    """
+    Child-process entry point: run one stage against the throwaway database
+    with the working directory (relative output and cache folders) in work_dir.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    from src.db_utils import set_db_path
+    from src.instrumentation import measure
+    os.chdir(work_dir)
+    set_db_path(db_path)
+
+    baseline_mb = _peak_rss_mb(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    with measure(stage) as measurement:
+        BENCHMARK_STAGES[stage](data_dir)
+    seconds = time.perf_counter() - start
+    return {
+        'stage': stage,
+        'seconds': round(seconds, 4),
+        'peak_rss_mb': round(_peak_rss_mb(resource.RUSAGE_SELF), 1),
+        'baseline_rss_mb': round(baseline_mb, 1),
+        'workers_peak_rss_mb': round(_peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+        'rows_in': measurement.rows_in,
+        'rows_out': measurement.rows_out,
+        'queries': measurement.queries,
+        'query_seconds': round(measurement.query_seconds, 4),
+    }
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(n_partners, n_products, n_years, stages=tuple(BENCHMARK_STAGES), seed=0,
+                   work_dir=None, keep=False):
+    """
+    Generate a synthetic dataset, then run each stage against a throwaway
+    SQLite file, each in a fresh process so its time and peak memory are
+    measured in isolation (stage imports are excluded from the timing).
+
+    Returns:
+        A JSON-serialisable dict with the environment, scale and per-stage results.
+    """
+    unknown = [stage for stage in stages if stage not in BENCHMARK_STAGES]
+    if unknown:
+        raise ValueError(f"Unknown stage(s) {unknown}; choose from {list(BENCHMARK_STAGES)}")
+    work_dir = os.path.abspath(work_dir or tempfile.mkdtemp(prefix="tia-bench-"))
+    data_dir = os.path.join(work_dir, "data")
+    db_path = os.path.join(work_dir, "bench.db")
+    os.makedirs(data_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    rows = generate_dataset(data_dir, n_partners, n_products, n_years, seed=seed)
+    generate_seconds = time.perf_counter() - start
+    print(f"Generated {sum(rows.values()):,} rows in {generate_seconds:.1f}s under {data_dir}")
+
+    results = []
+    spawn = multiprocessing.get_context("spawn")
+    try:
+        for stage in stages:
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+                result = executor.submit(_run_stage, stage, data_dir, work_dir, db_path).result()
+            print(f"{stage:<24} {result['seconds']:>10.3f}s {result['peak_rss_mb']:>10.1f} MiB")
+            results.append(result)
+        with sqlite3.connect(db_path) as conn:
+            db_rows = {table: conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+                       for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        db_size_mb = os.path.getsize(db_path) / (1 << 20)
+    finally:
+        if not keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': _git("rev-parse", "HEAD"),
+        'git_dirty': bool(_git("status", "--porcelain", "--untracked-files=no")),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'scale': {'partners': n_partners, 'products': n_products, 'years': n_years, 'seed': seed},
+        'input_rows': rows,
+        'generate_seconds': round(generate_seconds, 4),
+        'db_rows': db_rows,
+        'db_size_mb': round(db_size_mb, 1),
+        'stages': results,
+    }
+
+def compare_results(baseline, current):
+    """Print per-stage time and memory ratios of two result dicts (current / baseline)."""
+    base_stages = {result['stage']: result for result in baseline['stages']}
+    print(f"{'stage':<24} {'base s':>10} {'now s':>10} {'ratio':>7} {'base MiB':>10} {'now MiB':>10}")
+    for result in current['stages']:
+        base = base_stages.get(result['stage'])
+        if base is None:
+            continue
+        ratio = result['seconds'] / base['seconds'] if base['seconds'] else float('nan')
+        print(f"{result['stage']:<24} {base['seconds']:>10.3f} {result['seconds']:>10.3f} {ratio:>7.2f} "
+              f"{base['peak_rss_mb']:>10.1f} {result['peak_rss_mb']:>10.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic WITS-shaped data.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default='small',
+                        help="Preset (partners, products, years); see synthetic_data.SCALES.")
+    parser.add_argument("--partners", type=int, help="Override the preset's partner count.")
+    parser.add_argument("--products", type=int, help="Override the preset's product count.")
+    parser.add_argument("--years", type=int, help="Override the preset's year count.")
+    parser.add_argument("--stages", help="Comma-separated stages (default: all, in order).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result JSON path (default: benchmarks/results/<time>-<commit>.json).")
+    parser.add_argument("--compare", metavar="BASELINE_JSON", help="Print ratios against an earlier result.")
+    parser.add_argument("--workdir", help="Folder for the synthetic data and database (default: a temp dir).")
+    parser.add_argument("--keep", action="store_true", help="Keep the work folder afterwards.")
+    args = parser.parse_args(argv)
+
+    partners, products, years = SCALES[args.scale]
+    stages = [stage.strip() for stage in args.stages.split(",")] if args.stages else list(BENCHMARK_STAGES)
+    report = run_benchmarks(args.partners or partners, args.products or products, args.years or years,
+                            stages=stages, seed=args.seed, work_dir=args.workdir, keep=args.keep)
+    report['scale']['preset'] = args.scale
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{(report['git_commit'] or 'nogit')[:7]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare_results(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
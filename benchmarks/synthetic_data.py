@@ -0,0 +1,129 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from src.fetch_tariffs import TARIFF_FILES
+from src.macro_store import MACRO_SERIES
+
+# Named sizes as (partners, products, years). Imports and exports each get
+# (partners + 1 world row) x products x years rows; 'large' is ~21M rows per file.
+SCALES = {
+    'small': (50, 20, 30),
+    'medium': (200, 250, 30),
+    'large': (230, 3000, 30),
+}
+FIRST_YEAR = 1995
+RECIPROCAL_FILE = "reciprocal_tariffs.csv"
+MACRO_FOLDER = "macro"
+
+_REPORTER = {
+    'reporter_name': "United States of America",
+    'reporter_code': "C840",
+    'classification': "HS",
+    'classification_version': "H0",
+}
+TRADE_COLUMNS = ["reporter_name", "reporter_code", "year", "classification", "classification_version",
+                 "product_code", "mtn_categories", "partner_code", "partner_name", "value"]
+APPLIED_COLUMNS = ["reporter_name", "reporter_code", "year", "classification", "classification_version",
+                   "duty_scheme_code", "duty_scheme_name", "product_code", "mtn_categories",
+                   "simple_average", "trade_weighted", "duty_free_share"]
+
+def partner_names(n_partners):
+    return [f"Partner {i:03d}" for i in range(1, n_partners + 1)]
+
+def _trade_year(rng, year, partner_codes, partner_names_, product_codes, scale):
+    """One year of a WITS trade extract: every partner x product, plus World totals."""
+    n_partners, n_products = len(partner_codes), len(product_codes)
+    values = rng.lognormal(mean=np.log(scale), sigma=1.5, size=(n_partners, n_products)).round()
+    world = values.sum(axis=0)
+    frame = pd.DataFrame({
+        'year': year,
+        'product_code': np.tile(product_codes, n_partners + 1),
+        'partner_code': np.repeat(['A000'] + partner_codes, n_products),
+        'partner_name': np.repeat(['World'] + partner_names_, n_products),
+        'value': np.concatenate([world, values.ravel()]),
+    })
+    frame['mtn_categories'] = "Product " + frame['product_code']
+    return frame.assign(**_REPORTER)[TRADE_COLUMNS]
+
+def _applied_year(rng, year, product_codes):
+    """One year of the WITS applied tariff extract: MFN rates for every product."""
+    simple_average = rng.gamma(shape=2.0, scale=1.5, size=len(product_codes))
+    frame = pd.DataFrame({
+        'year': year,
+        'duty_scheme_code': "A0002",
+        'duty_scheme_name': "MFN statutory (legal/autonomous) duty",
+        'product_code': product_codes,
+        'simple_average': simple_average,
+        'trade_weighted': simple_average * rng.uniform(0.5, 1.0, size=len(product_codes)),
+        'duty_free_share': rng.uniform(0.2, 0.6, size=len(product_codes)),
+    })
+    frame['mtn_categories'] = "Product " + frame['product_code']
+    return frame.assign(**_REPORTER)[APPLIED_COLUMNS]
+
+def _macro_series(rng, start, end):
+    """Random-walk CPI, unemployment, industrial production (monthly) and GDP (quarterly)."""
+    monthly = pd.date_range(start, end, freq='MS')
+    quarterly = pd.date_range(start, end, freq='QS')
+    walks = {
+        'CPIAUCSL': 130 * np.exp(np.cumsum(rng.normal(0.002, 0.003, len(monthly)))),
+        'UNRATE': np.clip(5.5 + np.cumsum(rng.normal(0, 0.15, len(monthly))), 2.5, 15),
+        'INDPRO': 80 * np.exp(np.cumsum(rng.normal(0.0015, 0.008, len(monthly)))),
+        'GDP': 7500 * np.exp(np.cumsum(rng.normal(0.012, 0.01, len(quarterly)))),
+    }
+    return {series_id: pd.DataFrame({'date': quarterly if series_id == 'GDP' else monthly, 'value': values})
+            for series_id, values in walks.items()}
+
+def generate_dataset(folder, n_partners, n_products, n_years, first_year=FIRST_YEAR, seed=0):
+    """
+    Write a synthetic dataset shaped like the bundled inputs to `folder`:
+    imports/exports/applied WITS CSVs, a reciprocal tariff schedule whose
+    countries are the synthetic partners, and macro series CSVs in
+    <folder>/macro for FileSource. CSVs are written one year at a time, so
+    memory stays at one year's rows whatever the scale.
+
+    Returns:
+        {file name: rows written}.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.join(folder, MACRO_FOLDER), exist_ok=True)
+    partner_codes = [f"C{i:03d}" for i in range(1, n_partners + 1)]
+    names = partner_names(n_partners)
+    product_codes = np.array([f"{i:06d}" for i in range(10110, 10110 + n_products)])
+    years = range(first_year, first_year + n_years)
+
+    rows = {}
+    for data_type, file_name in TARIFF_FILES.items():
+        path = os.path.join(folder, file_name)
+        rows[file_name] = 0
+        for i, year in enumerate(years):
+            if data_type == 'applied':
+                frame = _applied_year(rng, year, product_codes)
+            else:
+                frame = _trade_year(rng, year, partner_codes, names, product_codes,
+                                    scale=5e7 if data_type == 'imports' else 3e7)
+            frame.to_csv(path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+            rows[file_name] += len(frame)
+
+    charged = rng.integers(10, 60, size=n_partners).astype(float)
+    schedule = pd.DataFrame({
+        'country': names,
+        'effective_date': "2025-04-02",
+        'tariff_charged_us': charged,
+        'usa_discounted_tariff': np.maximum(10.0, np.ceil(charged / 2)),
+    })
+    schedule.to_csv(os.path.join(folder, RECIPROCAL_FILE), index=False)
+    rows[RECIPROCAL_FILE] = len(schedule)
+
+    macro = _macro_series(rng, f"{first_year - 5}-01-01", f"{first_year + n_years}-12-01")
+    for series_id in MACRO_SERIES:
+        macro[series_id].to_csv(os.path.join(folder, MACRO_FOLDER, f"{series_id}.csv"), index=False)
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic WITS-shaped tariff dataset.")
+    parser.add_argument("folder")
+    parser.add_argument("--scale", choices=sorted(SCALES), default='small')
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(generate_dataset(args.folder, *SCALES[args.scale], seed=args.seed))
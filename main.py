@@ -1,40 +1,90 @@
-from src.db_manager import initialize_database
-from src.fetch_macro_data import fetch_and_store_macro_data_as_economic_impact
-from src.fetch_tariffs import process_tariff_data
-from src.delta_calculations import calculate_economic_impact
-from src.visuals import run_visualizations
-
-def main():
-
-    # Initialize the database and create tables
-    print("Initializing database...")
-    initialize_database()
-
-    # fetch and store tariff data
-    print("Fetching and storing tariff data...")
-    #process_tariff_data()
-    print("Tariff data processing completed.")
-
-    # fetch and store macroeconomic data
-    print("Fetching and storing macroeconomic data...")
-    #fetch_and_store_macro_data_as_economic_impact()
-    print("Macroeconomic data fetching and storing completed.")
-    
-    # store new reciprocal tariffs
-    print("Storing new reciprocal tariffs...")
-    #store_new_reciprocal_tariffs()
-    print("New reciprocal tariffs stored successfully.")
-    
-    # calculate economic impact
-    print("Calculating economic impact...")
-    calculate_economic_impact()
-    print("Economic impact calculation completed.")
-
-    # Run visualizations
-    print("Generating visualizations...")
-    run_visualizations()
-    print("Visualizations generated.")
-
-    
+import sys
+import logging
+import argparse
+from src.instrumentation import configure_logging, configure_profiling
+from src.pipeline import PIPELINE_MAX_WORKERS, STAGE_NAMES, pipeline_status, run_pipeline
+
+# Stages run by each subcommand. src.pipeline itself is light; stage modules
+# (pandas, statsmodels, matplotlib, fredapi) are imported only when a stage runs.
+COMMAND_STAGES = {
+    "ingest": ["ingest_tariffs", "load_reciprocal_tariffs"],
+    "macro": ["fetch_macro"],
+    "impact": ["compute_impact", "partner_impact", "tariff_exposure"],
+    "plots": ["visualize"],
+    "forecast": ["forecast", "forecast_paths"],
+    "backtest": ["backtest"],
+}
+
+def run_stages(args, only=None):
+    start_from = getattr(args, "start_from", None)
+    results = run_pipeline(only=only, start_from=start_from, force=args.force, max_workers=args.workers)
+    for stage, status in results.items():
+        print(f"  {stage}: {status}")
+
+def show_status(args):
+    stage_rows, table_rows = pipeline_status()
+    print("Stages (last successful run, last recorded run):")
+    for stage, completed_at, last_status, last_seconds in stage_rows:
+        last_run = f"{last_status} in {last_seconds:.2f}s" if last_status else "-"
+        print(f"  {stage:<24} {completed_at or 'never':<26} {last_run}")
+    print("Tables (write counter):")
+    for table_name, version, updated_at in table_rows:
+        print(f"  {table_name:<24} v{version:<6} {updated_at}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Tariff impact analysis. Stages whose inputs are unchanged are skipped.",
+    )
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    # Accepted after any subcommand, e.g. `main.py forecast -v`.
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("-v", "--verbose", action="store_true",
+                        help="Log per-function timings, query counts and DataFrame dumps.")
+    common.add_argument("--profile", metavar="DIR",
+                        help="Write a cProfile dump of every stage that runs into DIR.")
+
+    def add_stage_options(subparser):
+        subparser.add_argument("--force", action="store_true",
+                               help="Run the stages even if their inputs are unchanged.")
+        subparser.add_argument("--workers", type=int, default=PIPELINE_MAX_WORKERS, help="Stages run concurrently.")
+
+    run_parser = commands.add_parser("run", parents=[common], help="Run the whole pipeline (the default).",
+                                     epilog="Stages: " + ", ".join(STAGE_NAMES))
+    run_parser.add_argument("--only", help="Comma-separated stages to run; upstream stages are not run.")
+    run_parser.add_argument("--from", dest="start_from", metavar="STAGE",
+                            help="Run this stage and every stage downstream of it.")
+    add_stage_options(run_parser)
+
+    helps = {
+        "ingest": "Load the WITS tariff files and the reciprocal tariff schedule.",
+        "macro": "Fetch new macro observations.",
+        "impact": "Compute national, partner/product and exposure tables.",
+        "plots": "Render the economic impact charts.",
+        "forecast": "Run the SARIMAX forecast and store the multi-year scenario forecasts.",
+        "backtest": "Score the SARIMAX forecasts with a rolling-origin backtest.",
+    }
+    for command, help_text in helps.items():
+        add_stage_options(commands.add_parser(command, parents=[common], help=help_text))
+    commands.add_parser("status", parents=[common], help="Show when each stage last ran and the table versions.")
+
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # Without a subcommand (e.g. `main.py --force`), run the whole pipeline.
+    if not argv or (argv[0].startswith("-") and argv[0] not in ("-h", "--help")):
+        argv = ["run"] + argv
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_logging(logging.DEBUG if args.verbose else logging.INFO)
+    configure_profiling(args.profile)
+    if args.command == "status":
+        show_status(args)
+    elif args.command == "run":
+        only = [name.strip() for name in args.only.split(",")] if args.only else None
+        run_stages(args, only)
+    else:
+        run_stages(args, COMMAND_STAGES[args.command])
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,48 @@
+"""
+Upgrade check: runs the impact stages against a throwaway copy of a database
+(the shipped database/data.db by default), the way a checkout without macro
+observations or network access would, and fails if any year of
+'economic_impact' is lost.
+
+Usage: python -m scripts.check_db_upgrade [path/to/data.db]
+"""
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+
+SHIPPED_DB = os.path.join("database", "data.db")
+IMPACT_STAGES = ["compute_impact", "partner_impact", "tariff_exposure"]
+
+def economic_impact_years(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return {year for (year,) in conn.execute("SELECT year FROM economic_impact")}
+
+def check_upgrade(db_path=SHIPPED_DB):
+    """Return (years before, years after) of running the impact stages on a copy of db_path."""
+    from src.db_utils import set_db_path
+    from src.pipeline import run_pipeline
+
+    work_dir = tempfile.mkdtemp(prefix="tia-upgrade-")
+    try:
+        copy_path = os.path.join(work_dir, "data.db")
+        shutil.copyfile(db_path, copy_path)
+        before = economic_impact_years(copy_path)
+        set_db_path(copy_path)
+        run_pipeline(only=IMPACT_STAGES, force=True, max_workers=1)
+        after = economic_impact_years(copy_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return before, after
+
+if __name__ == "__main__":
+    from src.instrumentation import configure_logging
+    configure_logging()
+    before, after = check_upgrade(sys.argv[1] if len(sys.argv) > 1 else SHIPPED_DB)
+    lost = sorted(before - after)
+    print(f"economic_impact: {len(before)} rows before, {len(after)} after")
+    if lost:
+        print(f"FAILED: years lost: {lost}")
+        sys.exit(1)
+    print("OK")
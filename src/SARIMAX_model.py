@@ -1,22 +1,70 @@
 import os
-import sqlite3
+import logging
+import multiprocessing
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
+from scipy.stats import norm
 import statsmodels.api as sm
 from statsmodels.tsa.statespace.sarimax import SARIMAX
+from statsmodels.tsa.stattools import adfuller
 import matplotlib.pyplot as plt
-from src.config import DB_PATH, OUTPUT_PATH
+from datetime import datetime, timezone
+from src.config import OUTPUT_PATH
+from src.db_utils import fetch_query, get_connection, store_dataframe
+from src.fetch_new_tariffs import load_new_tariffs
+from src.instrumentation import configure_logging, instrumented
+from src.frame_cache import read_table
+from src.macro_store import load_annual_macro
+from src.model_cache import model_cache_key, load_cached_fit, store_cached_fit
+from src.schema import bump_table_version, create_tables
+from src.tariff_exposure import exposure_weights
+
+logger = logging.getLogger(__name__)
+
+# Macro delta columns forecast by default.
+TARGET_DELTAS = ['delta_GDP', 'cpi_delta', 'unemployment_delta', 'industrial_delta']
+
+# Worker processes used by forecast_targets; None means one per CPU.
+FORECAST_MAX_WORKERS = None
+# Start method of the fitting pools. Stages run on pipeline threads next to
+# other stages, and forking a multi-threaded process can copy a lock (SQLite,
+# logging, BLAS) held by another thread and deadlock the child.
+POOL_CONTEXT = multiprocessing.get_context("spawn")
+
+# Historical tariff measure (percent) used as the regressor by the scenario API,
+# and the default shocks applied to each scenario rate.
+SCENARIO_EXOG_COLUMN = 'avg_tariff_rate'
+SCENARIO_SHOCKS_BPS = (-100, -50, 0, 50, 100)
+
+# Horizon (years) and phase-in period of the path forecasts precomputed by
+# run_path_forecasts for the 'forecasts' table.
+PATH_HORIZON_YEARS = 10
+PATH_PHASE_YEARS = 3
+# Runs kept in the 'forecasts' table; store_forecasts deletes older ones.
+FORECAST_RUNS_KEPT = 5
+
+# Default (p,d,q) grid of select_orders: d is picked from the 'd' candidates by
+# an ADF unit-root test at UNIT_ROOT_ALPHA, then p and q are searched. The test
+# uses a single lag: on ~30 annual points, more lags cost it most of its power.
+ORDER_GRID = {'p': range(0, 3), 'd': range(0, 2), 'q': range(0, 3)}
+UNIT_ROOT_ALPHA = 0.05
+UNIT_ROOT_MAX_LAG = 1
 
 def load_economic_impact():
     """
-    Load economic impact data from the economic_impact table.
+    Load economic impact data from the economic_impact table, with the macro
+    levels ('GDP', 'CPI', 'Unemployment_Rate', 'Industrial_Production') taken
+    from the macro observation store when it has data.
     Converts the 'year' column into a DateTimeIndex.
-    Assumes the table includes at least columns: 'year', 'GDP', 'CPI',
-    'Unemployment_Rate', and 'Industrial_Production'.
     """
-    conn = sqlite3.connect(DB_PATH)
-    query = "SELECT * FROM economic_impact WHERE year >= 1996 ORDER BY year"
-    df = pd.read_sql_query(query, conn)
-    conn.close()
+    df = read_table("economic_impact")
+    df = df[df['year'] >= 1996].sort_values('year').reset_index(drop=True)
+    macro_df = load_annual_macro(how='first', start='1996-01-01')
+    if not macro_df.empty:
+        macro_columns = [col for col in macro_df.columns if col != 'year']
+        df = df.drop(columns=macro_columns).merge(macro_df, on='year', how='left')
     df['year'] = df['year'].astype(int)
     df['date'] = pd.to_datetime(df['year'], format='%Y')
     df.set_index('date', inplace=True)
@@ -35,24 +83,115 @@ def compute_deltas(economic_df):
     economic_df = economic_df.dropna(subset=['delta_GDP', 'cpi_delta', 'unemployment_delta', 'industrial_delta'])
     return economic_df
 
-def load_new_tariffs():
+def aggregate_new_tariff(new_tariff_df, weights=None):
     """
-    Load new tariff data from the new_tariffs table.
-    The table contains columns: country, tariff_charged_us, and usa_discounted_tariff.
+    Aggregate new tariff data to obtain a single measure.
+    Without weights this is the average of the 'tariff_charged_us' values. With
+    weights (a Series indexed by country, e.g. US imports from each country
+    from tariff_exposure.exposure_weights), it is the weighted average over the
+    countries that have a weight.
     """
-    conn = sqlite3.connect(DB_PATH)
-    query = "SELECT * FROM new_tariffs"
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df
+    if weights is None:
+        return new_tariff_df['tariff_charged_us'].mean()
+    country_weights = new_tariff_df['country'].map(weights)
+    covered = country_weights.notna() & new_tariff_df['tariff_charged_us'].notna()
+    return np.average(new_tariff_df.loc[covered, 'tariff_charged_us'], weights=country_weights[covered])
+
+def constant_exog(exog_value, index):
+    """Exogenous series holding the aggregated new tariff measure at every date."""
+    return pd.Series(exog_value, index=index, name='new_delta_tariff')
 
-def aggregate_new_tariff(new_tariff_df):
+def _cache_entry(model_fit):
+    """The parts of a fitted model kept in the on-disk model cache."""
+    return {'params': model_fit.params, 'aic': model_fit.aic, 'bic': model_fit.bic, 'llf': model_fit.llf}
+
+def fit_sarimax(endog, exog, order):
     """
-    Aggregate new tariff data to obtain a single measure.
-    Here we use the average of the 'tariff_charged_us' values.
+    Fit SARIMAX(endog, exog, order), reusing the parameters stored in the model
+    cache when the same series, exog and order were fitted before. A cache hit
+    rebuilds the results by running the Kalman smoother at the stored
+    parameters instead of re-running the optimiser.
+    """
+    model = SARIMAX(endog, exog=exog, order=order)
+    key = model_cache_key(endog, exog, order)
+    entry = load_cached_fit(key)
+    if entry is not None:
+        return model.smooth(entry['params'])
+    model_fit = model.fit(disp=False)
+    store_cached_fit(key, _cache_entry(model_fit))
+    return model_fit
+
+def _score_order_task(task):
+    """Process-pool entry point: information criteria for one (target, order)."""
+    target_df, exog_value, target_column, order = task
+    endog = target_df[target_column]
+    exog = constant_exog(exog_value, endog.index)
+    key = model_cache_key(endog, exog, order)
+    entry = load_cached_fit(key)
+    if entry is None:
+        try:
+            model_fit = SARIMAX(endog, exog=exog, order=order).fit(disp=False)
+        except (np.linalg.LinAlgError, ValueError):
+            return np.nan, np.nan
+        entry = _cache_entry(model_fit)
+        store_cached_fit(key, entry)
+    return entry['aic'], entry['bic']
+
+def select_differencing(series, candidates=ORDER_GRID['d'], alpha=UNIT_ROOT_ALPHA):
+    """
+    Smallest differencing order d among candidates after which an augmented
+    Dickey-Fuller test rejects a unit root in the series at level alpha; the
+    largest candidate if it never does. A series too short (or too flat) for
+    the test at some d keeps that d.
+    """
+    candidates = sorted(candidates)
+    values = series.dropna().to_numpy(dtype=float)
+    for d in candidates:
+        try:
+            p_value = adfuller(np.diff(values, n=d), maxlag=UNIT_ROOT_MAX_LAG, autolag=None)[1]
+        except (ValueError, np.linalg.LinAlgError):
+            return d
+        if p_value < alpha:
+            return d
+    return candidates[-1]
+
+@instrumented()
+def select_orders(economic_df, exog_value, target_columns, grid=ORDER_GRID, criterion='aic',
+                  max_workers=FORECAST_MAX_WORKERS):
+    """
+    Pick each target's (p,d,q) order from `grid` ({'p': ..., 'd': ..., 'q': ...}).
+    d is chosen first with a unit-root test (select_differencing), because
+    likelihoods of differently differenced series are not comparable; the
+    (p, q) with the lowest AIC or BIC at that d wins. Fits are spread over a
+    process pool and memoised in the model cache, so a rerun on unchanged
+    data only fits grid points that have not been seen before.
+
+    Returns:
+        A dict {target: best order} and a DataFrame of aic/bic for every fit.
     """
-    avg_tariff = new_tariff_df['tariff_charged_us'].mean()
-    return avg_tariff
+    if criterion not in ('aic', 'bic'):
+        raise ValueError(f"criterion must be 'aic' or 'bic', got {criterion!r}")
+    differencing = {target: select_differencing(economic_df[target], grid['d']) for target in target_columns}
+    keys = [(target, (p, differencing[target], q))
+            for target in target_columns for p, q in product(grid['p'], grid['q'])]
+    tasks = [(economic_df[[target]], exog_value, target, order) for target, order in keys]
+
+    if max_workers == 1:
+        results = [_score_order_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=POOL_CONTEXT) as executor:
+            results = list(executor.map(_score_order_task, tasks, chunksize=max(1, len(tasks) // 64)))
+
+    scores = pd.DataFrame({
+        'target': [target for target, _ in keys],
+        'order': [order for _, order in keys],
+        'aic': [aic for aic, _ in results],
+        'bic': [bic for _, bic in results],
+    })
+    best = scores.dropna(subset=[criterion]).sort_values(criterion, kind='stable').groupby('target').head(1)
+    best_by_target = dict(zip(best['target'], best['order']))
+    best_orders = {target: best_by_target[target] for target in target_columns if target in best_by_target}
+    return best_orders, scores
 
 def build_and_forecast_arimax(economic_df, exog_value, forecast_date, target_column, order=(1,1,0)):
     """
@@ -71,37 +210,356 @@ def build_and_forecast_arimax(economic_df, exog_value, forecast_date, target_col
     """
     endog = economic_df[target_column]
     # Create an exogenous series that is constant (the aggregated new tariff) over the historical period.
-    exog = pd.Series(exog_value, index=economic_df.index, name='new_delta_tariff')
-    model = SARIMAX(endog, exog=exog, order=order)
-    model_fit = model.fit(disp=False)
+    exog = constant_exog(exog_value, economic_df.index)
+    model_fit = fit_sarimax(endog, exog, order)
     new_exog = pd.DataFrame({'new_delta_tariff': [exog_value]}, index=[forecast_date])
     forecast = model_fit.get_forecast(steps=1, exog=new_exog)
     return forecast.predicted_mean.values[0], model_fit.summary()
 
-if __name__ == "__main__":
+def _fit_forecast_task(task):
+    """Process-pool entry point: fit one (target, order) model and forecast it."""
+    target_df, exog_value, forecast_date, target_column, order = task
+    forecast, summary = build_and_forecast_arimax(target_df, exog_value, forecast_date, target_column, order)
+    return forecast, summary.as_text()
+
+@instrumented()
+def forecast_targets(economic_df, exog_value, forecast_date, target_columns, orders=((1,1,0),),
+                     max_workers=FORECAST_MAX_WORKERS):
+    """
+    Fit build_and_forecast_arimax for every (target, order) combination in a
+    process pool and gather the results in a deterministic order.
+
+    Parameters:
+        economic_df   : DataFrame with a DateTimeIndex containing the target columns.
+        exog_value    : The aggregated new tariff measure passed to every fit.
+        forecast_date : A DateTime index value for the forecast period.
+        target_columns: The delta columns to forecast.
+        orders        : The (p,d,q) orders to fit for each target, or a dict
+                        {target: order or list of orders} (e.g. from select_orders).
+        max_workers   : Number of worker processes (None = one per CPU, 1 = run in-process).
+
+    Returns:
+        A DataFrame with one row per (target, order) in input order holding the
+        forecasted value, and a dict of model summaries (text) keyed by (target, order).
+    """
+    if isinstance(orders, dict):
+        per_target = {
+            target: [orders[target]] if isinstance(orders[target][0], int) else orders[target]
+            for target in target_columns
+        }
+    else:
+        per_target = {target: orders for target in target_columns}
+    keys = [(target, tuple(order)) for target in target_columns for order in per_target[target]]
+    # Ship only the column each fit needs to the worker.
+    tasks = [(economic_df[[target]], exog_value, forecast_date, target, order) for target, order in keys]
+
+    if max_workers == 1:
+        results = [_fit_forecast_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=POOL_CONTEXT) as executor:
+            results = list(executor.map(_fit_forecast_task, tasks))
+
+    forecasts_df = pd.DataFrame({
+        'target': [target for target, _ in keys],
+        'order': [order for _, order in keys],
+        'forecast': [forecast for forecast, _ in results],
+    })
+    summaries = {key: summary for key, (_, summary) in zip(keys, results)}
+    return forecasts_df, summaries
+
+def build_tariff_scenarios(new_tariff_df, shocks_bps=SCENARIO_SHOCKS_BPS, baseline_rate=None):
+    """
+    Build a named set of tariff-rate scenarios (percent) from the new_tariffs
+    schedule: the average charged and discounted rates and every country's
+    charged and discounted rate, each shifted by every shock in basis points.
+
+    The schedule's rates are far above the historical average tariff the
+    models are fitted on. Pass baseline_rate (e.g. the last historical
+    rate) to add 'current' scenarios, the shocks applied to that rate, which
+    stay on the historical scale.
+
+    Returns:
+        A Series of scenario rates indexed by names such as 'China:charged:+50bps'.
+    """
+    base_names = [] if baseline_rate is None else ['current']
+    base_names += ['average:charged', 'average:discounted']
+    base_names += [f"{country}:charged" for country in new_tariff_df['country']]
+    base_names += [f"{country}:discounted" for country in new_tariff_df['country']]
+    base_rates = np.concatenate([
+        [] if baseline_rate is None else [baseline_rate],
+        [new_tariff_df['tariff_charged_us'].mean(), new_tariff_df['usa_discounted_tariff'].mean()],
+        new_tariff_df['tariff_charged_us'].to_numpy(dtype=float),
+        new_tariff_df['usa_discounted_tariff'].to_numpy(dtype=float),
+    ])
+    shocks = np.asarray(shocks_bps, dtype=float)
+    rates = (base_rates[:, None] + shocks[None, :] / 100.0).ravel()
+    names = [f"{name}:{int(shock):+d}bps" for name in base_names for shock in shocks]
+    return pd.Series(rates, index=pd.Index(names, name='scenario'), name='tariff_rate')
+
+def fit_history(economic_df, target, exog_column):
+    """
+    The rows of target and exog_column a scenario model is fitted on, with a
+    positional index: statsmodels cannot forecast from a date index without a
+    frequency, which a missing year takes away.
+    """
+    return economic_df[[target, exog_column]].dropna().reset_index(drop=True)
+
+def within_fitted_range(rates, history_exog, label='scenario'):
+    """
+    Boolean mask of the tariff rates inside the range of the historical tariff
+    measure a model was fitted on, warning about the ones outside it.
+
+    The tariff effect is estimated as a single linear coefficient over that
+    range only; a rate outside it would be a linear extrapolation the data
+    says nothing about.
+    """
+    low, high = history_exog.min(), history_exog.max()
+    rates = np.asarray(rates, dtype=float)
+    inside = (rates >= low) & (rates <= high)
+    if not inside.all():
+        logger.warning("%d of %d %s rates fall outside the fitted tariff range [%.2f%%, %.2f%%]; "
+                       "their forecasts are left empty.", (~inside).sum(), inside.size, label, low, high)
+    return inside
+
+@instrumented()
+def forecast_scenarios(economic_df, scenario_rates, target_columns, exog_column=SCENARIO_EXOG_COLUMN,
+                       orders=(1,1,0), alpha=0.05):
+    """
+    Forecast every target one step ahead under many tariff scenarios at once.
+
+    Each target is fitted a single time (through the model cache) with the
+    historical tariff measure `exog_column` as regressor. The regression enters
+    the observation equation, so the forecast mean is linear in the future
+    tariff rate and its variance does not depend on it: one forecast at a zero
+    rate plus beta * rate gives every scenario in a single vectorized step.
+
+    That forecast assumes the tariff effect is linear, and it is only
+    estimated over the historical range of exog_column. Scenarios with a rate
+    outside that range are rejected with a warning: their forecast and
+    interval are NaN.
+
+    Parameters:
+        economic_df   : DataFrame with a DateTimeIndex, the target columns and exog_column.
+        scenario_rates: Series (indexed by scenario name) or array of tariff rates in percent.
+        target_columns: The delta columns to forecast.
+        orders        : The (p,d,q) order for every target, or a dict {target: order}.
+        alpha         : Significance level of the confidence intervals.
+
+    Returns:
+        A DataFrame indexed by scenario with (target, 'forecast'|'lower'|'upper') columns.
+    """
+    if not isinstance(scenario_rates, pd.Series):
+        scenario_rates = pd.Series(np.asarray(scenario_rates, dtype=float), name='tariff_rate')
+        scenario_rates.index.name = 'scenario'
+    rates = scenario_rates.to_numpy(dtype=float)
+    rates = np.where(within_fitted_range(rates, economic_df[exog_column].dropna()), rates, np.nan)
+    z = norm.ppf(1 - alpha / 2)
+
+    columns = {}
+    for target in target_columns:
+        order = orders[target] if isinstance(orders, dict) else orders
+        history = fit_history(economic_df, target, exog_column)
+        model_fit = fit_sarimax(history[target], history[exog_column], order)
+        base = model_fit.get_forecast(steps=1, exog=np.zeros((1, 1)))
+        mean = base.predicted_mean.iloc[0] + model_fit.params[exog_column] * rates
+        half_width = z * base.se_mean.iloc[0]
+        columns[(target, 'forecast')] = mean
+        columns[(target, 'lower')] = mean - half_width
+        columns[(target, 'upper')] = mean + half_width
+
+    return pd.DataFrame(columns, index=scenario_rates.index)
+
+def phase_in_paths(scenario_rates, horizon, start_rate, phase_years=1):
+    """
+    Exog path matrix (horizon x scenario) for phased tariff schedules: every
+    scenario moves linearly from start_rate to its own rate over phase_years
+    and holds it for the rest of the horizon.
+
+    Returns:
+        A DataFrame indexed by horizon (1..horizon) with one column per scenario.
+    """
+    if not isinstance(scenario_rates, pd.Series):
+        scenario_rates = pd.Series(np.asarray(scenario_rates, dtype=float), name='tariff_rate')
+    phase = np.minimum(np.arange(1, horizon + 1) / max(phase_years, 1), 1.0)
+    rates = scenario_rates.to_numpy(dtype=float)
+    paths = start_rate + phase[:, None] * (rates[None, :] - start_rate)
+    return pd.DataFrame(paths, index=pd.RangeIndex(1, horizon + 1, name='horizon'),
+                        columns=scenario_rates.index.astype(str))
+
+def _path_forecast_task(task):
+    """Process-pool entry point: zero-exog forecast path and exog coefficient for one target."""
+    history, target, exog_column, order, horizon = task
+    model_fit = fit_sarimax(history[target], history[exog_column], order)
+    base = model_fit.get_forecast(steps=horizon, exog=np.zeros((horizon, 1)))
+    return base.predicted_mean.to_numpy(), base.se_mean.to_numpy(), model_fit.params[exog_column]
+
+@instrumented()
+def forecast_paths(economic_df, exog_paths, target_columns, exog_column=SCENARIO_EXOG_COLUMN,
+                   orders=(1,1,0), alpha=0.05, max_workers=FORECAST_MAX_WORKERS):
+    """
+    Forecast every target over a multi-year horizon under many tariff paths.
+
+    exog_paths is a (horizon x scenario) matrix of future tariff rates (e.g.
+    from phase_in_paths). Each target is fitted once (through the model cache)
+    and forecast once over the full horizon at a zero rate. The regression
+    enters the observation equation, so the forecast for step h under a path
+    is that baseline plus beta * rate_h, and the interval width does not
+    depend on the path: all scenarios follow from one broadcast.
+
+    As in forecast_scenarios, the tariff effect is assumed linear and is only
+    estimated over the historical range of exog_column; path rates outside
+    that range are rejected with a warning and their rows hold NaN forecasts.
+
+    Parameters:
+        economic_df   : DataFrame with a DateTimeIndex, the target columns and exog_column.
+        exog_paths    : DataFrame (index = horizon, columns = scenario names) or 2-D array.
+        target_columns: The delta columns to forecast.
+        orders        : The (p,d,q) order for every target, or a dict {target: order}.
+        alpha         : Significance level of the confidence intervals.
+        max_workers   : Number of worker processes (None = one per CPU, 1 = run in-process).
+
+    Returns:
+        A long DataFrame with target, scenario, horizon, forecast_year,
+        tariff_rate, forecast, lower and upper columns.
+    """
+    if not isinstance(exog_paths, pd.DataFrame):
+        exog_paths = pd.DataFrame(np.asarray(exog_paths, dtype=float))
+        exog_paths.index = pd.RangeIndex(1, len(exog_paths) + 1, name='horizon')
+    rates = exog_paths.to_numpy(dtype=float)
+    rates = np.where(within_fitted_range(rates, economic_df[exog_column].dropna(), 'path'), rates, np.nan)
+    horizon, n_scenarios = rates.shape
+    z = norm.ppf(1 - alpha / 2)
+
+    tasks = []
+    for target in target_columns:
+        order = orders[target] if isinstance(orders, dict) else orders
+        tasks.append((fit_history(economic_df, target, exog_column), target, exog_column, order, horizon))
+    if max_workers == 1:
+        results = [_path_forecast_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=POOL_CONTEXT) as executor:
+            results = list(executor.map(_path_forecast_task, tasks))
+
+    last_year = economic_df.index[-1].year
+    frames = []
+    for target, (mean0, se, beta) in zip(target_columns, results):
+        mean = mean0[:, None] + beta * rates
+        half_width = (z * se)[:, None]
+        frames.append(pd.DataFrame({
+            'target': target,
+            'scenario': np.tile(exog_paths.columns.astype(str), horizon),
+            'horizon': np.repeat(np.arange(1, horizon + 1), n_scenarios),
+            'forecast_year': np.repeat(last_year + np.arange(1, horizon + 1), n_scenarios),
+            'tariff_rate': rates.ravel(),
+            'forecast': mean.ravel(),
+            'lower': (mean - half_width).ravel(),
+            'upper': (mean + half_width).ravel(),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+def store_forecasts(forecasts_df, run_id=None, runs_kept=FORECAST_RUNS_KEPT):
+    """
+    Append forecast_paths output to the 'forecasts' table under run_id
+    (default: a UTC timestamp) and delete all but the latest runs_kept runs.
+    """
+    run_id = run_id or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S.%fZ')
+    create_tables(get_connection())
+    store_dataframe(forecasts_df.assign(run_id=run_id), 'forecasts', if_exists='upsert')
+    with get_connection() as conn:
+        pruned = conn.execute("""
+            DELETE FROM forecasts
+            WHERE run_id NOT IN (SELECT DISTINCT run_id FROM forecasts ORDER BY run_id DESC LIMIT ?)
+        """, (runs_kept,)).rowcount
+        if pruned:
+            bump_table_version(conn, "forecasts")
+    logger.info("Stored %d forecasts in 'forecasts' (run_id=%s).", len(forecasts_df), run_id)
+    return run_id
+
+def load_forecasts(run_id=None, target=None, scenario=None):
+    """
+    Read precomputed forecasts from the 'forecasts' table, by default from the
+    latest run, optionally for one target and/or scenario.
+    """
+    query = """
+    SELECT *
+    FROM forecasts
+    WHERE run_id = COALESCE(?, (SELECT MAX(run_id) FROM forecasts))
+      AND target = COALESCE(?, target)
+      AND scenario = COALESCE(?, scenario)
+    ORDER BY target, scenario, horizon
+    """
+    return fetch_query(query, params=(run_id, target, scenario))
+
+@instrumented()
+def run_path_forecasts(horizon=PATH_HORIZON_YEARS, phase_years=PATH_PHASE_YEARS, shocks_bps=SCENARIO_SHOCKS_BPS,
+                       run_id=None):
+    """
+    Precompute multi-year forecasts of every target for the new tariff
+    schedule and store them in the 'forecasts' table, so readers use
+    load_forecasts instead of refitting.
+
+    Every scenario of build_tariff_scenarios (the average and per-country
+    charged and discounted rates, shifted by shocks_bps) is phased in linearly
+    from the last historical tariff rate over phase_years and held for the rest
+    of the horizon (see phase_in_paths), next to 'current' scenarios that shock
+    the last historical rate itself. Rows whose rate falls outside the fitted
+    tariff range are not stored. Returns the run_id, or None when there is no
+    economic impact data to fit on.
+    """
+    economic_df = compute_deltas(load_economic_impact())
+    if economic_df.empty:
+        logger.warning("No economic impact data; skipping the path forecasts.")
+        return None
+    start_rate = economic_df[SCENARIO_EXOG_COLUMN].iloc[-1]
+    scenario_rates = build_tariff_scenarios(load_new_tariffs(), shocks_bps=shocks_bps, baseline_rate=start_rate)
+    paths = phase_in_paths(scenario_rates, horizon, start_rate, phase_years=phase_years)
+    forecasts_df = forecast_paths(economic_df, paths, TARGET_DELTAS).dropna(subset=['forecast'])
+    return store_forecasts(forecasts_df, run_id=run_id)
+
+@instrumented()
+def run_forecast(show=False, weighting='imports'):
+    """
+    Forecast next year's macro deltas under the aggregated new tariff: select
+    each target's order, fit and forecast in parallel, and save a 2x2 panel of
+    the history and forecasts to OUTPUT_PATH. Returns the forecasts DataFrame.
+
+    weighting='imports' weights each country's new tariff by US imports from it
+    (the 'tariff_exposure' table), falling back to a plain average if the table
+    is empty; weighting='equal' always uses the plain average. Returns None
+    when there is no economic impact data to fit on.
+    """
     # STEP 1: Load historical economic impact data and compute deltas.
     economic_df = load_economic_impact()
     economic_df = compute_deltas(economic_df)
+    if economic_df.empty:
+        logger.warning("No economic impact data; skipping the forecast.")
+        return None
     
     # STEP 2: Load new tariff data and aggregate the tariff measure.
     new_tariff_df = load_new_tariffs()
-    aggregated_new_tariff = aggregate_new_tariff(new_tariff_df)
-    print("Aggregated New Tariff (avg of tariff_charged_us):", aggregated_new_tariff)
+    weights = exposure_weights() if weighting == 'imports' else None
+    if weights is not None and weights.empty:
+        weights = None
+    aggregated_new_tariff = aggregate_new_tariff(new_tariff_df, weights)
+    label = "import-weighted" if weights is not None else "avg"
+    logger.info("Aggregated New Tariff (%s of tariff_charged_us): %s", label, aggregated_new_tariff)
     
     # STEP 3: Define forecast date (one year after the latest available date).
     last_year = economic_df.index[-1].year
     forecast_date = pd.to_datetime(str(last_year + 1), format='%Y')
     
     # STEP 4: Define the delta variables to forecast.
-    target_deltas = ['delta_GDP', 'cpi_delta', 'unemployment_delta', 'industrial_delta']
+    target_deltas = TARGET_DELTAS
     
-    forecasts = {}
-    summaries = {}
+    # Choose each target's (p,d,q) by AIC, then forecast with it. Each target is
+    # fitted independently, so the fits run in parallel and are cached on disk.
+    best_orders, _ = select_orders(economic_df, aggregated_new_tariff, target_deltas)
+    logger.info("Selected orders: %s", best_orders)
+    forecasts_df, summaries = forecast_targets(economic_df, aggregated_new_tariff, forecast_date, target_deltas,
+                                               orders=best_orders)
+    forecasts = dict(zip(forecasts_df['target'], forecasts_df['forecast']))
     for target in target_deltas:
-        fc, summary = build_and_forecast_arimax(economic_df, aggregated_new_tariff, forecast_date, target)
-        forecasts[target] = fc
-        summaries[target] = summary
-        print("Forecasted {} for {}: {:.2f}".format(target, forecast_date.year, fc))
+        logger.info("Forecasted %s for %d: %.2f", target, forecast_date.year, forecasts[target])
     
     # STEP 5: Create a multi-panel (2x2) plot for the historical delta series and forecasts.
     fig, axes = plt.subplots(2, 2, figsize=(12, 8), sharex=True)
@@ -127,4 +585,12 @@ if __name__ == "__main__":
     # Save the multi-panel figure to the outputs folder.
     save_path = os.path.join(OUTPUT_PATH, "SARIMAX_ECONOMIC_FORECAST.png")
     plt.savefig(save_path)
-    plt.show()
+    if show:
+        plt.show()
+    else:
+        plt.close(fig)
+    return forecasts_df
+
+if __name__ == "__main__":
+    configure_logging()
+    run_forecast(show=True)
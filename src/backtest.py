@@ -0,0 +1,126 @@
+import logging
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from src.db_utils import get_connection, store_dataframe
+from src.instrumentation import configure_logging, instrumented
+from src.schema import create_tables
+from src.SARIMAX_model import (
+    FORECAST_MAX_WORKERS, POOL_CONTEXT, SCENARIO_EXOG_COLUMN, TARGET_DELTAS,
+    compute_deltas, fit_sarimax, load_economic_impact,
+)
+
+logger = logging.getLogger(__name__)
+
+# First forecast origin and the minimum history a model is fitted on.
+BACKTEST_START_YEAR = 1996
+MIN_TRAIN_OBS = 8
+
+def _backtest_task(task):
+    """
+    Process-pool entry point: walk one target forward through a block of
+    origin years. The model is fitted once at the first usable origin; every
+    later origin extends the filtered state with the newly observed years
+    (parameters held fixed) instead of refitting.
+    """
+    history, target, exog_column, order, origins, max_horizon = task
+    years = history.index.year
+    # A positional index keeps extend/forecast valid even if years are missing.
+    history = history.reset_index(drop=True)
+    endog = history[target]
+    exog = history[[exog_column]]
+
+    rows = []
+    model_fit = None
+    position = 0  # number of observations the model state has absorbed
+    for origin in origins:
+        n_upto = int((years <= origin).sum())
+        if n_upto < MIN_TRAIN_OBS:
+            continue
+        if model_fit is None:
+            model_fit = fit_sarimax(endog.iloc[:n_upto], exog.iloc[:n_upto], order)
+        elif n_upto > position:
+            model_fit = model_fit.extend(endog.iloc[position:n_upto], exog=exog.iloc[position:n_upto])
+        position = n_upto
+
+        steps = min(max_horizon, len(endog) - position)
+        if steps <= 0:
+            break
+        # Forecasts are conditional on the tariff measure actually observed.
+        forecast = model_fit.get_forecast(steps=steps, exog=exog.iloc[position:position + steps])
+        predicted = forecast.predicted_mean.to_numpy()
+        actual = endog.iloc[position:position + steps].to_numpy()
+        for h in range(steps):
+            rows.append((target, int(origin), h + 1, int(years[position + h]), predicted[h], actual[h]))
+    return rows
+
+def summarize_backtest(results_df):
+    """MAE, RMSE and number of forecasts per target and horizon."""
+    errors = results_df.assign(abs_error=results_df['error'].abs(), sq_error=results_df['error'] ** 2)
+    summary = errors.groupby(['target', 'horizon']).agg(
+        mae=('abs_error', 'mean'), mse=('sq_error', 'mean'), n_forecasts=('error', 'size')
+    ).reset_index()
+    summary['rmse'] = np.sqrt(summary.pop('mse'))
+    return summary[['target', 'horizon', 'mae', 'rmse', 'n_forecasts']]
+
+@instrumented()
+def run_backtest(economic_df=None, target_columns=TARGET_DELTAS, exog_column=SCENARIO_EXOG_COLUMN,
+                 orders=(1,1,0), max_horizon=1, start_year=BACKTEST_START_YEAR, origin_blocks=1,
+                 max_workers=FORECAST_MAX_WORKERS, store=True):
+    """
+    Rolling-origin (walk-forward) backtest of the SARIMAX forecasts.
+
+    For every origin year from `start_year` to the second-to-last year, each
+    target is forecast 1..max_horizon years ahead using only data up to the
+    origin, and compared with the realised value. Targets, and blocks of
+    origins within a target (`origin_blocks`), run in parallel; each block
+    fits once and then extends its state year by year.
+
+    Parameters:
+        economic_df   : DataFrame as returned by compute_deltas (loaded if None).
+        target_columns: The delta columns to backtest.
+        exog_column   : Historical tariff measure used as regressor.
+        orders        : The (p,d,q) order for every target, or a dict {target: order}.
+        max_workers   : Number of worker processes (None = one per CPU, 1 = run in-process).
+        store         : Append the results to the 'backtest_results' table.
+
+    Returns:
+        The per-forecast results and a MAE/RMSE summary per target and horizon.
+    """
+    if economic_df is None:
+        economic_df = compute_deltas(load_economic_impact())
+    run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S.%fZ')
+
+    tasks = []
+    for target in target_columns:
+        history = economic_df[[target, exog_column]].dropna()
+        order = orders[target] if isinstance(orders, dict) else orders
+        origins = [year for year in history.index.year.unique() if year >= start_year][:-1]
+        for block in np.array_split(np.asarray(origins), max(1, min(origin_blocks, len(origins)))):
+            if len(block):
+                tasks.append((history, target, exog_column, order, block.tolist(), max_horizon))
+
+    if max_workers == 1:
+        task_rows = [_backtest_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=POOL_CONTEXT) as executor:
+            task_rows = list(executor.map(_backtest_task, tasks))
+
+    results_df = pd.DataFrame(
+        [row for rows in task_rows for row in rows],
+        columns=['target', 'origin_year', 'horizon', 'forecast_year', 'forecast', 'actual'],
+    )
+    results_df['error'] = results_df['forecast'] - results_df['actual']
+    results_df.insert(0, 'run_id', run_id)
+
+    if store:
+        create_tables(get_connection())
+        store_dataframe(results_df, 'backtest_results', if_exists='append')
+        logger.info("Stored %d backtest forecasts in 'backtest_results' (run_id=%s).", len(results_df), run_id)
+    return results_df, summarize_backtest(results_df)
+
+if __name__ == "__main__":
+    configure_logging()
+    _, summary = run_backtest()
+    logger.info("Backtest accuracy:\n%s", summary)
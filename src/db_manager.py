@@ -1,25 +1,31 @@
+import logging
 import sqlite3
-from src.config import DB_PATH
+from src.db_utils import configure_connection, get_connection
+from src.instrumentation import configure_logging
 from src.schema import create_tables
 
+logger = logging.getLogger(__name__)
+
 def create_connection(db_file):
-    """Create a database connection to the SQLite database specified by db_file."""
+    """
+    Create a database connection to the SQLite database specified by db_file,
+    configured like the shared connections from db_utils.get_connection().
+    """
     conn = None
     try:
-        conn = sqlite3.connect(db_file)
+        conn = configure_connection(sqlite3.connect(db_file, timeout=30))
         return conn
     except sqlite3.Error as e:
-        print(e)
+        logger.error("Could not open %s: %s", db_file, e)
     return conn
 
 def initialize_database():
     """Initialize the database and create required tables."""
-    conn = sqlite3.connect(DB_PATH)
-    create_tables(conn)
-    conn.close()
+    create_tables(get_connection())
 
 if __name__ == "__main__":
+    configure_logging()
     initialize_database()
-    print("Database initialized and tables created.")
+    logger.info("Database initialized and tables created.")
 
 
@@ -1,17 +1,197 @@
+import os
+import atexit
 import sqlite3
-import pandas as pd
+import time
+import threading
 from src.config import DB_PATH
+from src.instrumentation import record_query, record_rows
+from src.schema import table_exists, primary_key_columns, bump_table_version
+
+# Applied once to every connection handed out by get_connection(). WAL lets
+# readers (visuals, forecasting) proceed while a writer commits, and
+# busy_timeout makes a blocked writer wait instead of failing with
+# "database is locked".
+CONNECTION_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -65536,        # negative = KiB, i.e. a 64 MiB page cache
+    "mmap_size": 268435456,      # 256 MiB
+    "temp_store": "MEMORY",
+    "busy_timeout": 30000,       # milliseconds
+}
+
+_local = threading.local()
+_open_connections = {}  # connection -> pid of the process that opened it
+_connections_lock = threading.Lock()
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor that credits every statement it executes, and the time spent
+    executing and fetching it, to the active instrumentation measurements.
+    Rows read by iterating the cursor are not timed, only fetch*() calls.
+    """
+    def _timed(self, method, *args, statements=1):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            record_query(time.perf_counter() - start, statements=statements)
+
+    def execute(self, sql, parameters=()):
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self._timed(super().executescript, sql_script)
+
+    def fetchone(self):
+        return self._timed(super().fetchone, statements=0)
+
+    def fetchmany(self, size=None):
+        args = () if size is None else (size,)
+        return self._timed(super().fetchmany, *args, statements=0)
+
+    def fetchall(self):
+        return self._timed(super().fetchall, statements=0)
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    Connection whose cursors, including the ones behind conn.execute() and
+    pandas, are InstrumentedCursors, so every statement is counted whichever
+    module runs it.
+    """
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+def configure_connection(conn):
+    """Apply CONNECTION_PRAGMAS to a sqlite3 connection and return it."""
+    for name, value in CONNECTION_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
 
 def get_connection():
-    """Return a connection to the SQLite database."""
-    return sqlite3.connect(DB_PATH)
+    """
+    Return this thread's reusable connection to the SQLite database, opening
+    and configuring it on first use. Connections are never shared across
+    threads, and a forked worker process opens its own.
+    Use `with get_connection() as conn:` for a transaction; do not close it.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.pid != os.getpid() or _local.path != DB_PATH:
+        conn = configure_connection(sqlite3.connect(DB_PATH, timeout=30, factory=InstrumentedConnection))
+        _local.conn = conn
+        _local.pid = os.getpid()
+        _local.path = DB_PATH
+        with _connections_lock:
+            _open_connections[conn] = _local.pid
+    return conn
+
+def set_db_path(path):
+    """
+    Point this process at another database file (e.g. a throwaway benchmark
+    database). Each thread reconnects on its next get_connection() call.
+    """
+    global DB_PATH
+    DB_PATH = path
+    close_connection()
+
+def close_connection():
+    """Close the calling thread's connection, if it has one."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.pid == os.getpid():
+        with _connections_lock:
+            _open_connections.pop(conn, None)
+        conn.close()
+    _local.conn = None
+
+@atexit.register
+def close_all_connections():
+    """
+    Close every connection opened by this process. Connections inherited
+    through fork are left alone; closing them could disturb the parent's locks.
+    """
+    pid = os.getpid()
+    with _connections_lock:
+        connections = [conn for conn, owner in _open_connections.items() if owner == pid]
+        _open_connections.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.ProgrammingError:
+            # Connections belonging to other threads can only be closed by them.
+            pass
+    _local.conn = None
+
+def _upsert_method(conflict_columns):
+    """
+    Build a pandas.to_sql insertion method that upserts on conflict_columns,
+    updating every other inserted column from the incoming row.
+    """
+    def upsert(table, conn, keys, data_iter):
+        columns = ", ".join(f'"{key}"' for key in keys)
+        placeholders = ", ".join("?" * len(keys))
+        conflict = ", ".join(f'"{col}"' for col in conflict_columns)
+        updates = ", ".join(f'"{key}" = excluded."{key}"' for key in keys if key not in conflict_columns)
+        action = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+        sql = (f'INSERT INTO "{table.name}" ({columns}) VALUES ({placeholders}) '
+               f'ON CONFLICT ({conflict}) {action}')
+        conn.executemany(sql, list(data_iter))
+    return upsert
+
+def store_dataframe(df, table_name, if_exists='append', conflict_columns=None):
+    """
+    Store a pandas DataFrame in the specified table without touching its schema.
+
+    if_exists:
+        'append'  - insert the rows.
+        'replace' - delete the existing rows, then insert (the table definition,
+                    keys and indexes are kept).
+        'upsert'  - insert, updating rows that collide on conflict_columns
+                    (defaults to the table's primary key).
+    Tables that do not exist yet are created by pandas from the DataFrame.
+    The written rows are credited to the active instrumentation measurements.
+    """
+    if if_exists not in ('append', 'replace', 'upsert'):
+        raise ValueError(f"Unsupported if_exists mode: {if_exists!r}")
+    _write_dataframe(df, table_name, if_exists, conflict_columns)
+    record_rows(rows_out=len(df))
 
-def store_dataframe(df, table_name, if_exists='replace'):
-    """Store a pandas DataFrame in the specified table."""
+def _write_dataframe(df, table_name, if_exists, conflict_columns):
     with get_connection() as conn:
-        df.to_sql(table_name, conn, index=False, if_exists=if_exists)
+        if not table_exists(conn, table_name):
+            df.to_sql(table_name, conn, index=False)
+            bump_table_version(conn, table_name)
+            return
+        method = None
+        if if_exists == 'replace':
+            conn.execute(f'DELETE FROM "{table_name}"')
+        elif if_exists == 'upsert':
+            conflict_columns = conflict_columns or primary_key_columns(conn, table_name)
+            if not conflict_columns:
+                raise ValueError(f"Table '{table_name}' has no primary key; pass conflict_columns to upsert.")
+            method = _upsert_method(conflict_columns)
+        df.to_sql(table_name, conn, index=False, if_exists='append', method=method)
+        bump_table_version(conn, table_name)
 
-def fetch_query(query):
-    """Fetch data from the database as a pandas DataFrame."""
+def fetch_query(query, params=None):
+    """
+    Fetch data from the database as a pandas DataFrame. The result rows are
+    credited to the active instrumentation measurements.
+    """
+    # Imported here so lightweight callers (e.g. the CLI status command) do not pay for pandas.
+    import pandas as pd
     with get_connection() as conn:
-        return pd.read_sql(query, conn)
+        df = pd.read_sql(query, conn, params=params)
+    record_rows(rows_in=len(df))
+    return df
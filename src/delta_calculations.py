@@ -1,102 +1,438 @@
 import os
+import logging
 import numpy as np
 import pandas as pd
-import statsmodels.api as sm
-from src.db_utils import fetch_query, store_dataframe
+from src.db_utils import fetch_query, store_dataframe, get_connection
+from src.instrumentation import configure_logging, instrumented, record_rows
+from src.macro_store import MACRO_SERIES, load_annual_macro
+from src.regression import fit_batched_ols, regression_table
+from src.schema import bump_table_version, create_tables, table_exists
 
-def calculate_economic_impact():
+logger = logging.getLogger(__name__)
+
+# Yearly tariff measure and trade totals from the fact tables. A year is kept
+# only if it has applied, imports and exports rows, matching an inner join of
+# the three per-type aggregates. TOTAL() returns 0.0 rather than NULL for a
+# year whose values are all missing, like a pandas groupby sum. {year_filter}
+# optionally restricts both fact tables to some years.
+TARIFF_AGGREGATES_SQL = """
+WITH applied AS (
+    SELECT year, AVG(trade_weighted) AS avg_tariff_rate
+    FROM applied_rates
+    {year_filter}
+    GROUP BY year
+), trade AS (
+    SELECT
+        year,
+        TOTAL(CASE WHEN data_type = 'imports' THEN value END) AS imports_value,
+        TOTAL(CASE WHEN data_type = 'exports' THEN value END) AS exports_value
+    FROM trade_flows
+    {year_filter}
+    GROUP BY year
+    HAVING SUM(data_type = 'imports') > 0
+       AND SUM(data_type = 'exports') > 0
+)
+SELECT year, applied.avg_tariff_rate, trade.imports_value, trade.exports_value
+FROM applied
+JOIN trade USING (year)
+ORDER BY year
+"""
+
+def aggregate_tariffs_by_year(years=None):
+    """
+    Aggregates the tariff store to one row per year with the average
+    trade-weighted applied tariff rate and total imports and exports values,
+    optionally for some years only (read through the fact tables' year
+    indexes). Only the aggregated rows are transferred out of SQLite.
+    """
+    year_filter, params = "", ()
+    if years is not None:
+        years = [int(year) for year in years]
+        year_filter = f"WHERE year IN ({', '.join('?' * len(years))})"
+        params = tuple(years) * 2
+    analysis_df = fetch_query(TARIFF_AGGREGATES_SQL.format(year_filter=year_filter), params=params)
+    analysis_df['year'] = analysis_df['year'].astype(int)
+    return analysis_df
+
+# Dimensions supported by calculate_partner_impact: (dimension table, key
+# column, code column, name column, whether applied_rates carries the key).
+IMPACT_LEVELS = {
+    'partner': ('partners', 'partner_id', 'partner_code', 'partner_name', False),
+    'product': ('products', 'product_id', 'product_code', None, True),
+}
+
+# Codes aggregated per SQL query in calculate_partner_impact. Each batch holds
+# whole code histories, so memory is bounded by batch size x years.
+PARTNER_BATCH_SIZE = 500
+
+MACRO_LEVEL_COLUMNS = ['GDP', 'CPI', 'Unemployment_Rate', 'Industrial_Production']
+MACRO_DELTA_COLUMNS = {
+    'GDP': 'delta_GDP',
+    'CPI': 'cpi_delta',
+    'Unemployment_Rate': 'unemployment_delta',
+    'Industrial_Production': 'industrial_delta',
+}
+
+def has_macro_observations(conn):
+    """Whether any macro observation has been fetched into 'macro_observations'."""
+    return (table_exists(conn, "macro_observations")
+            and conn.execute("SELECT 1 FROM macro_observations LIMIT 1").fetchone() is not None)
+
+def load_macro_levels(years=None):
+    """
+    Annual macro levels (first observation of each year), one row per year with
+    'year' and the MACRO_LEVEL_COLUMNS, optionally for some years only, read
+    from the raw 'macro_observations'. Databases from before that table existed
+    only hold the annual levels recovered into 'legacy_macro_levels' by the
+    schema migration, which are read instead until observations are fetched.
+    """
+    if not has_macro_observations(get_connection()):
+        macro_df = fetch_query(f"SELECT year, {', '.join(MACRO_LEVEL_COLUMNS)} FROM legacy_macro_levels ORDER BY year")
+        if years is not None:
+            macro_df = macro_df[macro_df['year'].isin([int(year) for year in years])]
+    elif years is None:
+        macro_df = load_annual_macro(how='first')
+    else:
+        years = sorted(int(year) for year in years)
+        macro_df = load_annual_macro(how='first', start=f"{years[0]}-01-01", end=f"{years[-1]}-12-31")
+        macro_df = macro_df[macro_df['year'].isin(years)]
+    return macro_df.drop_duplicates(subset='year')
+
+def aggregate_tariffs_by_code(level, codes):
+    """
+    Aggregates the tariff store to one row per code and year for the given
+    codes of `level` ('partner' or 'product'): average trade-weighted applied
+    tariff rate and imports and exports totals. A measure with no rows for a
+    code and year is left missing rather than zero.
+
+    The codes are resolved to surrogate keys in the dimension table, so the
+    fact tables are read through their (key, year) indexes.
     """
-    Loads tariff data from the 'tariffs' table and macro data (CPI, Unemployment_Rate, 
-    Industrial_Production, GDP) from the 'economic_impact' table (previously loaded).
-    It then:
-      - Aggregates tariff data (average tariff rate from applied data, total imports and exports).
-      - Merges the tariff aggregates with the macro data on year.
-      - Computes year-to-year differences (deltas) for:
+    table, key_column, code_column, name_column, in_applied = IMPACT_LEVELS[level]
+    placeholders = ", ".join("?" * len(codes))
+    keys = f"SELECT {key_column} FROM {table} WHERE {code_column} IN ({placeholders})"
+    facts = f"""
+        SELECT {key_column}, year, NULL AS trade_weighted,
+               CASE WHEN data_type = 'imports' THEN value END AS imports_value,
+               CASE WHEN data_type = 'exports' THEN value END AS exports_value
+        FROM trade_flows
+        WHERE {key_column} IN ({keys})
+    """
+    params = tuple(codes)
+    if in_applied:
+        facts += f"""
+        UNION ALL
+        SELECT {key_column}, year, trade_weighted, NULL, NULL
+        FROM applied_rates
+        WHERE {key_column} IN ({keys})
+        """
+        params += tuple(codes)
+    name_expr = f"MAX(d.{name_column})" if name_column else "NULL"
+    query = f"""
+    SELECT
+        d.{code_column} AS code,
+        {name_expr} AS name,
+        f.year,
+        AVG(f.trade_weighted) AS avg_tariff_rate,
+        SUM(f.imports_value) AS imports_value,
+        SUM(f.exports_value) AS exports_value
+    FROM ({facts}) f
+    JOIN {table} d ON d.{key_column} = f.{key_column}
+    GROUP BY d.{code_column}, f.year
+    ORDER BY d.{code_column}, f.year
+    """
+    code_df = fetch_query(query, params=params)
+    code_df['year'] = code_df['year'].astype(int)
+    return code_df
+
+def compute_code_deltas(code_df):
+    """
+    Year-to-year deltas for every code at once with one grouped diff. code_df
+    must be sorted by code and year. A delta is only kept between consecutive
+    years, so a gap in a partner's history does not produce a multi-year change.
+    """
+    measures = ['avg_tariff_rate', 'imports_value', 'exports_value', 'year']
+    diffs = code_df.groupby('code', sort=False)[measures].diff()
+    consecutive = diffs['year'] == 1
+    code_df['delta_tariff'] = diffs['avg_tariff_rate'].where(consecutive) * 100  # in bps
+    code_df['delta_imports'] = diffs['imports_value'].where(consecutive) / 1e9   # in billions USD
+    code_df['delta_exports'] = diffs['exports_value'].where(consecutive) / 1e9   # in billions USD
+    return code_df
+
+@instrumented()
+def calculate_partner_impact(level='partner', codes=None, batch_size=PARTNER_BATCH_SIZE):
+    """
+    Partner- or product-level counterpart of calculate_economic_impact.
+
+    For every code of `level` ('partner' or 'product'; all codes in the fact tables
+    unless `codes` is given), aggregates the tariff rate and trade values by
+    year in SQLite, computes their year-to-year deltas with a single grouped
+    diff, joins the annual macro deltas (delta_GDP, cpi_delta,
+    unemployment_delta, industrial_delta) by year and writes one row per
+    (level, code, year) into 'partner_impact'. Each batch's existing rows are
+    replaced in one transaction, so years that disappeared from the source do
+    not linger; without `codes`, rows of codes no longer in the fact tables
+    are deleted as well.
+
+    Applied rates are reported per product, not per partner, so at
+    level='partner' avg_tariff_rate and delta_tariff are always NULL; only the
+    trade and macro measures are filled.
+
+    Codes are processed `batch_size` at a time, so only one batch of
+    aggregated histories is in memory regardless of the number of partners or
+    products. Returns the number of rows stored.
+    """
+    if level not in IMPACT_LEVELS:
+        raise ValueError(f"level must be one of {sorted(IMPACT_LEVELS)}, got {level!r}")
+    table, key_column, code_column, _, in_applied = IMPACT_LEVELS[level]
+    create_tables(get_connection())
+
+    source_codes = None
+    if codes is None:
+        fact_tables = ['trade_flows', 'applied_rates'] if in_applied else ['trade_flows']
+        referenced = " OR ".join(
+            f"EXISTS (SELECT 1 FROM {fact_table} f WHERE f.{key_column} = d.{key_column})"
+            for fact_table in fact_tables
+        )
+        source_codes = (f"SELECT DISTINCT d.{code_column} AS code FROM {table} d "
+                        f"WHERE d.{code_column} IS NOT NULL AND ({referenced})")
+        codes = fetch_query(f"{source_codes} ORDER BY 1")['code'].tolist()
+
+    # Macro deltas are computed once, between consecutive calendar years.
+    macro_df = load_macro_levels().sort_values('year')
+    macro_deltas = macro_df[MACRO_LEVEL_COLUMNS].diff().where(macro_df['year'].diff() == 1)
+    macro_deltas = macro_deltas.rename(columns=MACRO_DELTA_COLUMNS).assign(year=macro_df['year'])
+
+    stored = 0
+    for start in range(0, len(codes), batch_size):
+        batch = codes[start:start + batch_size]
+        code_df = compute_code_deltas(aggregate_tariffs_by_code(level, batch))
+        impact_df = code_df.merge(macro_deltas, on='year', how='left').assign(level=level)
+        # The delete and store_dataframe's insert share this thread's
+        # connection, so they commit (or roll back) together.
+        with get_connection() as conn:
+            conn.execute(
+                f"DELETE FROM partner_impact WHERE level = ? AND code IN ({', '.join('?' * len(batch))})",
+                (level, *batch),
+            )
+            store_dataframe(impact_df, "partner_impact", if_exists="append")
+        stored += len(impact_df)
+
+    if source_codes is not None:
+        with get_connection() as conn:
+            removed = conn.execute(
+                f"DELETE FROM partner_impact WHERE level = ? AND code NOT IN ({source_codes})", (level,)
+            ).rowcount
+            if removed:
+                bump_table_version(conn, "partner_impact")
+        if removed:
+            logger.info("Deleted %d 'partner_impact' rows of %s codes no longer in the source.", removed, level)
+
+    logger.info("Stored %d %s-year rows for %d %s codes in 'partner_impact'.", stored, level, len(codes), level)
+    return stored
+
+# Change tokens of the raw inputs of each year's economic_levels row: the
+# ingestion manifest's partition hashes of the three tariff extracts, and a
+# count/sum/latest-vintage digest of the year's macro observations (or of its
+# legacy_macro_levels row while no observations have been fetched).
+TARIFF_SIGNATURES_SQL = """
+SELECT year, group_concat(data_type || ':' || partition_hash || ':' || row_count, ',') AS signature
+FROM (SELECT * FROM ingestion_manifest_partitions ORDER BY year, data_type)
+GROUP BY year
+"""
+MACRO_SIGNATURES_SQL = """
+SELECT CAST(substr(date, 1, 4) AS INTEGER) AS year,
+       COUNT(*) || ':' || TOTAL(value) || ':' || IFNULL(MAX(vintage), '') AS signature
+FROM macro_observations
+WHERE series_id IN ({placeholders})
+GROUP BY 1
+"""
+LEGACY_MACRO_SIGNATURES_SQL = f"""
+SELECT year, 'legacy:' || {" || ':' || ".join(f"quote({column})" for column in MACRO_LEVEL_COLUMNS)} AS signature
+FROM legacy_macro_levels
+"""
+
+LEVEL_COLUMNS = (['year', 'has_tariffs', 'avg_tariff_rate', 'imports_value', 'exports_value', 'has_macro']
+                 + MACRO_LEVEL_COLUMNS + ['tariff_signature', 'macro_signature'])
+ECONOMIC_IMPACT_COLUMNS = ['year', 'avg_tariff_rate', 'delta_tariff', 'imports_value', 'exports_value',
+                           'delta_imports', 'delta_exports', 'GDP', 'delta_GDP', 'CPI',
+                           'Unemployment_Rate', 'Industrial_Production', 'cpi_delta',
+                           'unemployment_delta', 'industrial_delta']
+
+# A year enters economic_impact only if it has both tariff aggregates and macro levels.
+COMPLETE_LEVELS = "has_tariffs AND has_macro"
+
+# Year-to-year deltas of the complete economic_levels rows between two years,
+# computed with LAG() over the year order. The window starts at the complete
+# year preceding the first recomputed one, so that row only serves as the
+# previous value; {targets} are the years actually written. Rows whose
+# deltas cannot all be computed (the first year) are left out.
+ECONOMIC_DELTAS_SQL = f"""
+INSERT INTO economic_impact ({", ".join(ECONOMIC_IMPACT_COLUMNS)})
+SELECT {", ".join(ECONOMIC_IMPACT_COLUMNS)}
+FROM (
+    SELECT
+        year, avg_tariff_rate, imports_value, exports_value,
+        GDP, CPI, Unemployment_Rate, Industrial_Production,
+        (avg_tariff_rate - LAG(avg_tariff_rate) OVER w) * 100 AS delta_tariff,   -- in bps
+        (imports_value - LAG(imports_value) OVER w) / 1e9 AS delta_imports,     -- in billions USD
+        (exports_value - LAG(exports_value) OVER w) / 1e9 AS delta_exports,     -- in billions USD
+        GDP - LAG(GDP) OVER w AS delta_GDP,
+        CPI - LAG(CPI) OVER w AS cpi_delta,
+        Unemployment_Rate - LAG(Unemployment_Rate) OVER w AS unemployment_delta,
+        Industrial_Production - LAG(Industrial_Production) OVER w AS industrial_delta
+    FROM economic_levels
+    WHERE {COMPLETE_LEVELS} AND year BETWEEN ? AND ?
+    WINDOW w AS (ORDER BY year)
+)
+WHERE year IN ({{targets}})
+  AND delta_tariff IS NOT NULL AND delta_imports IS NOT NULL AND delta_exports IS NOT NULL
+  AND delta_GDP IS NOT NULL AND cpi_delta IS NOT NULL
+  AND unemployment_delta IS NOT NULL AND industrial_delta IS NOT NULL
+"""
+
+def _input_signatures(conn):
+    """{year: (tariff signature, macro signature)} of every year with raw tariff or macro data."""
+    tariffs = dict(conn.execute(TARIFF_SIGNATURES_SQL).fetchall())
+    if has_macro_observations(conn):
+        series_ids = list(MACRO_SERIES)
+        macro = dict(conn.execute(
+            MACRO_SIGNATURES_SQL.format(placeholders=", ".join("?" * len(series_ids))), series_ids
+        ).fetchall())
+    else:
+        macro = dict(conn.execute(LEGACY_MACRO_SIGNATURES_SQL).fetchall())
+    return {year: (tariffs.get(year), macro.get(year)) for year in set(tariffs) | set(macro)}
+
+def compute_economic_levels(years, signatures):
+    """
+    economic_levels rows (LEVEL_COLUMNS) of the given years: tariff aggregates
+    and first-of-year macro levels, read for those years only.
+    """
+    years = sorted(years)
+    tariff_df = aggregate_tariffs_by_year(years)
+    macro_df = load_macro_levels(years)
+    levels = (pd.DataFrame({'year': years})
+              .merge(tariff_df, on='year', how='left')
+              .merge(macro_df[['year'] + MACRO_LEVEL_COLUMNS], on='year', how='left'))
+    levels['has_tariffs'] = levels['year'].isin(tariff_df['year']).astype(int)
+    levels['has_macro'] = levels['year'].isin(macro_df['year']).astype(int)
+    levels['tariff_signature'] = [signatures[year][0] for year in years]
+    levels['macro_signature'] = [signatures[year][1] for year in years]
+    return levels[LEVEL_COLUMNS]
+
+def _neighbour_year(conn, year, later):
+    """The closest complete economic_levels year after (later=True) or before `year`, or None."""
+    aggregate, comparison = ("MIN", ">") if later else ("MAX", "<")
+    return conn.execute(
+        f"SELECT {aggregate}(year) FROM economic_levels WHERE {COMPLETE_LEVELS} AND year {comparison} ?", (year,)
+    ).fetchone()[0]
+
+@instrumented()
+def refresh_economic_impact(full_refresh=False):
+    """
+    Brings 'economic_levels' and 'economic_impact' up to date with the raw
+    tariff store and 'macro_observations', recomputing only what changed.
+
+    A year is recomputed when its raw inputs' signatures (see
+    TARIFF_SIGNATURES_SQL and MACRO_SIGNATURES_SQL) differ from the ones its
+    economic_levels row was built from, or when its raw data disappeared. The
+    economic_impact rows of those years and of the next complete year after
+    each of them (whose deltas depend on them) are replaced with LAG() window
+    deltas computed in SQLite, in the same transaction as the levels. Appending
+    one year therefore reads and writes a couple of rows; with nothing changed
+    it writes nothing and leaves the table versions alone. full_refresh=True
+    recomputes every year.
+
+    While 'macro_observations' is empty, the macro levels come from
+    'legacy_macro_levels' (see load_macro_levels), so tariff and trade changes
+    are still picked up on databases that never fetched macro data.
+
+    Returns:
+        (sorted recomputed years, economic_impact rows written).
+    """
+    conn = get_connection()
+    create_tables(conn)
+
+    signatures = _input_signatures(conn)
+    stored = {year: (tariff, macro) for year, tariff, macro in
+              conn.execute("SELECT year, tariff_signature, macro_signature FROM economic_levels")}
+    impact_years = {year for (year,) in conn.execute("SELECT year FROM economic_impact")}
+    changed = {year for year, signature in signatures.items() if full_refresh or stored.get(year) != signature}
+    vanished = (set(stored) | impact_years) - set(signatures)
+    affected = sorted(changed | vanished)
+    if not affected:
+        return [], 0
+
+    levels = compute_economic_levels(changed, signatures) if changed else pd.DataFrame(columns=LEVEL_COLUMNS)
+    with conn:
+        conn.executemany("DELETE FROM economic_levels WHERE year = ?", [(year,) for year in vanished])
+        conn.executemany(
+            f"INSERT OR REPLACE INTO economic_levels ({', '.join(LEVEL_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(LEVEL_COLUMNS))})",
+            levels.astype(object).where(levels.notna(), None).itertuples(index=False, name=None),
+        )
+
+        targets = set(affected)
+        for year in affected:
+            successor = _neighbour_year(conn, year, later=True)
+            if successor is not None:
+                targets.add(successor)
+        targets = sorted(targets)
+        window_start = _neighbour_year(conn, targets[0], later=False) or targets[0]
+
+        conn.executemany("DELETE FROM economic_impact WHERE year = ?", [(year,) for year in targets])
+        written = conn.execute(
+            ECONOMIC_DELTAS_SQL.format(targets=", ".join("?" * len(targets))),
+            (window_start, targets[-1], *targets),
+        ).rowcount
+        bump_table_version(conn, "economic_levels")
+        bump_table_version(conn, "economic_impact")
+    record_rows(rows_out=len(levels) + written)
+    return affected, written
+
+@instrumented()
+def calculate_economic_impact(full_refresh=False):
+    """
+    Maintains the 'economic_impact' table from the tariff store and annual
+    macro data (CPI, Unemployment_Rate, Industrial_Production, GDP) resampled
+    from the 'macro_observations' table. The raw tables are only read.
+    It:
+      - Aggregates the tariff data of changed years (average tariff rate from
+        applied data, total imports and exports) and their first-of-year macro
+        levels into the materialized 'economic_levels' table.
+      - Computes year-to-year differences (deltas) with SQL window functions for:
             * Tariff rate (delta_tariff, in basis points),
             * Imports and exports (delta_imports, delta_exports in billions USD),
             * GDP (delta_GDP),
             * CPI (cpi_delta),
             * Unemployment Rate (unemployment_delta),
             * Industrial Production (industrial_delta).
-      - Overwrites the 'economic_impact' table with the merged results.
-    """
-    # --- Part 1: Process Tariff Data from the 'tariffs' table ---
-    tariffs_df = fetch_query("SELECT * FROM tariffs")
-    tariffs_df['year'] = tariffs_df['year'].astype(int)
-    
-    # Separate by data_type
-    applied_df = tariffs_df[tariffs_df['data_type'] == 'applied']
-    imports_df = tariffs_df[tariffs_df['data_type'] == 'imports']
-    exports_df = tariffs_df[tariffs_df['data_type'] == 'exports']
-    
-    # Aggregate tariff data by year (using trade_weighted as tariff measure)
-    applied_agg = applied_df.groupby('year')['trade_weighted'].mean().reset_index()
-    applied_agg.rename(columns={'trade_weighted': 'avg_tariff_rate'}, inplace=True)
-    
-    # Aggregate imports and exports (summing trade values)
-    imports_agg = imports_df.groupby('year')['value'].sum().reset_index()
-    imports_agg.rename(columns={'value': 'imports_value'}, inplace=True)
-    
-    exports_agg = exports_df.groupby('year')['value'].sum().reset_index()
-    exports_agg.rename(columns={'value': 'exports_value'}, inplace=True)
-    
-    # Merge aggregated tariff data
-    analysis_df = pd.merge(applied_agg, imports_agg, on='year', how='inner')
-    analysis_df = pd.merge(analysis_df, exports_agg, on='year', how='inner')
-    analysis_df.sort_values('year', inplace=True)
-    
-    print("Merged Tariff Data:")
-    print(analysis_df)
-    
-    # --- Part 2: (Optional) Regression Analysis ---
-    X = sm.add_constant(analysis_df['avg_tariff_rate'])
-    model_imports = sm.OLS(analysis_df['imports_value'], X).fit()
-    model_exports = sm.OLS(analysis_df['exports_value'], X).fit()
-    print("Regression Summary for Imports:")
-    print(model_imports.summary())
-    print("Regression Summary for Exports:")
-    print(model_exports.summary())
-    
-    # --- Part 3: Compute Year-to-Year Differences for Tariff Data ---
-    analysis_df['delta_tariff'] = analysis_df['avg_tariff_rate'].diff() * 100  # in bps
-    analysis_df['delta_imports'] = analysis_df['imports_value'].diff() / 1e9   # in billions USD
-    analysis_df['delta_exports'] = analysis_df['exports_value'].diff() / 1e9   # in billions USD
-    
-    # --- Part 4: Load Macro Data from the economic_impact table ---
-    # (Assuming your macro data has already been loaded into economic_impact without the delta columns)
-    macro_df = fetch_query("SELECT * FROM economic_impact")
-    # We assume macro_df already has CPI, Unemployment_Rate, Industrial_Production, GDP and year.
-    macro_df = macro_df.drop_duplicates(subset='year')
-    
-    # --- Part 5: Merge Tariff and Macro Data ---
-    merged_df = pd.merge(analysis_df, macro_df[['year', 'GDP', 'CPI', 'Unemployment_Rate', 'Industrial_Production']], 
-                         on='year', how='inner')
-    merged_df.sort_values('year', inplace=True)
-    
-    # Compute delta for GDP (assumed to be in billions USD already)
-    merged_df['delta_GDP'] = merged_df['GDP'].diff()
-    
-    # --- Part 6: Compute New Deltas for Macro Indicators ---
-    merged_df['cpi_delta'] = merged_df['CPI'].diff()
-    merged_df['unemployment_delta'] = merged_df['Unemployment_Rate'].diff()
-    merged_df['industrial_delta'] = merged_df['Industrial_Production'].diff()
-    
-    # Drop rows with NaN in any of the key delta columns
-    merged_df.dropna(subset=['delta_tariff', 'delta_imports', 'delta_exports', 'delta_GDP',
-                               'cpi_delta', 'unemployment_delta', 'industrial_delta'], inplace=True)
-    
-    # --- Part 7: Create Final Merged DataFrame and Store ---
-    economic_df = merged_df[['year', 'avg_tariff_rate', 'delta_tariff', 'imports_value', 'exports_value',
-                               'delta_imports', 'delta_exports', 'GDP', 'delta_GDP', 'CPI',
-                               'Unemployment_Rate', 'Industrial_Production', 'cpi_delta',
-                               'unemployment_delta', 'industrial_delta']].copy()
-    
-    store_dataframe(economic_df, "economic_impact")
-    print("Merged economic impact data saved to table 'economic_impact':")
-    print(economic_df.head())
+      - Replaces only the affected years' rows of 'economic_impact'
+        (see refresh_economic_impact).
+    """
+    affected, written = refresh_economic_impact(full_refresh=full_refresh)
+    if not affected:
+        logger.info("Table 'economic_impact' is up to date.")
+        return
+    logger.info("Recomputed %d years (%s-%s); stored %d rows in table 'economic_impact'.",
+                len(affected), affected[0], affected[-1], written)
+
+    # Formatting whole frames and fitting the regression is not free; only do it when DEBUG is on.
+    if logger.isEnabledFor(logging.DEBUG):
+        analysis_df = fetch_query(
+            "SELECT year, avg_tariff_rate, imports_value, exports_value FROM economic_levels "
+            "WHERE has_tariffs ORDER BY year"
+        )
+        logger.debug("Merged Tariff Data:\n%s", analysis_df)
+        # Imports and exports are regressed on the tariff rate in one batched solve.
+        trade_fit = fit_batched_ols(analysis_df['avg_tariff_rate'], analysis_df[['imports_value', 'exports_value']])
+        logger.debug("Regression of Trade Values on Tariff Rate:\n%s", regression_table(trade_fit))
+        logger.debug("Merged economic impact data:\n%s",
+                     fetch_query("SELECT * FROM economic_impact ORDER BY year LIMIT 5"))
 
 def main():
     calculate_economic_impact()
 
 if __name__ == "__main__":
+    configure_logging()
     main()
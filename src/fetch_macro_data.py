@@ -1,61 +1,157 @@
+import os
+import logging
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-from fredapi import Fred
-from src.config import FRED_API_KEY
-from src.db_utils import store_dataframe
-
-def fetch_and_store_macro_data_as_economic_impact():
-    """
-    Fetches key macroeconomic indicators from FRED, resamples the data to only include
-    the first available observation for each year (typically January 1), filters the data
-    for the period 1996-2024, adds a 'year' column, and stores the result in a new 
-    database table called "economic_impact".
-    
-    Macroeconomic series fetched:
-      - CPI (Consumer Price Index for All Urban Consumers: All Items, 'CPIAUCSL')
-      - Unemployment Rate ('UNRATE')
-      - Industrial Production Index ('INDPRO')
-      - GDP (Gross Domestic Product, 'GDP')
-    """
-    # Initialize the Fred client using your API key from config.py
-    fred = Fred(api_key=FRED_API_KEY)
-    
-    # Fetch macroeconomic indicators from FRED
-    cpi = fred.get_series('CPIAUCSL')
-    unrate = fred.get_series('UNRATE')
-    indpro = fred.get_series('INDPRO')
-    gdp = fred.get_series('GDP')
-    
-    # Convert each series to a DataFrame and reset the index so that Date becomes a column.
-    cpi_df = cpi.to_frame(name="CPI").reset_index().rename(columns={"index": "Date"})
-    unrate_df = unrate.to_frame(name="Unemployment_Rate").reset_index().rename(columns={"index": "Date"})
-    indpro_df = indpro.to_frame(name="Industrial_Production").reset_index().rename(columns={"index": "Date"})
-    gdp_df = gdp.to_frame(name="GDP").reset_index().rename(columns={"index": "Date"})
-    
-    # Merge all DataFrames on 'Date' using an outer join to preserve all data points.
-    macro_df = pd.merge(cpi_df, unrate_df, on="Date", how="outer")
-    macro_df = pd.merge(macro_df, indpro_df, on="Date", how="outer")
-    macro_df = pd.merge(macro_df, gdp_df, on="Date", how="outer")
-    
-    # Convert 'Date' to datetime and sort
-    macro_df['Date'] = pd.to_datetime(macro_df['Date'])
-    macro_df.sort_values("Date", inplace=True)
-    
-    # Resample to Annual Start ('AS') - take the first available observation for each year.
-    macro_df = macro_df.set_index("Date").resample("AS").first().reset_index()
-    
-    # Filter data for the period 1996-2024
-    start_date = pd.to_datetime("1996-01-01")
-    end_date = pd.to_datetime("2024-12-31")
-    macro_df = macro_df[(macro_df['Date'] >= start_date) & (macro_df['Date'] <= end_date)]
-    
-    # Add a 'year' column extracted from the Date.
-    macro_df['year'] = macro_df['Date'].dt.year
-    
-    # Store the resulting DataFrame in the database under the table 'economic_impact'
-    store_dataframe(macro_df, "economic_impact")
-    
-    print("Macro data stored in table 'economic_impact' (Annual data from 1996 to 2024):")
-    print(macro_df.head())
+from src.db_utils import get_connection, fetch_query
+from src.instrumentation import configure_logging, instrumented, record_rows
+from src.macro_store import MACRO_SERIES
+from src.schema import create_tables, bump_table_version
+
+logger = logging.getLogger(__name__)
+
+# Concurrent downloads, and the environment variable that switches to the offline source.
+MACRO_FETCH_WORKERS = 8
+MACRO_DATA_DIR_ENV = 'MACRO_DATA_DIR'
+
+UPSERT_OBSERVATION_SQL = """
+INSERT INTO macro_observations (series_id, date, value, vintage)
+VALUES (?, ?, ?, ?)
+ON CONFLICT (series_id, date) DO UPDATE SET
+    value = excluded.value,
+    vintage = excluded.vintage
+"""
+
+class FredSource:
+    """Observations from the FRED API. fredapi is only imported when this source is used."""
+
+    def __init__(self, api_key=None):
+        from fredapi import Fred
+        if api_key is None:
+            # Initialize the Fred client using your API key from config.py
+            from src.config import FRED_API_KEY
+            api_key = FRED_API_KEY
+        self.fred = Fred(api_key=api_key)
+
+    def get_series(self, series_id, observation_start=None):
+        return self.fred.get_series(series_id, observation_start=observation_start)
+
+class FileSource:
+    """
+    Offline stand-in for FredSource reading <folder>/<series_id>.csv files with
+    'date' and 'value' columns (as written by export_macro_observations).
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def get_series(self, series_id, observation_start=None):
+        df = pd.read_csv(os.path.join(self.folder, f"{series_id}.csv"), parse_dates=['date'])
+        series = df.set_index('date')['value']
+        if observation_start is not None:
+            series = series[series.index >= pd.Timestamp(observation_start)]
+        return series
+
+def default_macro_source():
+    """
+    FileSource if MACRO_DATA_DIR is set, otherwise the FRED API if an API key
+    is configured in config.py, otherwise None (no source configured).
+    """
+    folder = os.environ.get(MACRO_DATA_DIR_ENV)
+    if folder:
+        return FileSource(folder)
+    from src.config import FRED_API_KEY
+    return FredSource() if FRED_API_KEY else None
+
+def last_observation_dates():
+    """Return {series_id: latest stored date} for the series already cached."""
+    rows = get_connection().execute(
+        "SELECT series_id, MAX(date) FROM macro_observations GROUP BY series_id"
+    ).fetchall()
+    return {series_id: pd.Timestamp(last_date) for series_id, last_date in rows}
+
+def _fetch_new_observations(source, series_id, last_date):
+    """Fetch the observations of one series dated after last_date (or all of them)."""
+    start = None if last_date is None else last_date + pd.Timedelta(days=1)
+    series = source.get_series(series_id, observation_start=start).dropna()
+    if start is not None:
+        series = series[series.index >= start]
+    return pd.DataFrame({
+        'series_id': series_id,
+        'date': pd.to_datetime(series.index).strftime('%Y-%m-%d'),
+        'value': series.to_numpy(dtype=float),
+    })
+
+@instrumented()
+def fetch_macro_series(series_ids=tuple(MACRO_SERIES), source=None, max_workers=MACRO_FETCH_WORKERS):
+    """
+    Refreshes the 'macro_observations' table for the given series. Series are
+    downloaded concurrently, and only observations newer than the last cached
+    date of each series are requested. New rows are stamped with the fetch time
+    as their vintage and written in one batched upsert.
+
+    Returns:
+        {series_id: number of new observations stored}.
+    """
+    source = source or default_macro_source()
+    if source is None:
+        raise ValueError(f"No macro source configured; set FRED_API_KEY in config.py or {MACRO_DATA_DIR_ENV}.")
+    conn = get_connection()
+    create_tables(conn)
+    last_dates = last_observation_dates()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        frames = list(executor.map(
+            lambda series_id: _fetch_new_observations(source, series_id, last_dates.get(series_id)),
+            series_ids,
+        ))
+
+    new_df = pd.concat(frames, ignore_index=True)
+    new_df['vintage'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    with conn:
+        conn.executemany(UPSERT_OBSERVATION_SQL, new_df.itertuples(index=False, name=None))
+        if len(new_df):
+            bump_table_version(conn, "macro_observations")
+    record_rows(rows_out=len(new_df))
+    return {series_id: len(frame) for series_id, frame in zip(series_ids, frames)}
+
+def export_macro_observations(folder, series_ids=tuple(MACRO_SERIES)):
+    """Write the cached observations as <series_id>.csv files readable by FileSource."""
+    os.makedirs(folder, exist_ok=True)
+    for series_id in series_ids:
+        df = fetch_query(
+            "SELECT date, value FROM macro_observations WHERE series_id = ? ORDER BY date",
+            params=(series_id,),
+        )
+        df.to_csv(os.path.join(folder, f"{series_id}.csv"), index=False)
+
+def fetch_and_store_macro_data_as_economic_impact(source=None):
+    """
+    Fetches key macroeconomic indicators (MACRO_SERIES) and stores their raw
+    observations, at native frequency and without a date window, in the
+    long-format 'macro_observations' table. Annual (or quarterly/monthly) frames
+    are produced at read time by src.macro_store.load_macro_frame, so changing
+    the frequency or window does not require a refetch.
+
+    Without a configured source (no FRED API key and no MACRO_DATA_DIR), or if
+    the fetch fails (offline, fredapi missing) while observations are already
+    cached, the cached observations are kept and downstream stages use them.
+    """
+    create_tables(get_connection())
+    try:
+        source = source or default_macro_source()
+        if source is None:
+            logger.warning("No macro source configured (FRED_API_KEY or %s); using the cached observations.",
+                           MACRO_DATA_DIR_ENV)
+            return
+        new_counts = fetch_macro_series(source=source)
+    except (ImportError, OSError, ValueError):
+        if not last_observation_dates():
+            raise
+        logger.warning("Macro fetch failed; using the cached observations.", exc_info=True)
+        return
+    logger.info("Macro observations stored in table 'macro_observations'; new per series: %s", new_counts)
 
 if __name__ == "__main__":
+    configure_logging()
     fetch_and_store_macro_data_as_economic_impact()
@@ -1,99 +1,87 @@
-import sqlite3
-from src.config import DB_PATH  # Update if you store your DB path differently
+import os
+import logging
+import pandas as pd
+from src.db_utils import get_connection, fetch_query
+from src.instrumentation import configure_logging, record_rows
+from src.schema import create_tables, bump_table_version
 
-def store_new_reciprocal_tariffs():
+logger = logging.getLogger(__name__)
+
+# Reciprocal tariff schedule transcribed from the two announcement images in
+# the same folder. Further vintages can be stored from additional CSV/JSON files.
+RECIPROCAL_TARIFFS_PATH = os.path.join("data", "Trumps Tariffs", "reciprocal_tariffs.csv")
+
+SCHEDULE_COLUMNS = ["country", "effective_date", "tariff_charged_us", "usa_discounted_tariff"]
+
+UPSERT_NEW_TARIFF_SQL = """
+INSERT INTO new_tariffs (country, effective_date, tariff_charged_us, usa_discounted_tariff)
+VALUES (?, ?, ?, ?)
+ON CONFLICT (country, effective_date) DO UPDATE SET
+    tariff_charged_us = excluded.tariff_charged_us,
+    usa_discounted_tariff = excluded.usa_discounted_tariff
+"""
+
+def load_tariff_schedule(schedule_path, effective_date=None):
     """
-    Creates a new table 'new_tariffs' (if not exists)
-    and inserts the hard-coded  tariff data extracted from the images.
-    'tariff_charged_us' and 'usa_discounted_tariff' are stored as numeric percentages
-    (e.g. 67.0 means 67%).
+    Reads a reciprocal tariff schedule from a CSV or JSON (list of records) file.
+    Rates are numeric percentages (e.g. 67.0 means 67%). If the file has no
+    'effective_date' column, `effective_date` is applied to every row.
     """
-    # Hard-coded data from the two images:
-    tariff_data = [
-        # Image 1
-        {"country": "China",             "tariff_charged_us": 67.0, "usa_discounted_tariff": 34.0},
-        {"country": "European Union",    "tariff_charged_us": 39.0, "usa_discounted_tariff": 20.0},
-        {"country": "Vietnam",           "tariff_charged_us": 64.0, "usa_discounted_tariff": 22.0},
-        {"country": "Taiwan",            "tariff_charged_us": 52.0, "usa_discounted_tariff": 26.0},
-        {"country": "Japan",             "tariff_charged_us": 50.0, "usa_discounted_tariff": 24.0},
-        {"country": "India",             "tariff_charged_us": 54.0, "usa_discounted_tariff": 28.0},
-        {"country": "South Korea",       "tariff_charged_us": 62.0, "usa_discounted_tariff": 28.0},
-        {"country": "Thailand",          "tariff_charged_us": 72.0, "usa_discounted_tariff": 36.0},
-        {"country": "Switzerland",       "tariff_charged_us": 64.0, "usa_discounted_tariff": 32.0},
-        {"country": "Indonesia",         "tariff_charged_us": 59.0, "usa_discounted_tariff": 30.0},
-        {"country": "Malaysia",          "tariff_charged_us": 40.0, "usa_discounted_tariff": 25.0},
-        {"country": "Cambodia",          "tariff_charged_us": 63.0, "usa_discounted_tariff": 32.0},
-        {"country": "United Kingdom",    "tariff_charged_us": 48.0, "usa_discounted_tariff": 20.0},
-        {"country": "South Africa",      "tariff_charged_us": 55.0, "usa_discounted_tariff": 22.0},
-        {"country": "Brazil",            "tariff_charged_us": 60.0, "usa_discounted_tariff": 20.0},
-        {"country": "Bangladesh",        "tariff_charged_us": 44.0, "usa_discounted_tariff": 20.0},
-        {"country": "Singapore",         "tariff_charged_us": 18.0, "usa_discounted_tariff": 10.0},
-        {"country": "Israel",            "tariff_charged_us": 40.0, "usa_discounted_tariff": 20.0},
-        {"country": "Philippines",       "tariff_charged_us": 37.0, "usa_discounted_tariff": 19.0},
-        {"country": "Chile",             "tariff_charged_us": 14.0, "usa_discounted_tariff": 10.0},
-        {"country": "Australia",         "tariff_charged_us": 13.0, "usa_discounted_tariff": 10.0},
-        {"country": "Pakistan",          "tariff_charged_us": 38.0, "usa_discounted_tariff": 19.0},
-        {"country": "Turkey",            "tariff_charged_us": 58.0, "usa_discounted_tariff": 28.0},
-        {"country": "Sri Lanka",         "tariff_charged_us": 60.0, "usa_discounted_tariff": 25.0},
+    if schedule_path.lower().endswith(".json"):
+        schedule_df = pd.read_json(schedule_path, orient="records", dtype={"effective_date": str})
+    else:
+        schedule_df = pd.read_csv(schedule_path, dtype={"country": str, "effective_date": str})
 
-        # Image 2
-        {"country": "Peru",              "tariff_charged_us": 10.0, "usa_discounted_tariff": 10.0},
-        {"country": "Nicaragua",         "tariff_charged_us": 36.0, "usa_discounted_tariff": 18.0},
-        {"country": "Norway",            "tariff_charged_us": 30.0, "usa_discounted_tariff": 17.0},
-        {"country": "Costa Rica",        "tariff_charged_us": 17.0, "usa_discounted_tariff": 10.0},
-        {"country": "Jordan",            "tariff_charged_us": 15.0, "usa_discounted_tariff": 10.0},
-        {"country": "Dominican Republic","tariff_charged_us": 14.0, "usa_discounted_tariff": 10.0},
-        {"country": "United Arab Emirates","tariff_charged_us": 20.0, "usa_discounted_tariff": 10.0},
-        {"country": "Argentina",         "tariff_charged_us": 20.0, "usa_discounted_tariff": 10.0},
-        {"country": "Ecuador",           "tariff_charged_us": 10.0, "usa_discounted_tariff": 10.0},
-        {"country": "Guatemala",         "tariff_charged_us": 15.0, "usa_discounted_tariff": 10.0},
-        {"country": "Honduras",          "tariff_charged_us": 10.0, "usa_discounted_tariff": 10.0},
-        {"country": "Madagascar",        "tariff_charged_us": 40.0, "usa_discounted_tariff": 20.0},
-        {"country": "Myanmar (Burma)",   "tariff_charged_us": 38.0, "usa_discounted_tariff": 20.0},
-        {"country": "Tunisia",           "tariff_charged_us": 54.0, "usa_discounted_tariff": 28.0},
-        {"country": "Kazakhstan",        "tariff_charged_us": 24.0, "usa_discounted_tariff": 10.0},
-        {"country": "Serbia",            "tariff_charged_us": 25.0, "usa_discounted_tariff": 10.0},
-        {"country": "Egypt",             "tariff_charged_us": 18.0, "usa_discounted_tariff": 10.0},
-        {"country": "El Salvador",       "tariff_charged_us": 15.0, "usa_discounted_tariff": 10.0},
-        {"country": "Côte d'Ivoire",     "tariff_charged_us": 15.0, "usa_discounted_tariff": 10.0},
-        {"country": "Laos",              "tariff_charged_us": 48.0, "usa_discounted_tariff": 20.0},
-        {"country": "Trinidad and Tobago","tariff_charged_us": 74.0, "usa_discounted_tariff": 30.0},
-        {"country": "Morocco",           "tariff_charged_us": 10.0, "usa_discounted_tariff": 10.0},
-    ]
+    if "effective_date" not in schedule_df.columns:
+        if effective_date is None:
+            raise ValueError(f"{schedule_path} has no 'effective_date' column; pass effective_date.")
+        schedule_df["effective_date"] = effective_date
+    missing = set(SCHEDULE_COLUMNS) - set(schedule_df.columns)
+    if missing:
+        raise ValueError(f"{schedule_path} is missing columns: {sorted(missing)}")
 
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+    schedule_df["effective_date"] = pd.to_datetime(schedule_df["effective_date"]).dt.strftime("%Y-%m-%d")
+    schedule_df["country"] = schedule_df["country"].str.strip()
+    return schedule_df[SCHEDULE_COLUMNS]
 
-    # Create a new table (if not exists) to store these rates
-    create_table_sql = """
-    CREATE TABLE IF NOT EXISTS new_tariffs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        country TEXT NOT NULL,
-        tariff_charged_us REAL,
-        usa_discounted_tariff REAL
-    );
+def load_new_tariffs(as_of=None):
     """
-    cur.execute(create_table_sql)
-
-    # Optional: Clear existing data in case you want to refresh each run
-    # cur.execute("DELETE FROM new_tariffs;")
+    Load new tariff data from the new_tariffs table.
+    The table contains columns: country, effective_date, tariff_charged_us, and
+    usa_discounted_tariff. Only the latest vintage per country is returned,
+    optionally restricted to vintages effective on or before `as_of` (YYYY-MM-DD).
+    """
+    query = """
+    SELECT t.*
+    FROM new_tariffs AS t
+    JOIN (
+        SELECT country, MAX(effective_date) AS effective_date
+        FROM new_tariffs
+        WHERE effective_date <= COALESCE(?, effective_date)
+        GROUP BY country
+    ) AS latest USING (country, effective_date)
+    ORDER BY t.country
+    """
+    return fetch_query(query, params=(as_of,))
 
-    # Insert the data
-    insert_sql = """
-    INSERT INTO new_tariffs (country, tariff_charged_us, usa_discounted_tariff)
-    VALUES (?, ?, ?)
+def store_new_reciprocal_tariffs(schedule_path=RECIPROCAL_TARIFFS_PATH, effective_date=None):
+    """
+    Loads a reciprocal tariff schedule file into the 'new_tariffs' table with one
+    batched upsert keyed on (country, effective_date), so reruns are idempotent
+    and several announcement vintages can be kept side by side.
     """
-    for row in tariff_data:
-        cur.execute(insert_sql, (
-            row["country"],
-            row["tariff_charged_us"],
-            row["usa_discounted_tariff"]
-        ))
+    schedule_df = load_tariff_schedule(schedule_path, effective_date)
 
-    conn.commit()
-    conn.close()
+    conn = get_connection()
+    create_tables(conn)
+    with conn:
+        conn.executemany(UPSERT_NEW_TARIFF_SQL, schedule_df.itertuples(index=False, name=None))
+        bump_table_version(conn, "new_tariffs")
+    record_rows(rows_in=len(schedule_df), rows_out=len(schedule_df))
 
-    print("New reciprocal tariffs have been successfully stored in 'new_tariffs' table.")
+    vintages = ", ".join(sorted(schedule_df["effective_date"].unique()))
+    logger.info("Stored %d reciprocal tariff rows (%s) in 'new_tariffs' table.", len(schedule_df), vintages)
 
 if __name__ == "__main__":
+    configure_logging()
     store_new_reciprocal_tariffs()
@@ -1,72 +1,235 @@
 import os
+import time
+import logging
+import hashlib
+from datetime import datetime, timezone
 import pandas as pd
-from src.db_utils import store_dataframe
+from src.db_utils import get_connection
+from src.instrumentation import configure_logging, instrumented, record_rows
+from src.schema import create_tables, bump_table_version
+from src.tariff_store import (
+    TARIFF_DIMENSIONS, TARIFF_FACTS, encode_dimension, fact_columns, load_dimension_index
+)
 
-def process_tariff_data():
+logger = logging.getLogger(__name__)
+
+# Folder containing the WITS extracts and the rows read per chunk while streaming them.
+TARIFF_DATA_FOLDER = os.path.join("data", "Tariffs")
+CHUNKSIZE = 50_000
+
+# Source file for each data_type of the tariff store.
+TARIFF_FILES = {
+    "imports": "imports.csv",
+    "exports": "exports.csv",
+    "applied": "applied.csv",
+}
+
+# Explicit dtypes for each CSV layout so chunks are parsed without type inference.
+# The repeated descriptive strings are read as categoricals; measures stay float64
+# so the stored values are identical to a plain read_csv.
+_COMMON_DTYPES = {
+    "reporter_name": "category",
+    "reporter_code": "category",
+    "year": "int16",
+    "classification": "category",
+    "classification_version": "category",
+    "product_code": "category",
+    "mtn_categories": "category",
+}
+TRADE_DTYPES = {
+    **_COMMON_DTYPES,
+    "partner_code": "category",
+    "partner_name": "category",
+    "value": "float64",
+}
+APPLIED_DTYPES = {
+    **_COMMON_DTYPES,
+    "duty_scheme_code": "category",
+    "duty_scheme_name": "category",
+    "simple_average": "float64",
+    "trade_weighted": "float64",
+    "duty_free_share": "float64",
+}
+CSV_DTYPES = {
+    "imports": TRADE_DTYPES,
+    "exports": TRADE_DTYPES,
+    "applied": APPLIED_DTYPES,
+}
+
+def read_tariff_chunks(csv_path, data_type, chunksize=CHUNKSIZE):
     """
-    Processes the tariff CSV files, combines them into a unified DataFrame,
-    and stores the result in the 'tariffs' table of the SQLite database.
+    Streams a WITS CSV in chunks of at most `chunksize` rows with the columns
+    of its own layout (CSV_DTYPES), descriptive columns as categoricals.
     """
-    # Define the folder containing the CSV files
-    base_folder = "data/tariffs/"
-
-    # Define file paths for the three CSVs
-    imports_csv = os.path.join(base_folder, "imports.csv")
-    exports_csv = os.path.join(base_folder, "exports.csv")
-    applied_csv = os.path.join(base_folder, "applied.csv")
-
-    # Define the unified columns for the final table
-    unified_columns = [
-        "data_type",
-        "reporter_name",
-        "reporter_code",
-        "year",
-        "classification",
-        "classification_version",
-        "product_code",
-        "mtn_categories",
-        "partner_code",
-        "partner_name",
-        "value",
-        "duty_scheme_code",
-        "duty_scheme_name",
-        "simple_average",
-        "trade_weighted",
-        "duty_free_share"
-    ]
-
-    # --- Process Imports CSV ---
-    imports_df = pd.read_csv(imports_csv)
-    imports_df["data_type"] = "imports"
-    for col in ["duty_scheme_code", "duty_scheme_name", "simple_average", "trade_weighted", "duty_free_share"]:
-        imports_df[col] = None
-    imports_df = imports_df[unified_columns]
-
-    # --- Process Exports CSV ---
-    exports_df = pd.read_csv(exports_csv)
-    exports_df["data_type"] = "exports"
-    for col in ["duty_scheme_code", "duty_scheme_name", "simple_average", "trade_weighted", "duty_free_share"]:
-        exports_df[col] = None
-    exports_df = exports_df[unified_columns]
-
-    # --- Process Applied CSV ---
-    applied_df = pd.read_csv(applied_csv)
-    applied_df["data_type"] = "applied"
-    for col in ["partner_code", "partner_name", "value"]:
-        applied_df[col] = None
-    applied_df = applied_df[unified_columns]
-
-    # --- Combine All DataFrames ---
-    unified_df = pd.concat([imports_df, exports_df, applied_df], ignore_index=True)
-    print("Unified DataFrame preview:")
-    print(unified_df.head())
-
-    # --- Store into the 'tariffs' table in SQLite ---
-    store_dataframe(unified_df, "tariffs")
-    print("Tariff data stored successfully.")
+    dtypes = CSV_DTYPES[data_type]
+    reader = pd.read_csv(csv_path, dtype=dtypes, usecols=list(dtypes), chunksize=chunksize)
+    for chunk in reader:
+        yield chunk[list(dtypes)]
+
+def encode_tariff_chunk(conn, chunk, data_type, dimension_indexes):
+    """
+    Replace the descriptive columns of a chunk with dimension surrogate keys,
+    returning the fact rows of its data_type (see tariff_store.fact_columns).
+    """
+    _, dimensions, measures = TARIFF_FACTS[data_type]
+    facts = pd.DataFrame({"year": chunk["year"]})
+    for dimension in dimensions:
+        key_column = TARIFF_DIMENSIONS[dimension][0]
+        facts[key_column] = encode_dimension(conn, dimension, chunk, dimension_indexes[dimension])
+    for measure in measures:
+        facts[measure] = chunk[measure]
+    if "data_type" in fact_columns(data_type):
+        facts.insert(0, "data_type", data_type)
+    return facts
+
+def _fact_sql(data_type):
+    """
+    INSERT statement of a data_type's fact table, and its partition DELETE
+    taking :data_type and :year parameters.
+    """
+    table = TARIFF_FACTS[data_type][0]
+    columns = fact_columns(data_type)
+    insert = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    if "data_type" in columns:
+        return insert, f"DELETE FROM {table} WHERE data_type = :data_type AND year = :year"
+    return insert, f"DELETE FROM {table} WHERE year = :year"
+
+def hash_file(path, block_size=1 << 20):
+    """Return the SHA-256 hex digest of a file, read in fixed-size blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def hash_partitions(csv_path, data_type, chunksize=CHUNKSIZE):
+    """
+    Streams a CSV once and returns {year: (partition_hash, row_count)}.
+    Row hashes are summed modulo 2**64 per year, so a partition hash does not
+    depend on row order or on how rows fall into chunks.
+    """
+    sums = {}
+    counts = {}
+    for chunk in read_tariff_chunks(csv_path, data_type, chunksize):
+        row_hashes = pd.util.hash_pandas_object(chunk, index=False)
+        grouped = row_hashes.groupby(chunk["year"].values)
+        for year, total in grouped.sum().items():
+            sums[year] = (sums.get(year, 0) + int(total)) % (1 << 64)
+        for year, n in grouped.size().items():
+            counts[year] = counts.get(year, 0) + int(n)
+    return {
+        int(year): (hashlib.sha256(f"{sums[year]:016x}:{counts[year]}".encode()).hexdigest(), counts[year])
+        for year in sums
+    }
+
+def _load_manifest(conn, data_type):
+    """Return the stored file hash and {year: partition_hash} for a data_type."""
+    row = conn.execute(
+        "SELECT file_hash FROM ingestion_manifest_files WHERE data_type = ?", (data_type,)
+    ).fetchone()
+    partitions = dict(conn.execute(
+        "SELECT year, partition_hash FROM ingestion_manifest_partitions WHERE data_type = ?",
+        (data_type,)
+    ).fetchall())
+    return (row[0] if row else None), partitions
+
+def _ingest_file(conn, data_type, csv_path, chunksize, force, dimension_indexes):
+    """
+    Re-ingests only the (data_type, year) partitions of one file whose content
+    changed since the last run into its fact table. Returns the number of rows
+    inserted.
+    """
+    file_hash = hash_file(csv_path)
+    stored_file_hash, stored_partitions = _load_manifest(conn, data_type)
+    if not force and file_hash == stored_file_hash:
+        logger.info("%s unchanged; skipping %s.", csv_path, data_type)
+        return 0
+
+    partitions = hash_partitions(csv_path, data_type, chunksize)
+    changed = sorted(
+        year for year, (partition_hash, _) in partitions.items()
+        if force or stored_partitions.get(year) != partition_hash
+    )
+    removed = sorted(set(stored_partitions) - set(partitions))
+
+    insert_sql, delete_sql = _fact_sql(data_type)
+    stale = [{"data_type": data_type, "year": year} for year in changed + removed]
+    conn.executemany(delete_sql, stale)
+    conn.executemany(
+        "DELETE FROM ingestion_manifest_partitions WHERE data_type = :data_type AND year = :year", stale
+    )
+
+    if stale:
+        # 'tariffs' (the view over every fact table) is what downstream stages track.
+        bump_table_version(conn, TARIFF_FACTS[data_type][0])
+        bump_table_version(conn, "tariffs")
+
+    inserted = 0
+    if changed:
+        changed_years = set(changed)
+        for chunk in read_tariff_chunks(csv_path, data_type, chunksize):
+            chunk = chunk[chunk["year"].isin(changed_years)]
+            facts = encode_tariff_chunk(conn, chunk, data_type, dimension_indexes)
+            conn.executemany(insert_sql, facts.itertuples(index=False, name=None))
+            inserted += len(facts)
+    record_rows(rows_in=sum(row_count for _, row_count in partitions.values()), rows_out=inserted)
+
+    ingested_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    conn.executemany(
+        """
+        INSERT INTO ingestion_manifest_partitions (data_type, year, partition_hash, row_count, ingested_at)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        [(data_type, year, partitions[year][0], partitions[year][1], ingested_at) for year in changed]
+    )
+    conn.execute(
+        """
+        INSERT INTO ingestion_manifest_files (data_type, file_path, file_hash, ingested_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(data_type) DO UPDATE SET
+            file_path = excluded.file_path,
+            file_hash = excluded.file_hash,
+            ingested_at = excluded.ingested_at
+        """,
+        (data_type, csv_path, file_hash, ingested_at)
+    )
+    logger.info("%s: %d of %d year partitions changed, %d removed; inserted %d rows from %s",
+                data_type, len(changed), len(partitions), len(removed), inserted, csv_path)
+    return inserted
+
+@instrumented()
+def process_tariff_data(base_folder=TARIFF_DATA_FOLDER, chunksize=CHUNKSIZE, force=False):
+    """
+    Processes the tariff CSV files and stores them in the normalized tariff
+    store: the descriptive strings go to the dimension tables once, and each
+    row becomes integer keys plus measures in trade_flows or applied_rates
+    (read back in the old wide shape through the 'tariffs' view). Each file is
+    streamed in bounded chunks inside a single transaction, so peak memory does
+    not grow with the input size.
+
+    Loading is incremental: a manifest in the database records a hash per file
+    and per (data_type, year) partition. Unchanged files are skipped without
+    being parsed, and for changed files only the partitions whose content
+    differs are deleted and re-inserted. Pass force=True to reload everything.
+    """
+    start = time.perf_counter()
+    total_rows = 0
+
+    conn = get_connection()
+    create_tables(conn)
+    with conn:
+        dimension_indexes = {table: load_dimension_index(conn, table) for table in TARIFF_DIMENSIONS}
+        for data_type, file_name in TARIFF_FILES.items():
+            csv_path = os.path.join(base_folder, file_name)
+            total_rows += _ingest_file(conn, data_type, csv_path, chunksize, force, dimension_indexes)
+
+    elapsed = time.perf_counter() - start
+    rate = total_rows / elapsed if elapsed > 0 else float("inf")
+    logger.info("Tariff data stored successfully: %d rows in %.2fs (%.0f rows/sec).", total_rows, elapsed, rate)
 
 def main():
     process_tariff_data()
 
 if __name__ == "__main__":
+    configure_logging()
     main()
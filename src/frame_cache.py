@@ -0,0 +1,107 @@
+import os
+import glob
+import hashlib
+import tempfile
+from src import db_utils
+from src.db_utils import fetch_query, get_connection
+from src.instrumentation import record_rows
+from src.schema import get_table_version
+
+# Optional columnar cache. Without pyarrow every read falls back to read_sql.
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+FRAME_CACHE_DIR = os.path.join("cache", "frames")
+
+def _cache_folder():
+    """Per-database cache folder, so several database files never share entries."""
+    db_key = hashlib.sha1(os.path.abspath(db_utils.DB_PATH).encode()).hexdigest()[:12]
+    return os.path.join(FRAME_CACHE_DIR, db_key)
+
+def _cache_path(table_name, version):
+    return os.path.join(_cache_folder(), f"{table_name}.v{version}.arrow")
+
+def materialize_table(table_name, version=None, version_table=None):
+    """
+    Write the current contents of a table to an uncompressed Arrow IPC (Feather)
+    file tagged with its table version (or that of version_table, see
+    read_table), and delete files of older versions. Returns the file path.
+    """
+    if version is None:
+        version = get_table_version(get_connection(), version_table or table_name)
+    df = fetch_query(f'SELECT * FROM "{table_name}"')
+    folder = _cache_folder()
+    os.makedirs(folder, exist_ok=True)
+    path = _cache_path(table_name, version)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    os.close(fd)
+    # Uncompressed so the file can be memory-mapped without decoding.
+    feather.write_feather(df, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+    for stale in glob.glob(os.path.join(folder, f"{table_name}.v*.arrow")):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                pass
+    return path
+
+def invalidate_table(table_name):
+    """Drop every cached file of a table."""
+    for path in glob.glob(os.path.join(_cache_folder(), f"{table_name}.v*.arrow")):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def _filter_values(values):
+    return list(values) if isinstance(values, (list, tuple, set, frozenset)) else [values]
+
+def read_table(table_name, columns=None, filters=None, version_table=None):
+    """
+    Read a table as a DataFrame through the columnar cache.
+
+    The cache file is valid while the table's write counter (table_versions)
+    is unchanged; every writer bumps it, so the first read after a write
+    re-materializes the file and later reads memory-map it instead of
+    deserializing rows through read_sql. Numeric columns are handed to pandas
+    without an extra copy where pyarrow allows it.
+
+    Parameters:
+        columns      : Columns to return (default: all).
+        filters      : {column: value or list of values}; only rows matching
+                       every filter are returned.
+        version_table: Table whose write counter validates the cache, for
+                       tables that are only written together with another one
+                       (the tariff dimensions are versioned by 'tariffs').
+                       A table must always be read with the same version_table.
+    """
+    filters = {column: _filter_values(values) for column, values in (filters or {}).items()}
+    if feather is None:
+        column_list = ", ".join(f'"{col}"' for col in columns) if columns else "*"
+        conditions = [f'"{col}" IN ({", ".join("?" * len(values))})' for col, values in filters.items()]
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        params = tuple(value for values in filters.values() for value in values)
+        return fetch_query(f'SELECT {column_list} FROM "{table_name}"{where}', params=params)
+
+    version = get_table_version(get_connection(), version_table or table_name)
+    path = _cache_path(table_name, version)
+    if not os.path.exists(path):
+        path = materialize_table(table_name, version)
+    read_columns = None if columns is None else list(dict.fromkeys(list(columns) + list(filters)))
+    arrow_table = feather.read_table(path, columns=read_columns, memory_map=True)
+    # An empty table has untyped (null) columns; there is nothing to filter.
+    if filters and arrow_table.num_rows:
+        mask = None
+        for column, values in filters.items():
+            matches = pc.is_in(arrow_table[column], value_set=pa.array(values, type=arrow_table[column].type))
+            mask = matches if mask is None else pc.and_(mask, matches)
+        arrow_table = arrow_table.filter(mask)
+    if columns is not None:
+        arrow_table = arrow_table.select(list(columns))
+    record_rows(rows_in=arrow_table.num_rows)
+    return arrow_table.to_pandas(split_blocks=True)
@@ -0,0 +1,137 @@
+import os
+import sys
+import time
+import logging
+import cProfile
+import resource
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+# Folder for cProfile dumps of measurements taken with profile=True; None
+# disables profiling. Set with configure_profiling() (main.py --profile) or
+# the TIA_PROFILE_DIR environment variable.
+PROFILE_DIR_ENV = "TIA_PROFILE_DIR"
+_profile_dir = os.environ.get(PROFILE_DIR_ENV) or None
+
+_local = threading.local()
+
+def configure_logging(level=logging.INFO):
+    """Send log records to stderr; DEBUG also emits the per-function measurements and DataFrame dumps."""
+    logging.basicConfig(level=level, format=LOG_FORMAT)
+
+def configure_profiling(profile_dir):
+    """Dump a cProfile of every profiled measurement (pipeline stages) into profile_dir; None disables it."""
+    global _profile_dir
+    _profile_dir = profile_dir
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+
+def _peak_rss_mb():
+    """Peak resident set size of this process so far, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere.
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+class Measurement:
+    """
+    Wall time, memory, row and query counts of one measured block. Rows and
+    queries are credited by record_rows()/record_query() on the same thread to
+    every enclosing measurement; db_utils connections record every statement
+    they execute. Memory is the peak RSS of the whole process: blocks running
+    on concurrent threads share one peak, and rss_growth_mb only shows how far
+    a block raised it, not what the block itself allocated.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self.seconds = 0.0
+        self.rows_in = 0
+        self.rows_out = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.start_peak_rss_mb = _peak_rss_mb()
+        self.peak_rss_mb = self.start_peak_rss_mb
+        self.profile_path = None
+
+    @property
+    def rss_growth_mb(self):
+        """How far this block raised the process's peak RSS."""
+        return self.peak_rss_mb - self.start_peak_rss_mb
+
+    def summary(self):
+        return (f"{self.name}: {self.seconds:.3f}s, peak {self.peak_rss_mb:.1f} MiB "
+                f"(+{self.rss_growth_mb:.1f}), rows {self.rows_in:,} in / {self.rows_out:,} out, "
+                f"{self.queries} queries in {self.query_seconds:.3f}s")
+
+def _active():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+def record_rows(rows_in=0, rows_out=0):
+    """Credit rows read and written to every measurement active on this thread."""
+    for measurement in _active():
+        measurement.rows_in += rows_in
+        measurement.rows_out += rows_out
+
+def record_query(seconds, statements=1):
+    """Count SQL statements and the time spent on them against every active measurement."""
+    for measurement in _active():
+        measurement.queries += statements
+        measurement.query_seconds += seconds
+
+def _start_profiler():
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+ allows one active profiler per process; concurrent
+        # stages after the first are measured without a profile.
+        logger.warning("Another profiler is active; not profiling this block.")
+        return None
+    return profiler
+
+@contextmanager
+def measure(name, profile=False):
+    """
+    Measure the enclosed block. Yields a Measurement that is complete when the
+    block exits (also on error). The outermost measurement on a thread is
+    logged at INFO and nested ones at DEBUG. With profile=True and a profile
+    folder configured, a cProfile dump is written to <folder>/<name>-<time>.prof.
+    """
+    measurement = Measurement(name)
+    stack = _active()
+    profiler = _start_profiler() if profile and _profile_dir else None
+    stack.append(measurement)
+    start = time.perf_counter()
+    try:
+        yield measurement
+    finally:
+        measurement.seconds = time.perf_counter() - start
+        stack.pop()
+        if profiler is not None:
+            profiler.disable()
+            stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+            measurement.profile_path = os.path.join(_profile_dir, f"{name}-{stamp}.prof")
+            profiler.dump_stats(measurement.profile_path)
+        measurement.peak_rss_mb = _peak_rss_mb()
+        logger.log(logging.DEBUG if stack else logging.INFO, "%s", measurement.summary())
+
+def instrumented(name=None):
+    """Decorator form of measure(); the measurement is named after the function by default."""
+    def decorator(func):
+        label = name or f"{func.__module__.rpartition('.')[2]}.{func.__name__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with measure(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,66 @@
+import pandas as pd
+from src.db_utils import fetch_query
+
+# FRED series tracked in 'macro_observations' and the column name each one
+# gets in the analysis frames.
+MACRO_SERIES = {
+    'CPIAUCSL': 'CPI',                      # Consumer Price Index for All Urban Consumers: All Items
+    'UNRATE': 'Unemployment_Rate',          # Unemployment Rate
+    'INDPRO': 'Industrial_Production',      # Industrial Production Index
+    'GDP': 'GDP',                           # Gross Domestic Product
+}
+
+# Output frequencies (period-start labels) and per-period aggregations supported at read time.
+FREQUENCIES = {'annual': 'YS', 'quarterly': 'QS', 'monthly': 'MS'}
+AGGREGATIONS = ('first', 'mean', 'last')
+
+def load_macro_frame(series_ids=tuple(MACRO_SERIES), freq='annual', how='first', start=None, end=None):
+    """
+    Reads raw observations from the long-format 'macro_observations' table and
+    resamples them at read time.
+
+    Parameters:
+        series_ids: FRED series to load.
+        freq      : 'annual', 'quarterly' or 'monthly'.
+        how       : Aggregation within each period: 'first', 'mean' or 'last'
+                    available observation.
+        start, end: Optional date window (YYYY-MM-DD, inclusive) applied to the
+                    raw observations; served by the (series_id, date) key.
+
+    Returns:
+        A DataFrame indexed by period start with one column per series. All
+        series are pivoted and resampled together in one vectorized call.
+    """
+    if freq not in FREQUENCIES:
+        raise ValueError(f"freq must be one of {sorted(FREQUENCIES)}, got {freq!r}")
+    if how not in AGGREGATIONS:
+        raise ValueError(f"how must be one of {AGGREGATIONS}, got {how!r}")
+    series_ids = list(series_ids)
+
+    # The date bounds are only added when given, so SQLite can seek the
+    # (series_id, date) key range instead of scanning each series.
+    conditions = [f"series_id IN ({', '.join('?' * len(series_ids))})"]
+    params = list(series_ids)
+    if start is not None:
+        conditions.append("date >= ?")
+        params.append(start)
+    if end is not None:
+        conditions.append("date <= ?")
+        params.append(end)
+    query = f"SELECT series_id, date, value FROM macro_observations WHERE {' AND '.join(conditions)}"
+    observations = fetch_query(query, params=tuple(params))
+    observations['date'] = pd.to_datetime(observations['date'])
+
+    wide = observations.pivot(index='date', columns='series_id', values='value')
+    wide = wide.reindex(columns=series_ids).rename_axis(index='date', columns=None).sort_index()
+    return wide.resample(FREQUENCIES[freq]).agg(how)
+
+def load_annual_macro(how='first', start=None, end=None):
+    """
+    Yearly macro levels for the analysis: one row per year with a 'year' column
+    and the MACRO_SERIES columns (CPI, Unemployment_Rate, ...). Empty if no
+    observations have been fetched yet.
+    """
+    macro_df = load_macro_frame(tuple(MACRO_SERIES), freq='annual', how=how, start=start, end=end)
+    macro_df = macro_df.rename(columns=MACRO_SERIES).dropna(how='all')
+    return macro_df.reset_index(drop=True).assign(year=macro_df.index.year)
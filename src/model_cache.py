@@ -0,0 +1,81 @@
+import os
+import pickle
+import hashlib
+import tempfile
+import numpy as np
+
+# On-disk cache of fitted model parameters. Each entry is one pickle file named
+# by its key; file modification times double as the LRU clock.
+MODEL_CACHE_DIR = os.path.join("cache", "sarimax")
+MAX_CACHE_ENTRIES = 5000
+# Stores between LRU scans in one process. A scan stats every entry, so it is
+# amortised over many stores; the cache can exceed MAX_CACHE_ENTRIES by up to
+# this many entries per writing process until the next scan.
+EVICT_INTERVAL = 250
+
+_stores_until_evict = 0
+
+def model_cache_key(endog, exog, order, **model_kwargs):
+    """
+    Hash the inputs that determine a fit: the target series (index and values),
+    the exogenous regressors, the (p,d,q) order and any extra model options.
+    """
+    digest = hashlib.sha256()
+    digest.update(np.asarray(endog.index.astype("int64")).tobytes())
+    digest.update(np.ascontiguousarray(endog.to_numpy(dtype="float64")).tobytes())
+    if exog is None:
+        digest.update(b"no-exog")
+    else:
+        digest.update(np.ascontiguousarray(np.asarray(exog, dtype="float64")).tobytes())
+    digest.update(repr((tuple(order), sorted(model_kwargs.items()))).encode())
+    return digest.hexdigest()
+
+def _entry_path(key, cache_dir):
+    return os.path.join(cache_dir, f"{key}.pkl")
+
+def load_cached_fit(key, cache_dir=MODEL_CACHE_DIR):
+    """Return the cached entry for `key` (marking it recently used), or None."""
+    path = _entry_path(key, cache_dir)
+    try:
+        with open(path, "rb") as f:
+            entry = pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+    os.utime(path)
+    return entry
+
+def store_cached_fit(key, entry, cache_dir=MODEL_CACHE_DIR, max_entries=MAX_CACHE_ENTRIES):
+    """
+    Write an entry atomically. The first store in a process, and every
+    EVICT_INTERVAL-th after it, then evicts the least recently used entries so
+    at most `max_entries` remain. Safe to call from several processes at once.
+    """
+    global _stores_until_evict
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, _entry_path(key, cache_dir))
+    _stores_until_evict -= 1
+    if _stores_until_evict <= 0:
+        evict_lru(cache_dir, max_entries)
+        _stores_until_evict = EVICT_INTERVAL
+
+def evict_lru(cache_dir=MODEL_CACHE_DIR, max_entries=MAX_CACHE_ENTRIES):
+    """Delete the least recently used entries beyond `max_entries`."""
+    entries = []
+    for dir_entry in os.scandir(cache_dir):
+        if dir_entry.name.endswith(".pkl"):
+            try:
+                entries.append((dir_entry.stat().st_mtime, dir_entry.path))
+            except FileNotFoundError:
+                continue
+    if len(entries) <= max_entries:
+        return
+    entries.sort()
+    for _, path in entries[:len(entries) - max_entries]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # Another process evicted it first.
+            pass
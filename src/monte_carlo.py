@@ -0,0 +1,251 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.statespace.tools import is_invertible
+from src.instrumentation import configure_logging, instrumented
+from src.SARIMAX_model import (
+    POOL_CONTEXT, TARGET_DELTAS, SCENARIO_EXOG_COLUMN, fit_history, fit_sarimax, load_economic_impact,
+    compute_deltas, load_new_tariffs
+)
+
+logger = logging.getLogger(__name__)
+
+# Total simulated paths per target, paths simulated per batched step, and the
+# number of parameter vectors drawn from each model's estimated covariance.
+MC_PATHS = 100_000
+MC_CHUNK_SIZE = 20_000
+MC_PARAM_DRAWS = 200
+
+# Worker processes (None = one per CPU, 1 = simulate in-process).
+MC_MAX_WORKERS = None
+
+# Paths are not kept: each target and horizon is summarised by a fixed-bin
+# histogram whose range comes from a pilot run, plus under/overflow counts.
+MC_HISTOGRAM_BINS = 4096
+MC_PILOT_PATHS = 5_000
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+def _psd_sqrt(matrix):
+    """Square root L with L @ L.T == matrix for a (possibly singular) PSD matrix."""
+    eigenvalues, eigenvectors = np.linalg.eigh(matrix)
+    return eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+
+def _last(matrix):
+    """Time-invariant view of a state-space matrix (last period if time-varying)."""
+    matrix = np.asarray(matrix)
+    return matrix[..., -1] if matrix.ndim == 3 else matrix
+
+def _valid_draw(model, params):
+    """True if a parameter draw has positive variances and stationary AR / invertible MA parts."""
+    names = model.param_names
+    values = dict(zip(names, params))
+    if any(values[name] <= 0 for name in names if name.startswith('sigma2')):
+        return False
+    ar = [values[name] for name in names if name.startswith('ar.L')]
+    ma = [values[name] for name in names if name.startswith('ma.L')]
+    stationary = not ar or is_invertible(np.r_[1, -np.asarray(ar)])
+    return stationary and (not ma or is_invertible(np.r_[1, np.asarray(ma)]))
+
+def draw_parameters(model_fit, n_draws, rng):
+    """
+    Draw parameter vectors from N(params, cov_params), keeping only admissible
+    draws. Falls back to the point estimate when the covariance is unusable.
+    """
+    params = np.asarray(model_fit.params, dtype=float)
+    cov = np.asarray(model_fit.cov_params(), dtype=float)
+    if not np.all(np.isfinite(cov)):
+        return params[None, :]
+    draws = []
+    for _ in range(20):
+        candidates = rng.multivariate_normal(params, cov, size=n_draws, method='eigh')
+        draws.extend(draw for draw in candidates if _valid_draw(model_fit.model, draw))
+        if len(draws) >= n_draws:
+            return np.asarray(draws[:n_draws])
+    return np.asarray(draws) if draws else params[None, :]
+
+def state_space_draws(model_fit, param_draws):
+    """
+    Stack the forecast-time state-space system of the model at every parameter
+    draw: transition, scaled selection, design, measurement sd, state intercept,
+    exog coefficient and the predicted state mean / covariance root after the
+    last observation.
+    """
+    model = model_fit.model
+    beta_index = model.param_names.index(model.exog_names[0])
+    system = {key: [] for key in ('T', 'R', 'Z', 'H', 'c', 'beta', 'a0', 'P0')}
+    for params in param_draws:
+        filtered = model.filter(params)
+        system['T'].append(_last(model.ssm['transition']))
+        system['R'].append(_last(model.ssm['selection']) @ _psd_sqrt(_last(model.ssm['state_cov'])))
+        system['Z'].append(_last(model.ssm['design'])[0])
+        system['H'].append(np.sqrt(max(_last(model.ssm['obs_cov'])[0, 0], 0.0)))
+        system['c'].append(_last(model.ssm['state_intercept']))
+        system['beta'].append(params[beta_index])
+        system['a0'].append(filtered.predicted_state[:, -1])
+        system['P0'].append(_psd_sqrt(filtered.predicted_state_cov[:, :, -1]))
+    return {key: np.asarray(values, dtype=float) for key, values in system.items()}
+
+def simulate_paths(system, tariff_low, tariff_high, n_paths, rng):
+    """
+    Simulate n_paths forecast paths (n_paths x horizon) in one batched pass.
+    Each path takes a random parameter draw, a tariff rate drawn uniformly
+    between tariff_low and tariff_high (per-horizon arrays, one draw per path),
+    and state and measurement innovations.
+    """
+    horizon = len(tariff_low)
+    idx = rng.integers(len(system['beta']), size=n_paths)
+    T, R, Z, c = system['T'][idx], system['R'][idx], system['Z'][idx], system['c'][idx]
+    H, beta = system['H'][idx], system['beta'][idx]
+
+    state = system['a0'][idx] + np.einsum('nij,nj->ni', system['P0'][idx], rng.standard_normal(T.shape[:2]))
+    rates = tariff_low + rng.random(n_paths)[:, None] * (tariff_high - tariff_low)
+    paths = np.empty((n_paths, horizon))
+    for h in range(horizon):
+        paths[:, h] = (np.einsum('ni,ni->n', Z, state) + beta * rates[:, h]
+                       + H * rng.standard_normal(n_paths))
+        state = c + np.einsum('nij,nj->ni', T, state) + np.einsum('nij,nj->ni', R, rng.standard_normal(R.shape[::2]))
+    return paths
+
+def _histogram_counts(paths, lower, upper, bins):
+    """Per-horizon bin counts (horizon x bins+2; first/last are under/overflow)."""
+    horizon = paths.shape[1]
+    width = (upper - lower) / bins
+    positions = np.floor((paths - lower) / width).astype(np.int64)
+    positions = np.clip(positions, -1, bins) + 1
+    flat = positions + np.arange(horizon) * (bins + 2)
+    return np.bincount(flat.ravel(), minlength=horizon * (bins + 2)).reshape(horizon, bins + 2)
+
+def _simulate_block(task):
+    """Worker entry point: stream n_paths through the histogram in chunks."""
+    system, tariff_low, tariff_high, lower, upper, bins, n_paths, chunk_size, seed = task
+    rng = np.random.default_rng(seed)
+    counts = np.zeros((len(tariff_low), bins + 2), dtype=np.int64)
+    totals = np.zeros(len(tariff_low))
+    for start in range(0, n_paths, chunk_size):
+        paths = simulate_paths(system, tariff_low, tariff_high, min(chunk_size, n_paths - start), rng)
+        counts += _histogram_counts(paths, lower, upper, bins)
+        totals += paths.sum(axis=0)
+    return counts, totals
+
+def histogram_quantiles(counts, lower, upper, quantiles):
+    """Quantiles (horizon x len(quantiles)) from histogram counts, interpolating within bins."""
+    bins = counts.shape[1] - 2
+    width = (upper - lower) / bins
+    cumulative = np.cumsum(counts, axis=1)
+    result = np.empty((counts.shape[0], len(quantiles)))
+    for h in range(counts.shape[0]):
+        for j, q in enumerate(quantiles):
+            rank = q * cumulative[h, -1]
+            position = min(int(np.searchsorted(cumulative[h], rank)), bins + 1)
+            if position == 0:
+                result[h, j] = lower[h]
+            elif position == bins + 1:
+                result[h, j] = upper[h]
+            else:
+                before = cumulative[h, position - 1]
+                fraction = (rank - before) / max(counts[h, position], 1)
+                result[h, j] = lower[h] + (position - 1 + fraction) * width[h]
+    return result
+
+def _as_path(values, horizon):
+    return np.broadcast_to(np.asarray(values, dtype=float), (horizon,)).copy()
+
+@instrumented()
+def simulate_forecast_distribution(economic_df, tariff_low, tariff_high, target_columns=TARGET_DELTAS,
+                                   exog_column=SCENARIO_EXOG_COLUMN, orders=(1,1,0), horizon=1,
+                                   n_paths=MC_PATHS, n_param_draws=MC_PARAM_DRAWS,
+                                   quantiles=DEFAULT_QUANTILES, chunk_size=MC_CHUNK_SIZE,
+                                   max_workers=MC_MAX_WORKERS, bins=MC_HISTOGRAM_BINS, seed=None):
+    """
+    Monte Carlo forecast distribution of every target under uncertain tariffs.
+
+    Each target is fitted once (through the model cache) on the historical
+    tariff measure `exog_column`, as in forecast_scenarios. Every simulated
+    path combines a parameter vector drawn from the fit's estimated covariance,
+    a tariff rate drawn uniformly between tariff_low and tariff_high, and
+    state and measurement innovations, and is propagated through the
+    state-space form of the model with batched NumPy operations.
+
+    Paths are simulated in chunks of chunk_size and reduced to per-horizon
+    histograms as they are produced, so memory does not grow with n_paths.
+    Blocks of paths are spread over worker processes; every block has its own
+    random stream spawned from `seed`, so results are reproducible for a given
+    seed and worker count.
+
+    Parameters:
+        economic_df  : DataFrame with a DateTimeIndex, the target columns and exog_column.
+        tariff_low,
+        tariff_high  : Tariff rate range in percent; scalars or one value per horizon.
+        orders       : The (p,d,q) order for every target, or a dict {target: order}.
+        horizon      : Number of steps ahead.
+        quantiles    : Quantiles to report.
+
+    Returns:
+        A DataFrame indexed by (target, horizon) with the mean and the requested quantiles.
+    """
+    tariff_low, tariff_high = _as_path(tariff_low, horizon), _as_path(tariff_high, horizon)
+    seed_sequence = np.random.SeedSequence(seed)
+    n_blocks = max(1, -(-n_paths // chunk_size))
+    block_sizes = np.diff(np.linspace(0, n_paths, n_blocks + 1).astype(int))
+
+    systems, ranges, tasks = {}, {}, []
+    for target in target_columns:
+        order = orders[target] if isinstance(orders, dict) else orders
+        history = fit_history(economic_df, target, exog_column)
+        model_fit = fit_sarimax(history[target], history[exog_column], order)
+        target_seed, pilot_seed, block_seed = seed_sequence.spawn(3)
+        systems[target] = state_space_draws(model_fit, draw_parameters(model_fit, n_param_draws,
+                                                                       np.random.default_rng(target_seed)))
+
+        # The pilot run sets the histogram range; anything outside it is counted
+        # in the under/overflow bins.
+        pilot = simulate_paths(systems[target], tariff_low, tariff_high, MC_PILOT_PATHS,
+                               np.random.default_rng(pilot_seed))
+        spread = np.maximum(pilot.max(axis=0) - pilot.min(axis=0), 1e-9 * np.maximum(np.abs(pilot).max(axis=0), 1))
+        lower, upper = pilot.min(axis=0) - spread, pilot.max(axis=0) + spread
+        ranges[target] = (lower, upper)
+        tasks += [(target, (systems[target], tariff_low, tariff_high, lower, upper, bins, int(size),
+                            chunk_size, child))
+                  for size, child in zip(block_sizes, block_seed.spawn(n_blocks))]
+
+    if max_workers == 1:
+        results = [_simulate_block(task) for _, task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=POOL_CONTEXT) as executor:
+            results = list(executor.map(_simulate_block, [task for _, task in tasks]))
+
+    frames = []
+    for target in target_columns:
+        blocks = [result for (name, _), result in zip(tasks, results) if name == target]
+        counts = sum(block_counts for block_counts, _ in blocks)
+        means = sum(block_totals for _, block_totals in blocks) / n_paths
+        lower, upper = ranges[target]
+        bands = histogram_quantiles(counts, lower, upper, quantiles)
+        frame = pd.DataFrame(bands, columns=list(quantiles))
+        frame.insert(0, 'mean', means)
+        frame.index = pd.MultiIndex.from_product([[target], range(1, horizon + 1)], names=['target', 'horizon'])
+        frames.append(frame)
+    return pd.concat(frames)
+
+def tariff_rate_range(new_tariff_df, weights=None):
+    """
+    (low, high) tariff rate range from the new_tariffs schedule: the average
+    US discounted reciprocal rate and the average rate charged to the US,
+    weighted by `weights` (a Series indexed by country) if given.
+    """
+    if weights is None:
+        return new_tariff_df['usa_discounted_tariff'].mean(), new_tariff_df['tariff_charged_us'].mean()
+    country_weights = new_tariff_df['country'].map(weights)
+    covered = country_weights.notna()
+    low = np.average(new_tariff_df.loc[covered, 'usa_discounted_tariff'], weights=country_weights[covered])
+    high = np.average(new_tariff_df.loc[covered, 'tariff_charged_us'], weights=country_weights[covered])
+    return low, high
+
+if __name__ == "__main__":
+    configure_logging()
+    economic_df = compute_deltas(load_economic_impact())
+    low, high = tariff_rate_range(load_new_tariffs())
+    logger.info("Simulating tariff rates between %.2f%% and %.2f%%", low, high)
+    distribution = simulate_forecast_distribution(economic_df, low, high, horizon=3, seed=0)
+    logger.info("Forecast distribution:\n%s", distribution)
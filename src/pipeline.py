@@ -0,0 +1,297 @@
+import os
+import json
+import uuid
+import hashlib
+import logging
+from collections import namedtuple
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from src.config import OUTPUT_PATH
+from src.db_manager import initialize_database
+from src.db_utils import get_connection
+from src.instrumentation import measure
+from src.schema import get_table_version, table_exists
+
+logger = logging.getLogger(__name__)
+
+# A pipeline stage. `inputs` and `outputs` are 'file:<path>' or 'table:<name>'
+# specs; a stage is skipped when the fingerprint of its inputs matches its last
+# successful run and all its outputs exist. inputs=None means the stage reads
+# something the runner cannot fingerprint (e.g. a remote API) and always runs.
+# `inputs` may also be a function returning the specs, so that stage modules
+# (and pandas) are only imported when the stage is actually considered.
+Stage = namedtuple('Stage', ['name', 'run', 'depends_on', 'inputs', 'outputs'])
+
+# Parallel stage threads; the three loaders are independent of each other.
+PIPELINE_MAX_WORKERS = 3
+
+def _tariff_file_inputs():
+    from src.fetch_tariffs import TARIFF_DATA_FOLDER, TARIFF_FILES
+    return tuple(f"file:{os.path.join(TARIFF_DATA_FOLDER, name)}" for name in TARIFF_FILES.values())
+
+def _reciprocal_file_inputs():
+    from src.fetch_new_tariffs import RECIPROCAL_TARIFFS_PATH
+    return (f"file:{RECIPROCAL_TARIFFS_PATH}",)
+
+def _ingest_tariffs():
+    from src.fetch_tariffs import process_tariff_data
+    process_tariff_data()
+
+def _fetch_macro():
+    from src.fetch_macro_data import fetch_and_store_macro_data_as_economic_impact
+    fetch_and_store_macro_data_as_economic_impact()
+
+def _load_reciprocal_tariffs():
+    from src.fetch_new_tariffs import store_new_reciprocal_tariffs
+    store_new_reciprocal_tariffs()
+
+def _compute_impact():
+    from src.delta_calculations import calculate_economic_impact
+    calculate_economic_impact()
+
+def _partner_impact():
+    from src.delta_calculations import IMPACT_LEVELS, calculate_partner_impact
+    for level in IMPACT_LEVELS:
+        calculate_partner_impact(level)
+
+def _tariff_exposure():
+    from src.tariff_exposure import store_tariff_exposure
+    store_tariff_exposure()
+
+def _visualize():
+    import matplotlib
+    matplotlib.use("Agg")
+    from src.visuals import run_visualizations
+    run_visualizations()
+
+def _forecast():
+    import matplotlib
+    matplotlib.use("Agg")
+    from src.SARIMAX_model import run_forecast
+    run_forecast()
+
+def _backtest():
+    from src.backtest import run_backtest
+    run_backtest()
+
+def _forecast_paths():
+    from src.SARIMAX_model import run_path_forecasts
+    run_path_forecasts()
+
+STAGES = [
+    Stage('ingest_tariffs', _ingest_tariffs, (), _tariff_file_inputs, ('table:tariffs',)),
+    Stage('fetch_macro', _fetch_macro, (), None, ('table:macro_observations',)),
+    Stage('load_reciprocal_tariffs', _load_reciprocal_tariffs, (),
+          _reciprocal_file_inputs, ('table:new_tariffs',)),
+    Stage('compute_impact', _compute_impact, ('ingest_tariffs', 'fetch_macro'),
+          ('table:tariffs', 'table:macro_observations', 'table:legacy_macro_levels'),
+          ('table:economic_levels', 'table:economic_impact')),
+    Stage('partner_impact', _partner_impact, ('ingest_tariffs', 'fetch_macro'),
+          ('table:tariffs', 'table:macro_observations', 'table:legacy_macro_levels'), ('table:partner_impact',)),
+    Stage('tariff_exposure', _tariff_exposure, ('ingest_tariffs', 'load_reciprocal_tariffs'),
+          ('table:tariffs', 'table:new_tariffs'), ('table:tariff_exposure',)),
+    Stage('visualize', _visualize, ('compute_impact',),
+          ('table:economic_impact',),
+          tuple(f"file:{os.path.join('output', name)}" for name in (
+              'correlation_matrix.png', 'scatter_regression.png',
+              'year_to_year_subplots.png', 'delta_relationships.png'))),
+    Stage('forecast', _forecast, ('compute_impact', 'load_reciprocal_tariffs', 'tariff_exposure'),
+          ('table:economic_impact', 'table:new_tariffs', 'table:tariff_exposure'),
+          (f"file:{os.path.join(OUTPUT_PATH, 'SARIMAX_ECONOMIC_FORECAST.png')}",)),
+    Stage('backtest', _backtest, ('compute_impact',), ('table:economic_impact',), ('table:backtest_results',)),
+    Stage('forecast_paths', _forecast_paths, ('compute_impact', 'load_reciprocal_tariffs'),
+          ('table:economic_impact', 'table:new_tariffs'), ('table:forecasts',)),
+]
+STAGE_NAMES = [stage.name for stage in STAGES]
+
+def _describe(spec):
+    """Current state of one input spec: file size and mtime, or table version."""
+    kind, _, target = spec.partition(':')
+    if kind == 'file':
+        try:
+            stat = os.stat(target)
+        except FileNotFoundError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+    if kind == 'table':
+        return get_table_version(get_connection(), target)
+    raise ValueError(f"Unknown input spec: {spec!r}")
+
+def input_fingerprint(stage):
+    """Hash of the current state of every input of a stage."""
+    specs = stage.inputs() if callable(stage.inputs) else stage.inputs
+    state = {spec: _describe(spec) for spec in specs}
+    return hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()
+
+def _outputs_exist(stage):
+    for spec in stage.outputs:
+        kind, _, target = spec.partition(':')
+        if kind == 'file' and not os.path.exists(target):
+            return False
+        if kind == 'table' and not table_exists(get_connection(), target):
+            return False
+    return True
+
+def _stored_fingerprint(stage_name):
+    row = get_connection().execute(
+        "SELECT input_fingerprint FROM pipeline_state WHERE stage = ?", (stage_name,)
+    ).fetchone()
+    return row[0] if row else None
+
+def _run_stage(stage, force):
+    """Run one stage unless its inputs are unchanged; returns 'ran' or 'skipped'."""
+    fingerprint = None if stage.inputs is None else input_fingerprint(stage)
+    if (not force and fingerprint is not None and _outputs_exist(stage)
+            and fingerprint == _stored_fingerprint(stage.name)):
+        logger.info("[%s] inputs unchanged; skipping.", stage.name)
+        return 'skipped'
+
+    logger.info("[%s] running...", stage.name)
+    stage.run()
+    with get_connection() as conn:
+        conn.execute(
+            """
+            INSERT INTO pipeline_state (stage, input_fingerprint, completed_at) VALUES (?, ?, ?)
+            ON CONFLICT (stage) DO UPDATE SET
+                input_fingerprint = excluded.input_fingerprint,
+                completed_at = excluded.completed_at
+            """,
+            (stage.name, fingerprint or '', datetime.now(timezone.utc).isoformat(timespec='seconds'))
+        )
+    return 'ran'
+
+def _record_run(run_id, stage_name, measurement, status, error=None):
+    """
+    Write one stage's outcome and measurement to the 'pipeline_runs' ledger.
+    measurement is None when the stage failed before it could be measured;
+    the row is then written with empty metrics.
+    """
+    if measurement is None:
+        started_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        metrics = (None,) * 7 + (error, None)
+    else:
+        started_at = measurement.started_at
+        metrics = (measurement.seconds, measurement.peak_rss_mb, measurement.rss_growth_mb,
+                   measurement.rows_in, measurement.rows_out, measurement.queries,
+                   measurement.query_seconds, error, measurement.profile_path)
+    with get_connection() as conn:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO pipeline_runs
+                (run_id, stage, started_at, status, seconds, peak_rss_mb, rss_growth_mb,
+                 rows_in, rows_out, queries, query_seconds, error, profile_path)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (run_id, stage_name, started_at, status) + metrics
+        )
+
+def _execute_stage(stage, force, run_id):
+    """
+    Run one stage under an instrumentation measurement (profiled when a
+    profile folder is configured) and record it in the run ledger, whether it
+    ran, was skipped or failed.
+    """
+    status, error, measurement = 'failed', None, None
+    try:
+        with measure(stage.name, profile=True) as measurement:
+            status = _run_stage(stage, force)
+    except Exception as exc:
+        error = repr(exc)
+        raise
+    finally:
+        _record_run(run_id, stage.name, measurement, status, error)
+    return status
+
+def select_stages(only=None, start_from=None):
+    """
+    Names of the stages to run: `only` (an iterable of names) runs exactly those
+    stages; `start_from` runs that stage and everything downstream of it.
+    """
+    requested = list(only or []) + ([start_from] if start_from else [])
+    unknown = [name for name in requested if name not in STAGE_NAMES]
+    if unknown:
+        raise ValueError(f"Unknown stage(s) {unknown}; choose from {STAGE_NAMES}")
+    if only:
+        return set(only)
+    if start_from:
+        selected = {start_from}
+        for stage in STAGES:  # STAGES is listed in dependency order
+            if selected.intersection(stage.depends_on):
+                selected.add(stage.name)
+        return selected
+    return set(STAGE_NAMES)
+
+def run_pipeline(only=None, start_from=None, force=False, max_workers=PIPELINE_MAX_WORKERS):
+    """
+    Run the selected stages of the stage graph. A stage starts as soon as all of
+    its selected upstream stages have finished, so independent stages (the
+    tariff, macro and reciprocal tariff loaders) run concurrently. Stages whose
+    inputs have not changed since their last successful run are skipped unless
+    force=True. Stages downstream of a failure are not run.
+
+    Every executed stage is recorded in the 'pipeline_runs' ledger under a
+    new run id.
+
+    Returns:
+        {stage name: 'ran' | 'skipped' | 'failed' | 'blocked'}.
+    """
+    initialize_database()
+    run_id = uuid.uuid4().hex
+    logger.info("Pipeline run %s", run_id)
+    selected = select_stages(only, start_from)
+    pending = {stage.name: stage for stage in STAGES if stage.name in selected}
+    results = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+        while pending or running:
+            for name, stage in list(pending.items()):
+                upstream = [dep for dep in stage.depends_on if dep in selected]
+                if any(results.get(dep) in ('failed', 'blocked') for dep in upstream):
+                    results[name] = 'blocked'
+                    del pending[name]
+                elif all(results.get(dep) in ('ran', 'skipped') for dep in upstream):
+                    running[executor.submit(_execute_stage, stage, force, run_id)] = name
+                    del pending[name]
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as exc:
+                    logger.error("[%s] failed: %r", name, exc, exc_info=logger.isEnabledFor(logging.DEBUG))
+                    results[name] = 'failed'
+
+    failed = [name for name in STAGE_NAMES if results.get(name) in ('failed', 'blocked')]
+    if failed:
+        raise RuntimeError(f"Pipeline stages did not complete: {failed}")
+    return {name: results[name] for name in STAGE_NAMES if name in results}
+
+def pipeline_status():
+    """
+    Last successful run and last ledger entry of every stage, and the write
+    counter of every table, read with plain SQL so it needs neither pandas nor
+    the stage modules.
+
+    Returns:
+        [(stage, completed_at, last_status, last_seconds)], with None for
+        stages that never ran, and [(table, version, updated_at)].
+    """
+    conn = get_connection()
+    completed, last_runs = {}, {}
+    if table_exists(conn, 'pipeline_state'):
+        completed = dict(conn.execute("SELECT stage, completed_at FROM pipeline_state").fetchall())
+    if table_exists(conn, 'pipeline_runs'):
+        # SQLite takes the bare columns from the row holding MAX(started_at).
+        last_runs = {stage: (status, seconds) for stage, status, seconds, _ in conn.execute(
+            "SELECT stage, status, seconds, MAX(started_at) FROM pipeline_runs GROUP BY stage"
+        )}
+    table_rows = []
+    if table_exists(conn, 'table_versions'):
+        table_rows = conn.execute(
+            "SELECT table_name, version, updated_at FROM table_versions ORDER BY table_name"
+        ).fetchall()
+    stage_rows = [(name, completed.get(name)) + last_runs.get(name, (None, None)) for name in STAGE_NAMES]
+    return stage_rows, table_rows
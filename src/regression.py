@@ -0,0 +1,99 @@
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+# Simple linear regressions y = intercept + slope * x for several response
+# columns at once. Every field except `columns` is an array with one entry per column.
+RegressionResult = namedtuple(
+    'RegressionResult',
+    ['columns', 'intercept', 'slope', 'intercept_se', 'slope_se', 'r_squared', 'n_obs'],
+)
+
+def _solve_group(x, Y):
+    """
+    OLS of every column of Y (n x k, no missing values) on [1, x] via one QR.
+    A constant x makes the design rank deficient; every statistic is then NaN.
+    """
+    X = np.column_stack([np.ones_like(x), x])
+    Q, R = np.linalg.qr(X)
+    n_obs = len(x)
+    k = Y.shape[1]
+    # Same tolerance as np.linalg.matrix_rank, applied to the diagonal of R.
+    tolerance = np.abs(np.diag(R)).max() * max(X.shape) * np.finfo(float).eps
+    if np.abs(np.diag(R)).min() <= tolerance:
+        return np.full((2, k), np.nan), np.full((2, k), np.nan), np.full(k, np.nan), n_obs
+    coef = np.linalg.solve(R, Q.T @ Y)                      # 2 x k
+    residuals = Y - X @ coef
+    dof = n_obs - 2
+    rss = np.einsum('ij,ij->j', residuals, residuals)
+    centered = Y - Y.mean(axis=0)
+    tss = np.einsum('ij,ij->j', centered, centered)
+    R_inv = np.linalg.inv(R)
+    xtx_inv_diag = np.einsum('ij,ij->i', R_inv, R_inv)      # diag((X'X)^-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma2 = rss / dof if dof > 0 else np.full_like(rss, np.nan)
+        se = np.sqrt(np.outer(xtx_inv_diag, sigma2))
+        r_squared = 1.0 - rss / tss
+    return coef, se, r_squared, n_obs
+
+def fit_batched_ols(x, Y):
+    """
+    Regress every column of Y on the common regressor x (plus an intercept)
+    with a single least-squares solve per missing-value pattern.
+
+    Parameters:
+        x : 1-D array-like regressor of length n.
+        Y : DataFrame, Series or array (n x k) of response columns.
+
+    Rows where x or a response is missing are dropped for that response;
+    columns with the same missing rows are solved together in one QR. A
+    response whose remaining x values are all equal gets NaN statistics.
+
+    Returns:
+        A RegressionResult with coefficient, standard error and R-squared arrays.
+    """
+    if isinstance(Y, pd.Series):
+        Y = Y.to_frame()
+    columns = list(Y.columns) if isinstance(Y, pd.DataFrame) else None
+    x = np.asarray(x, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    if Y.ndim == 1:
+        Y = Y[:, None]
+    if columns is None:
+        columns = list(range(Y.shape[1]))
+
+    k = Y.shape[1]
+    coef = np.full((2, k), np.nan)
+    se = np.full((2, k), np.nan)
+    r_squared = np.full(k, np.nan)
+    n_obs = np.zeros(k, dtype=int)
+
+    valid = ~np.isnan(Y) & ~np.isnan(x)[:, None]
+    patterns, group_ids = np.unique(valid.T, axis=0, return_inverse=True)
+    for group, rows in enumerate(patterns):
+        cols = np.flatnonzero(group_ids.ravel() == group)
+        if rows.sum() < 2:
+            continue
+        g_coef, g_se, g_r2, g_n = _solve_group(x[rows], Y[np.ix_(rows, cols)])
+        coef[:, cols] = g_coef
+        se[:, cols] = g_se
+        r_squared[cols] = g_r2
+        n_obs[cols] = g_n
+
+    return RegressionResult(columns, coef[0], coef[1], se[0], se[1], r_squared, n_obs)
+
+def predict_lines(result, x_values):
+    """Fitted values for every response at x_values, shape (len(x_values), k)."""
+    x_values = np.asarray(x_values, dtype=float)
+    return result.intercept[None, :] + result.slope[None, :] * x_values[:, None]
+
+def regression_table(result):
+    """One row per response column with its coefficients, standard errors and R-squared."""
+    return pd.DataFrame({
+        'intercept': result.intercept,
+        'slope': result.slope,
+        'intercept_se': result.intercept_se,
+        'slope_se': result.slope_se,
+        'r_squared': result.r_squared,
+        'n_obs': result.n_obs,
+    }, index=pd.Index(result.columns, name='response'))
@@ -1,47 +1,546 @@
-def create_tables(conn):
-    cursor = conn.cursor()
-    
-    # Tariffs table remains unchanged
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS tariffs (
-        data_type TEXT,
-        reporter_name TEXT,
+# Normalized tariff store. The descriptive strings of the WITS extracts live
+# once in dimension tables under integer surrogate keys; each distinct
+# combination of a dimension's columns gets its own key, so the original
+# strings are reproduced exactly. See src/tariff_store.py.
+TARIFF_DIMENSION_TABLES_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS reporters (
+        reporter_id INTEGER PRIMARY KEY,
         reporter_code TEXT,
-        year INTEGER,
+        reporter_name TEXT,
+        UNIQUE (reporter_code, reporter_name)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS partners (
+        partner_id INTEGER PRIMARY KEY,
+        partner_code TEXT,
+        partner_name TEXT,
+        UNIQUE (partner_code, partner_name)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS products (
+        product_id INTEGER PRIMARY KEY,
         classification TEXT,
         classification_version TEXT,
         product_code TEXT,
         mtn_categories TEXT,
-        partner_code TEXT,
-        partner_name TEXT,
-        value REAL,
+        UNIQUE (product_code, classification, classification_version, mtn_categories)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS duty_schemes (
+        duty_scheme_id INTEGER PRIMARY KEY,
         duty_scheme_code TEXT,
         duty_scheme_name TEXT,
-        simple_average REAL,
-        trade_weighted REAL,
-        duty_free_share REAL
+        UNIQUE (duty_scheme_code, duty_scheme_name)
+    );
+    """,
+]
+
+# Fact tables: bilateral trade values (data_type 'imports' or 'exports') and
+# applied tariff rates, holding only keys, the year and the measures.
+TRADE_FLOWS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS trade_flows (
+    data_type TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    reporter_id INTEGER NOT NULL REFERENCES reporters (reporter_id),
+    partner_id INTEGER NOT NULL REFERENCES partners (partner_id),
+    product_id INTEGER NOT NULL REFERENCES products (product_id),
+    value REAL
+);
+"""
+
+APPLIED_RATES_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS applied_rates (
+    year INTEGER NOT NULL,
+    reporter_id INTEGER NOT NULL REFERENCES reporters (reporter_id),
+    product_id INTEGER NOT NULL REFERENCES products (product_id),
+    duty_scheme_id INTEGER NOT NULL REFERENCES duty_schemes (duty_scheme_id),
+    simple_average REAL,
+    trade_weighted REAL,
+    duty_free_share REAL
+);
+"""
+
+# Read-only view with the shape of the former wide 'tariffs' table, for ad hoc
+# queries and older readers. Pipeline code reads the fact tables directly.
+TARIFFS_VIEW_SQL = """
+CREATE VIEW IF NOT EXISTS tariffs AS
+SELECT
+    f.data_type, r.reporter_name, r.reporter_code, f.year,
+    p.classification, p.classification_version, p.product_code, p.mtn_categories,
+    pt.partner_code, pt.partner_name, f.value,
+    NULL AS duty_scheme_code, NULL AS duty_scheme_name,
+    NULL AS simple_average, NULL AS trade_weighted, NULL AS duty_free_share
+FROM trade_flows f
+JOIN reporters r ON r.reporter_id = f.reporter_id
+JOIN products p ON p.product_id = f.product_id
+JOIN partners pt ON pt.partner_id = f.partner_id
+UNION ALL
+SELECT
+    'applied', r.reporter_name, r.reporter_code, a.year,
+    p.classification, p.classification_version, p.product_code, p.mtn_categories,
+    NULL, NULL, NULL,
+    d.duty_scheme_code, d.duty_scheme_name,
+    a.simple_average, a.trade_weighted, a.duty_free_share
+FROM applied_rates a
+JOIN reporters r ON r.reporter_id = a.reporter_id
+JOIN products p ON p.product_id = a.product_id
+JOIN duty_schemes d ON d.duty_scheme_id = a.duty_scheme_id;
+"""
+
+# Ingestion manifest: one content hash per source file and one per
+# (data_type, year) partition of the 'tariffs' table.
+MANIFEST_TABLES_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS ingestion_manifest_files (
+        data_type TEXT PRIMARY KEY,
+        file_path TEXT NOT NULL,
+        file_hash TEXT NOT NULL,
+        ingested_at TEXT NOT NULL
     );
-    """)
-
-    # Merged Economic Impact table (combining tariff deltas and macro data)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS economic_impact (
-        year INTEGER PRIMARY KEY,
-        avg_tariff_rate REAL,
-        imports_value REAL,
-        exports_value REAL,
-        GDP REAL,
-        CPI REAL,
-        Unemployment_Rate REAL,
-        Industrial_Production REAL
-        delta_tariff REAL,
-        delta_imports REAL,
-        delta_exports REAL,
-        delta_GDP REAL,
-        cpi_delta REAL,
-        unemployment_delta REAL,
-        industrial_delta REAL,
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ingestion_manifest_partitions (
+        data_type TEXT NOT NULL,
+        year INTEGER NOT NULL,
+        partition_hash TEXT NOT NULL,
+        row_count INTEGER NOT NULL,
+        ingested_at TEXT NOT NULL,
+        PRIMARY KEY (data_type, year)
     );
-    """)
+    """,
+]
+
+ECONOMIC_IMPACT_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS economic_impact (
+    year INTEGER PRIMARY KEY,
+    avg_tariff_rate REAL,
+    imports_value REAL,
+    exports_value REAL,
+    GDP REAL,
+    CPI REAL,
+    Unemployment_Rate REAL,
+    Industrial_Production REAL,
+    delta_tariff REAL,
+    delta_imports REAL,
+    delta_exports REAL,
+    delta_GDP REAL,
+    cpi_delta REAL,
+    unemployment_delta REAL,
+    industrial_delta REAL
+);
+"""
+
+# Yearly inputs of economic_impact, materialized from the raw tariff and macro
+# tables: tariff aggregates (has_tariffs = the year has applied, imports and
+# exports rows) and first-of-year macro levels (has_macro = any observation).
+# The signatures identify the raw data each row was computed from, so only
+# years whose inputs changed are recomputed.
+ECONOMIC_LEVELS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS economic_levels (
+    year INTEGER PRIMARY KEY,
+    has_tariffs INTEGER NOT NULL,
+    avg_tariff_rate REAL,
+    imports_value REAL,
+    exports_value REAL,
+    has_macro INTEGER NOT NULL,
+    GDP REAL,
+    CPI REAL,
+    Unemployment_Rate REAL,
+    Industrial_Production REAL,
+    tariff_signature TEXT,
+    macro_signature TEXT
+);
+"""
+
+# Annual macro levels recovered from economic_impact rows written before raw
+# observations were kept in macro_observations (see _migrate_to_v4). They are
+# the macro input of the impact tables while macro_observations is empty.
+LEGACY_MACRO_LEVELS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS legacy_macro_levels (
+    year INTEGER PRIMARY KEY,
+    GDP REAL,
+    CPI REAL,
+    Unemployment_Rate REAL,
+    Industrial_Production REAL
+);
+"""
+
+# Impact measures per trading partner or product group and year, in long
+# format: `level` is 'partner' or 'product' and `code` the WITS code.
+PARTNER_IMPACT_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS partner_impact (
+    level TEXT NOT NULL,
+    code TEXT NOT NULL,
+    name TEXT,
+    year INTEGER NOT NULL,
+    avg_tariff_rate REAL,
+    imports_value REAL,
+    exports_value REAL,
+    delta_tariff REAL,
+    delta_imports REAL,
+    delta_exports REAL,
+    delta_GDP REAL,
+    cpi_delta REAL,
+    unemployment_delta REAL,
+    industrial_delta REAL,
+    PRIMARY KEY (level, code, year)
+) WITHOUT ROWID;
+"""
+
+# Reciprocal tariff schedule; one row per country and announcement vintage.
+NEW_TARIFFS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS new_tariffs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    country TEXT NOT NULL,
+    effective_date TEXT NOT NULL,
+    tariff_charged_us REAL,
+    usa_discounted_tariff REAL,
+    UNIQUE (country, effective_date)
+);
+"""
+
+# US imports from each reciprocal-tariff country by year, with the country's
+# latest scheduled rates and the implied tariff revenue.
+TARIFF_EXPOSURE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS tariff_exposure (
+    country TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    effective_date TEXT NOT NULL,
+    partner_codes INTEGER NOT NULL,
+    imports_value REAL,
+    import_share REAL,
+    tariff_charged_us REAL,
+    usa_discounted_tariff REAL,
+    estimated_revenue REAL,
+    PRIMARY KEY (country, year)
+);
+"""
+
+# Walk-forward forecast errors, one row per run, target, origin and horizon.
+BACKTEST_RESULTS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS backtest_results (
+    run_id TEXT NOT NULL,
+    target TEXT NOT NULL,
+    origin_year INTEGER NOT NULL,
+    horizon INTEGER NOT NULL,
+    forecast_year INTEGER NOT NULL,
+    forecast REAL,
+    actual REAL,
+    error REAL,
+    PRIMARY KEY (run_id, target, origin_year, horizon)
+);
+"""
+
+# Multi-year forecasts under exog path scenarios, one row per run, target,
+# scenario and horizon, read back without refitting.
+FORECASTS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS forecasts (
+    run_id TEXT NOT NULL,
+    target TEXT NOT NULL,
+    scenario TEXT NOT NULL,
+    horizon INTEGER NOT NULL,
+    forecast_year INTEGER NOT NULL,
+    tariff_rate REAL,
+    forecast REAL,
+    lower REAL,
+    upper REAL,
+    PRIMARY KEY (run_id, target, scenario, horizon)
+);
+"""
+
+# Raw macro observations in long format; vintage is when the value was fetched.
+MACRO_OBSERVATIONS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS macro_observations (
+    series_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    value REAL,
+    vintage TEXT NOT NULL,
+    PRIMARY KEY (series_id, date)
+) WITHOUT ROWID;
+"""
+
+# Monotonic per-table write counter, bumped by every writer in the same
+# connection as its write. Caches derived from a table compare versions.
+TABLE_VERSIONS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+# Input fingerprint of the last successful run of each pipeline stage.
+PIPELINE_STATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS pipeline_state (
+    stage TEXT PRIMARY KEY,
+    input_fingerprint TEXT NOT NULL,
+    completed_at TEXT NOT NULL
+);
+"""
+
+# Run ledger: one row per stage of every pipeline run, including skipped and
+# failed stages, with the stage's instrumentation measurement.
+PIPELINE_RUNS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS pipeline_runs (
+    run_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    status TEXT NOT NULL,
+    seconds REAL,
+    peak_rss_mb REAL,
+    rss_growth_mb REAL,
+    rows_in INTEGER,
+    rows_out INTEGER,
+    queries INTEGER,
+    query_seconds REAL,
+    error TEXT,
+    profile_path TEXT,
+    PRIMARY KEY (run_id, stage)
+);
+"""
+
+# Vintage assigned to rows stored before new_tariffs recorded effective dates.
+INITIAL_RECIPROCAL_TARIFF_DATE = "2025-04-02"
+
+# Fact indexes: (year) serves the loader's partition deletes (leaving out
+# data_type keeps the largest index a third smaller); (key, year) serves
+# partner- and product-filtered reads.
+TARIFF_INDEXES_SQL = [
+    "CREATE INDEX IF NOT EXISTS idx_trade_flows_year ON trade_flows (year);",
+    "CREATE INDEX IF NOT EXISTS idx_trade_flows_partner_year ON trade_flows (partner_id, year);",
+    "CREATE INDEX IF NOT EXISTS idx_trade_flows_product_year ON trade_flows (product_id, year);",
+    "CREATE INDEX IF NOT EXISTS idx_applied_rates_year ON applied_rates (year);",
+    "CREATE INDEX IF NOT EXISTS idx_applied_rates_product_year ON applied_rates (product_id, year);",
+]
+
+# Bump SCHEMA_VERSION and register a migration whenever an existing table
+# needs to change shape; the applied version is kept in PRAGMA user_version.
+SCHEMA_VERSION = 4
+
+def bump_table_version(conn, table_name):
+    """Record that table_name was written; invalidates caches built from it."""
+    conn.execute(TABLE_VERSIONS_TABLE_SQL)
+    conn.execute(
+        """
+        INSERT INTO table_versions (table_name, version, updated_at)
+        VALUES (?, 1, strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+        ON CONFLICT (table_name) DO UPDATE SET
+            version = version + 1,
+            updated_at = excluded.updated_at
+        """,
+        (table_name,)
+    )
+
+def get_table_version(conn, table_name):
+    """Return the write counter of table_name (0 if never recorded)."""
+    conn.execute(TABLE_VERSIONS_TABLE_SQL)
+    row = conn.execute("SELECT version FROM table_versions WHERE table_name = ?", (table_name,)).fetchone()
+    return row[0] if row else 0
+
+def get_schema_version(conn):
+    """Return the schema version recorded in the database file."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def table_exists(conn, table_name):
+    """Return True if a table or view with this name exists."""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type IN ('table', 'view') AND name = ?", (table_name,)
+    ).fetchone()
+    return row is not None
+
+def primary_key_columns(conn, table_name):
+    """Return the primary key columns of a table, in key order."""
+    info = conn.execute(f'PRAGMA table_info("{table_name}")').fetchall()
+    return [row[1] for row in sorted(info, key=lambda row: row[5]) if row[5] > 0]
+
+def _rebuild_table(conn, table_name, create_sql, defaults=None):
+    """
+    Recreates a table from its declared DDL and copies over the columns the old
+    and new definitions share. New columns listed in `defaults` (column -> SQL
+    expression) are filled from it. Later rows win when the new key is violated.
+    """
+    defaults = defaults or {}
+    old_name = f"{table_name}__old"
+    conn.execute(f'ALTER TABLE "{table_name}" RENAME TO "{old_name}"')
+    conn.execute(create_sql)
+    old_columns = {row[1] for row in conn.execute(f'PRAGMA table_info("{old_name}")')}
+    new_columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")')]
+    targets = [col for col in new_columns if col in old_columns or col in defaults]
+    target_list = ", ".join(f'"{col}"' for col in targets)
+    source_list = ", ".join(f'"{col}"' if col in old_columns else defaults[col] for col in targets)
+    conn.execute(
+        f'INSERT OR REPLACE INTO "{table_name}" ({target_list}) '
+        f'SELECT {source_list} FROM "{old_name}" ORDER BY rowid'
+    )
+    conn.execute(f'DROP TABLE "{old_name}"')
+    bump_table_version(conn, table_name)
+
+def _migrate_to_v1(conn):
+    """
+    Version 1: tables previously written with pandas.to_sql(if_exists='replace')
+    lost their declared keys. Rebuild economic_impact so 'year' is its primary key.
+    """
+    if table_exists(conn, "economic_impact") and not primary_key_columns(conn, "economic_impact"):
+        _rebuild_table(conn, "economic_impact", ECONOMIC_IMPACT_TABLE_SQL)
+
+def _migrate_to_v2(conn):
+    """
+    Version 2: new_tariffs is keyed on (country, effective_date). Rows written
+    before vintages were tracked are collapsed to one per country, dated
+    INITIAL_RECIPROCAL_TARIFF_DATE.
+    """
+    if table_exists(conn, "new_tariffs") and "effective_date" not in {
+        row[1] for row in conn.execute('PRAGMA table_info("new_tariffs")')
+    }:
+        _rebuild_table(conn, "new_tariffs", NEW_TARIFFS_TABLE_SQL,
+                       defaults={"effective_date": f"'{INITIAL_RECIPROCAL_TARIFF_DATE}'"})
+
+def _create_tariff_store(conn):
+    for statement in TARIFF_DIMENSION_TABLES_SQL:
+        conn.execute(statement)
+    conn.execute(TRADE_FLOWS_TABLE_SQL)
+    conn.execute(APPLIED_RATES_TABLE_SQL)
+    for statement in TARIFF_INDEXES_SQL:
+        conn.execute(statement)
+
+def _migrate_to_v3(conn):
+    """
+    Version 3: the wide 'tariffs' table is split into dimension tables
+    (reporters, partners, products, duty_schemes) and the trade_flows and
+    applied_rates fact tables, and replaced by a view of the same name. The
+    ingestion manifest is kept, so unchanged source files are not re-read.
+    """
+    is_table = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tariffs'"
+    ).fetchone()
+    if not is_table:
+        return
+    _create_tariff_store(conn)
+    conn.execute(
+        "INSERT INTO reporters (reporter_code, reporter_name) "
+        "SELECT DISTINCT reporter_code, reporter_name FROM tariffs"
+    )
+    conn.execute(
+        "INSERT INTO partners (partner_code, partner_name) "
+        "SELECT DISTINCT partner_code, partner_name FROM tariffs WHERE data_type IN ('imports', 'exports')"
+    )
+    conn.execute(
+        "INSERT INTO products (classification, classification_version, product_code, mtn_categories) "
+        "SELECT DISTINCT classification, classification_version, product_code, mtn_categories FROM tariffs"
+    )
+    conn.execute(
+        "INSERT INTO duty_schemes (duty_scheme_code, duty_scheme_name) "
+        "SELECT DISTINCT duty_scheme_code, duty_scheme_name FROM tariffs WHERE data_type = 'applied'"
+    )
+    # IS rather than = so that missing strings match their dimension row.
+    dimension_joins = """
+    JOIN reporters r ON r.reporter_code IS t.reporter_code AND r.reporter_name IS t.reporter_name
+    JOIN products p ON p.product_code IS t.product_code AND p.classification IS t.classification
+        AND p.classification_version IS t.classification_version AND p.mtn_categories IS t.mtn_categories
+    """
+    conn.execute(
+        f"""
+        INSERT INTO trade_flows (data_type, year, reporter_id, partner_id, product_id, value)
+        SELECT t.data_type, t.year, r.reporter_id, pt.partner_id, p.product_id, t.value
+        FROM tariffs t {dimension_joins}
+        JOIN partners pt ON pt.partner_code IS t.partner_code AND pt.partner_name IS t.partner_name
+        WHERE t.data_type IN ('imports', 'exports')
+        ORDER BY t.rowid
+        """
+    )
+    conn.execute(
+        f"""
+        INSERT INTO applied_rates (year, reporter_id, product_id, duty_scheme_id,
+                                   simple_average, trade_weighted, duty_free_share)
+        SELECT t.year, r.reporter_id, p.product_id, d.duty_scheme_id,
+               t.simple_average, t.trade_weighted, t.duty_free_share
+        FROM tariffs t {dimension_joins}
+        JOIN duty_schemes d ON d.duty_scheme_code IS t.duty_scheme_code
+            AND d.duty_scheme_name IS t.duty_scheme_name
+        WHERE t.data_type = 'applied'
+        ORDER BY t.rowid
+        """
+    )
+    conn.execute("DROP TABLE tariffs")
+    conn.execute(TARIFFS_VIEW_SQL)
+    for table_name in ("trade_flows", "applied_rates"):
+        bump_table_version(conn, table_name)
+
+def _migrate_to_v4(conn):
+    """
+    Version 4: economic_impact is derived from raw inputs only. Databases that
+    never stored macro observations hold the annual macro levels only in
+    economic_impact, so they are copied to legacy_macro_levels, together with
+    the levels of the year before the first row (its levels minus its deltas).
+    """
+    if not table_exists(conn, "economic_impact"):
+        return
+    if table_exists(conn, "macro_observations") and conn.execute(
+        "SELECT 1 FROM macro_observations LIMIT 1"
+    ).fetchone():
+        return
+    conn.execute(LEGACY_MACRO_LEVELS_TABLE_SQL)
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO legacy_macro_levels (year, GDP, CPI, Unemployment_Rate, Industrial_Production)
+        SELECT year, GDP, CPI, Unemployment_Rate, Industrial_Production
+        FROM economic_impact
+        UNION ALL
+        SELECT year - 1, GDP - delta_GDP, CPI - cpi_delta,
+               Unemployment_Rate - unemployment_delta, Industrial_Production - industrial_delta
+        FROM economic_impact
+        WHERE year = (SELECT MIN(year) FROM economic_impact)
+        """
+    )
+    bump_table_version(conn, "legacy_macro_levels")
+
+MIGRATIONS = {
+    1: _migrate_to_v1,
+    2: _migrate_to_v2,
+    3: _migrate_to_v3,
+    4: _migrate_to_v4,
+}
+
+def create_tables(conn):
+    """
+    Creates any missing tables and indexes and migrates an existing database
+    to SCHEMA_VERSION. Everything runs in a single transaction, which takes
+    the write lock up front: a deferred transaction that reads the schema
+    version and then writes fails at once with "database is locked" if a
+    concurrent stage commits in between, instead of waiting on busy_timeout.
+    """
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        current_version = get_schema_version(conn)
+        for version in range(current_version + 1, SCHEMA_VERSION + 1):
+            MIGRATIONS[version](conn)
+
+        _create_tariff_store(conn)
+        cursor.execute(TARIFFS_VIEW_SQL)
+        for statement in MANIFEST_TABLES_SQL:
+            cursor.execute(statement)
+
+        # Merged Economic Impact table (combining tariff deltas and macro data)
+        cursor.execute(LEGACY_MACRO_LEVELS_TABLE_SQL)
+        cursor.execute(ECONOMIC_LEVELS_TABLE_SQL)
+        cursor.execute(ECONOMIC_IMPACT_TABLE_SQL)
+        cursor.execute(PARTNER_IMPACT_TABLE_SQL)
+        cursor.execute(NEW_TARIFFS_TABLE_SQL)
+        cursor.execute(TARIFF_EXPOSURE_TABLE_SQL)
+        cursor.execute(BACKTEST_RESULTS_TABLE_SQL)
+        cursor.execute(FORECASTS_TABLE_SQL)
+        cursor.execute(MACRO_OBSERVATIONS_TABLE_SQL)
+        cursor.execute(TABLE_VERSIONS_TABLE_SQL)
+        cursor.execute(PIPELINE_STATE_TABLE_SQL)
+        cursor.execute(PIPELINE_RUNS_TABLE_SQL)
 
-    conn.commit()
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
@@ -0,0 +1,173 @@
+import logging
+import pandas as pd
+from src.db_utils import fetch_query, get_connection, store_dataframe
+from src.fetch_new_tariffs import load_new_tariffs
+from src.frame_cache import read_table
+from src.instrumentation import configure_logging, instrumented
+from src.schema import create_tables
+from src.tariff_store import read_dimension
+
+logger = logging.getLogger(__name__)
+
+# WITS partner code of the all-partners total, used as the import-share denominator.
+WORLD_PARTNER_CODE = 'A000'
+
+# Schedule country names that differ from the WITS partner_name.
+COUNTRY_ALIASES = {
+    'Vietnam': 'Viet Nam',
+    'Taiwan': 'Chinese Taipei',
+    'South Korea': 'Korea, Republic of',
+    'Turkey': 'Türkiye',
+    'Myanmar (Burma)': 'Myanmar',
+    'Laos': "Lao People's Democratic Republic",
+    'Brunei': 'Brunei Darussalam',
+    'Bolivia': 'Bolivia, Plurinational State of',
+    'Venezuela': 'Venezuela, Bolivarian Republic of',
+    'Moldova': 'Moldova, Republic of',
+    'Russia': 'Russian Federation',
+    'Syria': 'Syrian Arab Republic',
+    'Hong Kong': 'Hong Kong, China',
+    'Ivory Coast': "Côte d'Ivoire",
+    'Saudi Arabia': 'Saudi Arabia, Kingdom of',
+    'Kuwait': 'Kuwait, the State of',
+    'Bahrain': 'Bahrain, Kingdom of',
+}
+
+# The European Union is priced as one schedule entry but traded with as its
+# member states. WITS reports the EU aggregate under its own code and members
+# under ISO-numeric codes (Belgium-Luxembourg as C058 in older years).
+EU_COUNTRY = 'European Union'
+EU_AGGREGATE_CODE = 'U918'
+EU_MEMBER_CODES = [
+    'C040', 'C056', 'C058', 'C100', 'C191', 'C196', 'C203', 'C208', 'C233',
+    'C246', 'C250', 'C276', 'C300', 'C348', 'C372', 'C380', 'C428', 'C440',
+    'C442', 'C470', 'C528', 'C616', 'C620', 'C642', 'C703', 'C705', 'C724', 'C752',
+]
+
+def _name_key(names):
+    return names.str.casefold().str.strip()
+
+def build_partner_index(countries):
+    """
+    Map schedule country names onto WITS partners.
+
+    Names are matched case-insensitively against the names in the 'partners'
+    dimension after applying COUNTRY_ALIASES, and a matched code brings along
+    every partner_id recorded under it. The European Union maps to every EU
+    member code plus the EU aggregate code; is_aggregate marks the latter,
+    which takes precedence over the members in years where it is reported.
+
+    Returns:
+        A DataFrame with columns country, partner_code, partner_id, is_aggregate.
+    """
+    partners = read_dimension('partners').dropna(subset=['partner_code'])
+    partners['name_key'] = _name_key(partners['partner_name'].astype(object))
+
+    schedule = pd.DataFrame({'country': pd.Series(countries, dtype=object).unique()})
+    schedule['name_key'] = _name_key(schedule['country'].replace(COUNTRY_ALIASES))
+    index = schedule.merge(partners[['name_key', 'partner_code']], on='name_key', how='inner')
+    index = index[['country', 'partner_code']].astype({'partner_code': object})
+    index['is_aggregate'] = False
+
+    if EU_COUNTRY in set(schedule['country']):
+        eu_codes = pd.DataFrame({'partner_code': EU_MEMBER_CODES + [EU_AGGREGATE_CODE]})
+        eu_codes['country'] = EU_COUNTRY
+        eu_codes['is_aggregate'] = eu_codes['partner_code'] == EU_AGGREGATE_CODE
+        index = pd.concat([index[index['country'] != EU_COUNTRY], eu_codes], ignore_index=True)
+
+    index = index.drop_duplicates(subset=['country', 'partner_code'])
+    partner_ids = partners[['partner_code', 'partner_id']].astype({'partner_code': object})
+    index = index.merge(partner_ids, on='partner_code', how='inner')
+    return index[['country', 'partner_code', 'partner_id', 'is_aggregate']]
+
+@instrumented()
+def compute_tariff_exposure(as_of=None):
+    """
+    US import exposure to every country in the reciprocal tariff schedule.
+
+    Joins the latest schedule vintage (optionally as of a date) to yearly US
+    imports by partner through build_partner_index, for all years at once. For
+    each (country, year) it returns the imports value, the share of total US
+    imports, the scheduled rates and the revenue implied by applying the US
+    reciprocal rate (usa_discounted_tariff) to those imports.
+    """
+    schedule = load_new_tariffs(as_of)
+    index = build_partner_index(schedule['country'])
+
+    # Aggregated by integer key; codes are attached from the small partner index.
+    # Both tables are read through the columnar cache.
+    imports = read_table('trade_flows', columns=['partner_id', 'year', 'value'], filters={'data_type': 'imports'})
+    imports = imports.groupby(['partner_id', 'year'], as_index=False).agg(imports_value=('value', 'sum'))
+    world_ids = read_table('partners', columns=['partner_id'], filters={'partner_code': WORLD_PARTNER_CODE},
+                           version_table='tariffs')['partner_id']
+    world = imports[imports['partner_id'].isin(world_ids)].groupby('year', as_index=False)['imports_value'].sum()
+    world = world.rename(columns={'imports_value': 'world_imports'})
+
+    flows = index.merge(imports, on='partner_id', how='inner')
+    # Where the aggregate code reports a year, it replaces the member rows;
+    # members are summed only for years the aggregate is missing.
+    aggregate_reported = flows['is_aggregate'].groupby([flows['country'], flows['year']]).transform('any')
+    flows = flows[flows['is_aggregate'] | ~aggregate_reported]
+
+    exposure = flows.groupby(['country', 'year'], as_index=False).agg(
+        partner_codes=('partner_code', 'nunique'),
+        imports_value=('imports_value', 'sum'),
+    )
+    exposure = exposure.merge(world, on='year', how='left').merge(schedule, on='country', how='inner')
+    exposure['import_share'] = exposure['imports_value'] / exposure['world_imports']
+    exposure['estimated_revenue'] = exposure['imports_value'] * exposure['usa_discounted_tariff'] / 100
+
+    unmatched = sorted(set(schedule['country']) - set(exposure['country']))
+    if unmatched:
+        logger.warning("No US import data matched for: %s", ", ".join(unmatched))
+
+    return exposure[['country', 'year', 'effective_date', 'partner_codes', 'imports_value', 'import_share',
+                     'tariff_charged_us', 'usa_discounted_tariff', 'estimated_revenue']]
+
+def store_tariff_exposure(as_of=None):
+    """Recompute the exposure of every scheduled country and replace the 'tariff_exposure' table."""
+    create_tables(get_connection())
+    exposure = compute_tariff_exposure(as_of)
+    store_dataframe(exposure, "tariff_exposure", if_exists="replace")
+    logger.info("Stored %d country-year rows in 'tariff_exposure' table.", len(exposure))
+    return exposure
+
+def weighted_tariff_rates():
+    """
+    Import-weighted effective rates per year across all scheduled countries,
+    aggregated in one query over 'tariff_exposure': both scheduled rates
+    weighted by US imports, the total implied revenue and the share of US
+    imports covered by the schedule.
+    """
+    query = """
+    SELECT
+        year,
+        SUM(tariff_charged_us * imports_value) / SUM(imports_value) AS weighted_tariff_charged_us,
+        SUM(usa_discounted_tariff * imports_value) / SUM(imports_value) AS weighted_usa_discounted_tariff,
+        SUM(estimated_revenue) AS estimated_revenue,
+        SUM(import_share) AS covered_import_share
+    FROM tariff_exposure
+    WHERE imports_value > 0
+    GROUP BY year
+    ORDER BY year
+    """
+    return fetch_query(query)
+
+def exposure_weights(year=None):
+    """
+    US imports from each scheduled country in `year` (default: the latest year
+    in 'tariff_exposure'), as a Series indexed by country for use as weights.
+    """
+    query = """
+    SELECT country, imports_value
+    FROM tariff_exposure
+    WHERE year = COALESCE(?, (SELECT MAX(year) FROM tariff_exposure))
+      AND imports_value > 0
+    """
+    weights = fetch_query(query, params=(year,))
+    return weights.set_index('country')['imports_value']
+
+if __name__ == "__main__":
+    configure_logging()
+    store_tariff_exposure()
+    logger.info("Import-weighted tariff rates:\n%s", weighted_tariff_rates().tail())
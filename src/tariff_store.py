@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+from src.frame_cache import read_table
+
+# Dimension tables of the normalized tariff store: surrogate key column and the
+# descriptive columns whose distinct combinations the key stands for.
+TARIFF_DIMENSIONS = {
+    'reporters': ('reporter_id', ['reporter_code', 'reporter_name']),
+    'partners': ('partner_id', ['partner_code', 'partner_name']),
+    'products': ('product_id', ['classification', 'classification_version', 'product_code', 'mtn_categories']),
+    'duty_schemes': ('duty_scheme_id', ['duty_scheme_code', 'duty_scheme_name']),
+}
+
+# Fact table of each data_type, the dimensions its rows reference and its
+# measure columns.
+TARIFF_FACTS = {
+    'imports': ('trade_flows', ['reporters', 'partners', 'products'], ['value']),
+    'exports': ('trade_flows', ['reporters', 'partners', 'products'], ['value']),
+    'applied': ('applied_rates', ['reporters', 'products', 'duty_schemes'],
+                ['simple_average', 'trade_weighted', 'duty_free_share']),
+}
+
+def _member_key(values):
+    """Dimension lookup key of one row of descriptive values; missing values become None."""
+    return tuple(None if pd.isna(value) else value for value in values)
+
+def load_dimension_index(conn, table):
+    """Return {(descriptive values...): surrogate key} for every row of a dimension table."""
+    key_column, columns = TARIFF_DIMENSIONS[table]
+    column_list = ", ".join(columns)
+    return {tuple(row[1:]): row[0] for row in conn.execute(f"SELECT {key_column}, {column_list} FROM {table}")}
+
+def encode_dimension(conn, table, frame, index):
+    """
+    Surrogate keys of a dimension for every row of `frame`, as an int64 array.
+
+    Only the distinct combinations of the dimension's columns are looked up;
+    with categorical columns that is a handful of rows per chunk. Combinations
+    missing from `index` (see load_dimension_index) are inserted into the
+    dimension table on `conn` and added to `index`, so the caller's transaction
+    covers them and later chunks reuse the keys.
+    """
+    key_column, columns = TARIFF_DIMENSIONS[table]
+    members = frame[columns].drop_duplicates()
+    keys = [_member_key(row) for row in members.itertuples(index=False, name=None)]
+    new_keys = [key for key in dict.fromkeys(keys) if key not in index]
+    if new_keys:
+        next_id = max(index.values(), default=0) + 1
+        index.update((key, next_id + offset) for offset, key in enumerate(new_keys))
+        conn.executemany(
+            f"INSERT INTO {table} ({key_column}, {', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * (len(columns) + 1))})",
+            [(index[key],) + key for key in new_keys],
+        )
+    members = members.assign(**{key_column: [index[key] for key in keys]})
+    return frame[columns].merge(members, on=columns, how='left')[key_column].to_numpy(dtype=np.int64)
+
+def fact_columns(data_type):
+    """Columns of the fact table rows written for a data_type, in insert order."""
+    table, dimensions, measures = TARIFF_FACTS[data_type]
+    keys = [TARIFF_DIMENSIONS[dimension][0] for dimension in dimensions]
+    return (['data_type'] if table == 'trade_flows' else []) + ['year'] + keys + measures
+
+def read_dimension(table):
+    """
+    A dimension table as a DataFrame with categorical descriptive columns,
+    read through the columnar cache. Dimensions only grow while tariffs are
+    ingested, so the cache is keyed by the 'tariffs' table version.
+    """
+    key_column, columns = TARIFF_DIMENSIONS[table]
+    dimension = read_table(table, columns=[key_column] + columns, version_table='tariffs')
+    dimension = dimension.sort_values(key_column, ignore_index=True)
+    return dimension.astype({column: 'category' for column in columns})
+
+def _decode(keys, dimension, key_column, column):
+    """Categorical of a dimension column for an array of surrogate keys, built from codes without copying strings."""
+    values = dimension[column].cat
+    positions = np.full(int(dimension[key_column].max()) + 1 if len(dimension) else 1, -1, dtype=np.int64)
+    positions[dimension[key_column].to_numpy()] = np.arange(len(dimension))
+    return pd.Categorical.from_codes(values.codes.to_numpy()[positions[keys]], categories=values.categories)
+
+def load_tariff_frame(data_type, years=None):
+    """
+    Row-level tariff data of one data_type ('imports', 'exports' or 'applied'),
+    optionally for some years, in the column layout of the source extract.
+
+    Only integer keys and measures are read from the fact table; descriptive
+    columns are decoded as categoricals sharing the dimension tables'
+    categories, so memory grows with the number of rows, not with their strings.
+    Fact and dimension tables are read through the columnar cache.
+    """
+    table, dimensions, measures = TARIFF_FACTS[data_type]
+    columns = [column for column in fact_columns(data_type) if column != 'data_type']
+    filters = {}
+    if table == 'trade_flows':
+        filters['data_type'] = data_type
+    if years is not None:
+        filters['year'] = [int(year) for year in years]
+    facts = read_table(table, columns=columns, filters=filters)
+
+    frame = pd.DataFrame({'year': facts['year'].astype('int16')})
+    for dimension in dimensions:
+        key_column, dimension_columns = TARIFF_DIMENSIONS[dimension]
+        dimension_df = read_dimension(dimension)
+        keys = facts[key_column].to_numpy(dtype=np.int64)
+        for column in dimension_columns:
+            frame[column] = _decode(keys, dimension_df, key_column, column)
+    for measure in measures:
+        frame[measure] = facts[measure]
+    return frame
@@ -1,144 +1,261 @@
 import os
+import json
+import logging
+import hashlib
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
+import matplotlib
 import matplotlib.pyplot as plt
-import statsmodels.api as sm
 import seaborn as sns
-from src.db_utils import fetch_query
+from src.frame_cache import read_table
+from src.instrumentation import configure_logging, instrumented
+from src.regression import fit_batched_ols, predict_lines
 
-def run_visualizations():
-    """
-    Fetches merged economic impact data from the database and creates visualizations:
-      1. A correlation heatmap for key variables.
-      2. A scatter plot with regression lines (imports/exports vs. tariff rate).
-      3. Two subplots: one for tariff changes and one for trade & GDP changes.
-      4. A new plot showing how the change in tariff rates (delta_tariff) impacts each dataset separately.
-    """
-    # --- Load Merged Data ---
-    merged_df = fetch_query("SELECT * FROM economic_impact")
-    merged_df.sort_values('year', inplace=True)
-    
-    output_folder = "output"
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-    
-    # --- Plot 1: Correlation Heatmap ---
-    corr_vars = ['avg_tariff_rate', 'imports_value', 'exports_value', 
-                 'CPI', 'Unemployment_Rate', 'Industrial_Production', 'GDP']
-    corr_df = merged_df[corr_vars].corr()
+logger = logging.getLogger(__name__)
+
+# Worker processes for chart rendering (None = one per CPU, 1 = render in-process).
+RENDER_MAX_WORKERS = None
+# Fewer stale charts than this are rendered in-process: a spawned worker pays
+# seconds of interpreter and matplotlib start-up, more than a chart takes to draw.
+RENDER_POOL_MIN_TASKS = 8
+# Records the data hash each PNG in an output folder was rendered from.
+CHART_MANIFEST_NAME = ".chart_manifest.json"
+# Bump when a renderer's layout changes so existing PNGs are redrawn.
+CHART_STYLE_VERSION = 1
+
+DELTA_METRICS = [
+    ('delta_imports', 'Imports Δ (B USD)'),
+    ('delta_exports', 'Exports Δ (B USD)'),
+    ('delta_GDP', 'GDP Δ (B USD)'),
+    ('cpi_delta', 'CPI Δ'),
+    ('unemployment_delta', 'Unemployment Δ'),
+    ('industrial_delta', 'Industrial Δ')
+]
+
+def plot_correlation_matrix(df, path):
+    """Correlation heatmap for key variables."""
+    corr_df = df.corr()
     plt.figure(figsize=(10, 8))
     sns.heatmap(corr_df, annot=True, cmap="coolwarm", fmt=".2f")
     plt.title("Correlation Matrix: Tariff & Macro Data")
-    corr_plot_path = os.path.join(output_folder, "correlation_matrix.png")
     plt.tight_layout()
-    plt.savefig(corr_plot_path)
+    plt.savefig(path)
     plt.close()
-    print(f"Correlation matrix plot saved to {corr_plot_path}")
-    
-    # --- Plot 2: Scatter Plot with Regression Lines ---
-    X = sm.add_constant(merged_df['avg_tariff_rate'])
-    model_imports = sm.OLS(merged_df['imports_value'], X).fit()
-    model_exports = sm.OLS(merged_df['exports_value'], X).fit()
-    
+
+def plot_scatter_regression(df, path):
+    """Scatter plot with regression lines (imports/exports vs. tariff rate)."""
+    trade_fit = fit_batched_ols(df['avg_tariff_rate'], df[['imports_value', 'exports_value']])
+
     plt.figure(figsize=(8, 5))
-    plt.scatter(merged_df['avg_tariff_rate'], merged_df['imports_value'], label="Imports", color="blue")
-    plt.scatter(merged_df['avg_tariff_rate'], merged_df['exports_value'], label="Exports", color="green")
-    sorted_idx = merged_df['avg_tariff_rate'].argsort()
-    sorted_x = merged_df['avg_tariff_rate'].iloc[sorted_idx]
-    X_sorted = sm.add_constant(sorted_x)
-    imports_pred = model_imports.predict(X_sorted)
-    exports_pred = model_exports.predict(X_sorted)
+    plt.scatter(df['avg_tariff_rate'], df['imports_value'], label="Imports", color="blue")
+    plt.scatter(df['avg_tariff_rate'], df['exports_value'], label="Exports", color="green")
+    sorted_x = np.sort(df['avg_tariff_rate'].dropna().to_numpy())
+    imports_pred, exports_pred = predict_lines(trade_fit, sorted_x).T
     plt.plot(sorted_x, imports_pred, color='blue', label="Imports Regression")
     plt.plot(sorted_x, exports_pred, color='green', label="Exports Regression")
     plt.xlabel("Average Tariff Rate (Trade-Weighted)")
     plt.ylabel("Trade Value")
     plt.title("Trade Value vs. Tariff Rate")
     plt.legend()
-    scatter_plot_path = os.path.join(output_folder, "scatter_regression.png")
     plt.tight_layout()
-    plt.savefig(scatter_plot_path)
+    plt.savefig(path)
     plt.close()
-    print(f"Scatter regression plot saved to {scatter_plot_path}")
-    
-    # --- Plot 3: Two Subplots (Tariff Changes and Trade/GDP Changes) ---
-    years_str = merged_df['year'].astype(str).values
+
+def plot_year_to_year(df, path):
+    """Two subplots: one for tariff changes and one for trade & GDP changes."""
+    years_str = df['year'].astype(str).values
     x = np.arange(len(years_str))
     width = 0.25
     fig, (ax1, ax2) = plt.subplots(2, 1, sharex=True, figsize=(10, 8))
     fig.suptitle("Year-to-Year Changes", y=0.95, fontsize=14)
-    
+
     # Top Subplot: Tariff Δ (bps)
-    ax1.bar(x, merged_df['delta_tariff'], width, color='purple', label='Tariff Δ (bps)')
+    ax1.bar(x, df['delta_tariff'], width, color='purple', label='Tariff Δ (bps)')
     ax1.axhline(0, color='black', linewidth=0.8)
     ax1.set_ylabel("Tariff Change (bps)")
     ax1.set_title("Year-to-Year Tariff Changes")
     ax1.legend(loc='upper left')
-    
+
     # Bottom Subplot: Imports, Exports & GDP Δ
-    ax2.bar(x - width, merged_df['delta_imports'], width, color='blue', label='Imports Δ (B USD)')
-    ax2.bar(x, merged_df['delta_exports'], width, color='green', label='Exports Δ (B USD)')
-    ax2.bar(x + width, merged_df['delta_GDP'], width, color='orange', label='GDP Δ (B USD)')
+    ax2.bar(x - width, df['delta_imports'], width, color='blue', label='Imports Δ (B USD)')
+    ax2.bar(x, df['delta_exports'], width, color='green', label='Exports Δ (B USD)')
+    ax2.bar(x + width, df['delta_GDP'], width, color='orange', label='GDP Δ (B USD)')
     ax2.axhline(0, color='black', linewidth=0.8)
     ax2.set_ylabel("Change (Billions USD)")
     ax2.set_title("Year-to-Year Changes in Trade & GDP")
     ax2.set_xticks(x)
     ax2.set_xticklabels(years_str, rotation=45)
     ax2.legend(loc='upper left')
-    
-    two_subplot_path = os.path.join(output_folder, "year_to_year_subplots.png")
+
     plt.tight_layout(rect=[0, 0, 1, 0.95])
-    plt.savefig(two_subplot_path)
+    plt.savefig(path)
     plt.close()
-    print(f"Year-to-year subplots saved to {two_subplot_path}")
-    
-    # --- New Plot 4: Impact of Delta Tariff on Each Delta Metric ---
-    # Define the delta metrics and their labels.
-    metrics = [
-        ('delta_imports', 'Imports Δ (B USD)'),
-        ('delta_exports', 'Exports Δ (B USD)'),
-        ('delta_GDP', 'GDP Δ (B USD)'),
-        ('cpi_delta', 'CPI Δ'),
-        ('unemployment_delta', 'Unemployment Δ'),
-        ('industrial_delta', 'Industrial Δ')
-    ]
-    
-    n_metrics = len(metrics)
+
+def plot_delta_relationships(df, path):
+    """How the change in tariff rates (delta_tariff) impacts each delta metric separately."""
+    n_metrics = len(DELTA_METRICS)
     n_cols = 2
     n_rows = int(np.ceil(n_metrics / n_cols))
-    
+
     fig, axes = plt.subplots(n_rows, n_cols, figsize=(15, n_rows * 4))
     axes = axes.flatten()
-    
-    for i, (metric, label) in enumerate(metrics):
+
+    # Fit a linear regression for clarity: every metric against delta_tariff in one batched solve.
+    delta_fit = fit_batched_ols(df['delta_tariff'], df[[metric for metric, _ in DELTA_METRICS]])
+    sorted_x = np.sort(df['delta_tariff'].dropna().to_numpy())
+    delta_lines = predict_lines(delta_fit, sorted_x)
+
+    for i, (metric, label) in enumerate(DELTA_METRICS):
         ax = axes[i]
         # Scatter plot: delta_tariff on x-axis vs. the current metric on y-axis
-        ax.scatter(merged_df['delta_tariff'], merged_df[metric], color='teal', alpha=0.7)
-        # Fit a linear regression for clarity
-        X_d = sm.add_constant(merged_df['delta_tariff'])
-        model = sm.OLS(merged_df[metric], X_d).fit()
-        sorted_idx = merged_df['delta_tariff'].argsort()
-        sorted_x = merged_df['delta_tariff'].iloc[sorted_idx]
-        X_sorted_d = sm.add_constant(sorted_x)
-        y_pred = model.predict(X_sorted_d)
-        ax.plot(sorted_x, y_pred, color='red', linewidth=2, label='Regression')
+        ax.scatter(df['delta_tariff'], df[metric], color='teal', alpha=0.7)
+        ax.plot(sorted_x, delta_lines[:, i], color='red', linewidth=2, label='Regression')
         ax.set_xlabel("Tariff Δ (bps)")
         ax.set_ylabel(label)
         ax.set_title(f"Impact of Tariff Δ on {label}")
         ax.legend()
-    
+
     # Hide any unused subplots
     for j in range(i + 1, len(axes)):
         axes[j].axis('off')
-    
+
     plt.suptitle("Impact of Year-to-Year Tariff Change on Each Metric", fontsize=16)
     plt.tight_layout(rect=[0, 0, 1, 0.96])
-    new_deltas_path = os.path.join(output_folder, "delta_relationships.png")
-    plt.savefig(new_deltas_path)
+    plt.savefig(path)
     plt.close()
-    print(f"Delta relationships plot saved to {new_deltas_path}")
+
+# (file name, renderer, columns the chart reads) for the economic impact charts.
+IMPACT_CHARTS = [
+    ("correlation_matrix.png", plot_correlation_matrix,
+     ['avg_tariff_rate', 'imports_value', 'exports_value',
+      'CPI', 'Unemployment_Rate', 'Industrial_Production', 'GDP']),
+    ("scatter_regression.png", plot_scatter_regression,
+     ['avg_tariff_rate', 'imports_value', 'exports_value']),
+    ("year_to_year_subplots.png", plot_year_to_year,
+     ['year', 'delta_tariff', 'delta_imports', 'delta_exports', 'delta_GDP']),
+    ("delta_relationships.png", plot_delta_relationships,
+     ['delta_tariff'] + [metric for metric, _ in DELTA_METRICS]),
+]
+
+def chart_key(renderer, data):
+    """Hash of a chart's renderer and the exact data slice it draws."""
+    digest = hashlib.sha256(f"{renderer.__name__}:{CHART_STYLE_VERSION}".encode())
+    digest.update(json.dumps([str(col) for col in data.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def _load_manifest(output_folder):
+    try:
+        with open(os.path.join(output_folder, CHART_MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def _save_manifest(output_folder, manifest):
+    fd, tmp_path = tempfile.mkstemp(dir=output_folder, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, os.path.join(output_folder, CHART_MANIFEST_NAME))
+
+def _init_render_worker():
+    matplotlib.use("Agg")
+
+def _render_task(task):
+    """Worker entry point: render one chart. Returns (file name, error or None)."""
+    name, renderer, data, path = task
+    try:
+        renderer(data, path)
+    except Exception as exc:
+        plt.close('all')
+        return name, repr(exc)
+    return name, None
+
+@instrumented()
+def render_charts(charts, output_folder="output", max_workers=RENDER_MAX_WORKERS, force=False):
+    """
+    Render independent charts, skipping those whose data has not changed.
+
+    Parameters:
+        charts       : Iterable of (file name, renderer, data) where renderer(data, path)
+                       draws and saves one figure. Renderers must be module-level
+                       functions so they can be sent to worker processes.
+        output_folder: Folder for the PNGs and the chart manifest.
+        max_workers  : Worker processes (None = one per CPU, 1 = render in-process).
+        force        : Redraw every chart.
+
+    A chart is redrawn only when the hash of its renderer and data slice differs
+    from the one recorded in the folder's manifest, or its PNG is missing.
+    Stale charts are drawn on the Agg backend, in a process pool when there
+    are at least RENDER_POOL_MIN_TASKS of them and more than one worker, and
+    in-process otherwise. The workers are spawned rather than forked: the pipeline calls this from a stage thread
+    while other stages run, and forking a multi-threaded process can copy
+    locks (logging, BLAS) held by another thread and deadlock the child.
+
+    Returns:
+        {file name: 'rendered' | 'unchanged' | 'failed'}.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    manifest = _load_manifest(output_folder)
+    status, keys, tasks = {}, {}, []
+    for name, renderer, data in charts:
+        path = os.path.join(output_folder, name)
+        keys[name] = chart_key(renderer, data)
+        if not force and manifest.get(name) == keys[name] and os.path.exists(path):
+            status[name] = 'unchanged'
+        else:
+            tasks.append((name, renderer, data, path))
+
+    workers = max_workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) < RENDER_POOL_MIN_TASKS:
+        _init_render_worker()
+        results = [_render_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_render_worker,
+                                 mp_context=multiprocessing.get_context("spawn")) as executor:
+            results = list(executor.map(_render_task, tasks, chunksize=max(1, len(tasks) // 64)))
+
+    for name, error in results:
+        if error is None:
+            status[name] = 'rendered'
+            manifest[name] = keys[name]
+        else:
+            status[name] = 'failed'
+            manifest.pop(name, None)
+            logger.error("Failed to render %s: %s", name, error)
+    _save_manifest(output_folder, manifest)
+    return {name: status[name] for name in keys}
+
+def run_visualizations(output_folder="output", max_workers=RENDER_MAX_WORKERS, force=False):
+    """
+    Fetches merged economic impact data from the database and creates visualizations:
+      1. A correlation heatmap for key variables.
+      2. A scatter plot with regression lines (imports/exports vs. tariff rate).
+      3. Two subplots: one for tariff changes and one for trade & GDP changes.
+      4. A new plot showing how the change in tariff rates (delta_tariff) impacts each dataset separately.
+    Each chart is rendered independently from its own column slice (see render_charts),
+    so charts whose inputs are unchanged since the last run are not redrawn.
+    Raises RuntimeError if any chart fails, after the others have been saved,
+    so the pipeline does not record the stage as complete and retries it.
+    """
+    # --- Load Merged Data ---
+    merged_df = read_table("economic_impact")
+    merged_df = merged_df.sort_values('year').reset_index(drop=True)
+
+    charts = [(name, renderer, merged_df[columns]) for name, renderer, columns in IMPACT_CHARTS]
+    status = render_charts(charts, output_folder, max_workers=max_workers, force=force)
+    for name, state in status.items():
+        logger.info("%s: %s (%s)", name, state, os.path.join(output_folder, name))
+    failed = [name for name, state in status.items() if state == 'failed']
+    if failed:
+        raise RuntimeError(f"Failed to render charts: {failed}")
+    return status
 
 def main():
     run_visualizations()
 
 if __name__ == "__main__":
+    configure_logging()
     main()
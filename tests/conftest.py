@@ -0,0 +1,56 @@
+import os
+import shutil
+import pandas as pd
+import pytest
+from src import db_utils
+from src.db_utils import set_db_path
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHIPPED_DB = os.path.join(REPO_ROOT, "database", "data.db")
+TARIFF_SOURCE_FOLDER = os.path.join(REPO_ROOT, "data", "Tariffs")
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """
+    Run every test from its own folder, so the relative cache, output and data
+    folders never touch the checkout, without a local macro source, and
+    restore the configured database afterwards.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("MACRO_DATA_DIR", raising=False)
+    original_db_path = db_utils.DB_PATH
+    yield tmp_path
+    set_db_path(original_db_path)
+
+@pytest.fixture
+def database(tmp_path):
+    """An empty database file the process is pointed at."""
+    path = str(tmp_path / "data.db")
+    set_db_path(path)
+    return path
+
+@pytest.fixture
+def shipped_database(tmp_path):
+    """A throwaway copy of the shipped database/data.db (schema version 0) the process is pointed at."""
+    path = str(tmp_path / "data.db")
+    shutil.copyfile(SHIPPED_DB, path)
+    set_db_path(path)
+    return path
+
+@pytest.fixture
+def tariff_folder(tmp_path):
+    """A copy of data/Tariffs at the relative TARIFF_DATA_FOLDER, safe to edit."""
+    folder = tmp_path / "data" / "Tariffs"
+    shutil.copytree(TARIFF_SOURCE_FOLDER, folder)
+    return str(folder)
+
+@pytest.fixture
+def edit_applied(tariff_folder):
+    """Function that sets trade_weighted for every row of one year in the copied applied.csv."""
+    def edit(year, trade_weighted):
+        path = os.path.join(tariff_folder, "applied.csv")
+        # Read as text so every other cell is written back unchanged.
+        applied = pd.read_csv(path, dtype=str, keep_default_na=False)
+        applied.loc[applied["year"] == str(year), "trade_weighted"] = str(trade_weighted)
+        applied.to_csv(path, index=False)
+    return edit
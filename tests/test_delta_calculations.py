@@ -0,0 +1,27 @@
+import pandas as pd
+from src.db_utils import fetch_query
+from src.delta_calculations import refresh_economic_impact
+from src.fetch_tariffs import process_tariff_data
+
+def _economic_impact():
+    return fetch_query("SELECT * FROM economic_impact ORDER BY year")
+
+def test_incremental_refresh_matches_full_recompute(shipped_database, tariff_folder, edit_applied):
+    process_tariff_data(tariff_folder)
+    refresh_economic_impact()
+
+    edit_applied(2006, 9.99)
+    process_tariff_data(tariff_folder)
+    affected, written = refresh_economic_impact()
+    assert affected == [2006]
+    # The edited year and the next year, whose deltas depend on it.
+    assert written == 2
+    incremental = _economic_impact()
+    assert incremental.loc[incremental['year'] == 2006, 'avg_tariff_rate'].item() == 9.99
+
+    refresh_economic_impact(full_refresh=True)
+    pd.testing.assert_frame_equal(incremental, _economic_impact(), check_exact=False, rtol=1e-12)
+
+def test_refresh_without_changes_writes_nothing(shipped_database):
+    refresh_economic_impact()
+    assert refresh_economic_impact() == ([], 0)
@@ -0,0 +1,37 @@
+from src.db_utils import get_connection
+from src.fetch_tariffs import process_tariff_data
+from src.instrumentation import measure
+
+EDITED_YEAR = 2006
+
+def _rowids(table):
+    return dict(get_connection().execute(f"SELECT rowid, year FROM {table}").fetchall())
+
+def test_one_year_edit_reingests_only_that_partition(database, tariff_folder, edit_applied):
+    process_tariff_data(tariff_folder)
+    applied_before, flows_before = _rowids("applied_rates"), _rowids("trade_flows")
+
+    edit_applied(EDITED_YEAR, 9.99)
+    with measure("reingest") as measurement:
+        process_tariff_data(tariff_folder)
+
+    conn = get_connection()
+    edited_rows = conn.execute(
+        "SELECT COUNT(*) FROM applied_rates WHERE year = ?", (EDITED_YEAR,)
+    ).fetchone()[0]
+    assert edited_rows > 0
+    assert measurement.rows_out == edited_rows
+    # Rows of every other year, and of the unchanged import/export files, are left in place.
+    applied_after = _rowids("applied_rates")
+    kept = {rowid: year for rowid, year in applied_before.items() if year != EDITED_YEAR}
+    assert {rowid: year for rowid, year in applied_after.items() if year != EDITED_YEAR} == kept
+    assert _rowids("trade_flows") == flows_before
+    assert conn.execute(
+        "SELECT DISTINCT trade_weighted FROM tariffs WHERE data_type = 'applied' AND year = ?", (EDITED_YEAR,)
+    ).fetchall() == [(9.99,)]
+
+def test_unchanged_files_are_not_reingested(database, tariff_folder):
+    process_tariff_data(tariff_folder)
+    with measure("rerun") as measurement:
+        process_tariff_data(tariff_folder)
+    assert measurement.rows_out == 0
@@ -0,0 +1,17 @@
+from src.db_utils import fetch_query
+from src.pipeline import run_pipeline
+
+STAGES = ['ingest_tariffs', 'compute_impact']
+
+def test_unchanged_inputs_are_skipped_and_changes_rerun(database, tariff_folder, edit_applied):
+    assert run_pipeline(only=STAGES, max_workers=1) == {'ingest_tariffs': 'ran', 'compute_impact': 'ran'}
+    assert run_pipeline(only=STAGES, max_workers=1) == {'ingest_tariffs': 'skipped', 'compute_impact': 'skipped'}
+
+    edit_applied(2006, 9.99)
+    assert run_pipeline(only=STAGES, max_workers=1) == {'ingest_tariffs': 'ran', 'compute_impact': 'ran'}
+    assert run_pipeline(only=STAGES, force=True, max_workers=1) == {'ingest_tariffs': 'ran', 'compute_impact': 'ran'}
+
+    ledger = fetch_query("SELECT run_id, stage, status FROM pipeline_runs")
+    assert len(ledger) == 8
+    assert ledger['run_id'].nunique() == 4
+    assert (ledger['status'] == 'skipped').sum() == 2
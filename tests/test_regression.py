@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+from src.regression import fit_batched_ols, predict_lines
+
+def _statsmodels_fit(x, y):
+    valid = ~(np.isnan(x) | np.isnan(y))
+    return sm.OLS(y[valid], sm.add_constant(x[valid])).fit()
+
+def test_matches_statsmodels_per_column():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=40)
+    Y = pd.DataFrame({
+        'a': 1.5 + 2.0 * x + rng.normal(size=40),
+        'b': -3.0 + 0.5 * x + rng.normal(scale=2.0, size=40),
+        'c': 0.2 * x + rng.normal(size=40),
+    })
+    # A different missing-value pattern puts 'c' in its own solve.
+    Y.loc[[3, 17], 'c'] = np.nan
+
+    result = fit_batched_ols(x, Y)
+
+    assert result.columns == ['a', 'b', 'c']
+    for i, column in enumerate(Y.columns):
+        expected = _statsmodels_fit(x, Y[column].to_numpy())
+        np.testing.assert_allclose([result.intercept[i], result.slope[i]], expected.params)
+        np.testing.assert_allclose([result.intercept_se[i], result.slope_se[i]], expected.bse)
+        np.testing.assert_allclose(result.r_squared[i], expected.rsquared)
+        assert result.n_obs[i] == expected.nobs
+    np.testing.assert_allclose(predict_lines(result, [0.0, 1.0])[1], result.intercept + result.slope)
+
+def test_one_dimensional_response():
+    rng = np.random.default_rng(1)
+    x = rng.normal(size=25)
+    y = 4.0 - x + rng.normal(size=25)
+    result = fit_batched_ols(x, y)
+    assert result.columns == [0]
+    np.testing.assert_allclose([result.intercept[0], result.slope[0]], _statsmodels_fit(x, y).params)
+
+def test_constant_regressor_gives_nan():
+    result = fit_batched_ols(np.full(10, 2.5), np.arange(20.0).reshape(10, 2))
+    assert np.isnan(result.slope).all()
+    assert np.isnan(result.slope_se).all()
+    assert list(result.n_obs) == [10, 10]
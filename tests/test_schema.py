@@ -0,0 +1,38 @@
+import sqlite3
+import pandas as pd
+from scripts.check_db_upgrade import check_upgrade
+from src.db_utils import get_connection
+from src.schema import SCHEMA_VERSION, create_tables, get_schema_version, primary_key_columns, table_exists
+from tests.conftest import SHIPPED_DB
+
+def test_shipped_database_upgrade_keeps_every_year():
+    before, after = check_upgrade(SHIPPED_DB)
+    assert before
+    assert before <= after
+
+def test_legacy_database_is_migrated(shipped_database):
+    with sqlite3.connect(shipped_database) as legacy:
+        impact_before = pd.read_sql("SELECT * FROM economic_impact ORDER BY year", legacy)
+        tariff_rows = legacy.execute("SELECT COUNT(*) FROM tariffs").fetchone()[0]
+
+    conn = get_connection()
+    create_tables(conn)
+
+    assert get_schema_version(conn) == SCHEMA_VERSION
+    assert primary_key_columns(conn, "economic_impact") == ["year"]
+    impact_after = pd.read_sql("SELECT * FROM economic_impact ORDER BY year", conn)
+    pd.testing.assert_frame_equal(impact_after[impact_before.columns], impact_before)
+    # The wide table became the normalized store, read back through a view of the same name.
+    assert conn.execute("SELECT type FROM sqlite_master WHERE name = 'tariffs'").fetchone() == ("view",)
+    assert conn.execute("SELECT COUNT(*) FROM tariffs").fetchone()[0] == tariff_rows
+    # Without macro observations the macro levels are kept, one year before the first row included.
+    assert table_exists(conn, "legacy_macro_levels")
+    assert conn.execute("SELECT COUNT(*) FROM legacy_macro_levels").fetchone()[0] == len(impact_before) + 1
+
+def test_create_tables_is_idempotent(database):
+    conn = get_connection()
+    create_tables(conn)
+    schema = conn.execute("SELECT name, sql FROM sqlite_master ORDER BY name").fetchall()
+    create_tables(conn)
+    assert conn.execute("SELECT name, sql FROM sqlite_master ORDER BY name").fetchall() == schema
+    assert get_schema_version(conn) == SCHEMA_VERSION